@@ -0,0 +1,362 @@
+# batch.py - Run many utility logins from a manifest without the GUI, on a bounded pool of browsers
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from browser_pool import BrowserPool
+from driver_cache import BACKENDS
+from driver_profiles import PROFILES
+from myenergycenter_scraper import MyEnergyCenterJob, MYENERGYCENTER_BASE_URL
+from pge_mobile_scraper import PGEMobileJob
+from pge_scraper import PGEJob
+from telemetry import Tracer
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+# Utility name: (scraper job class, telemetry portal, site). The concurrency
+# limits are per site: the PG&E desktop and mobile jobs log in to the same accounts.
+UTILITIES = {
+    "pge": (PGEJob, "pge", "pge"),
+    "pge-mobile": (PGEMobileJob, "pge-mobile", "pge"),
+    "myenergycenter": (MyEnergyCenterJob, "myenergycenter", "myenergycenter"),
+}
+
+DEFAULT_WORKERS = 4
+DEFAULT_LIMIT = 2
+BOOLEAN_FIELDS = ("direct_export", "sync")
+
+
+class ManifestError(Exception):
+    """Raised when a manifest cannot be read or a job in it is invalid."""
+
+
+def _boolean(value):
+    """Read a manifest boolean, which CSV gives as text."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def _text(value, field):
+    """Read a manifest string; TOML and JSON may give numbers, such as a numeric username."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    raise ManifestError(f"{field} must be text, got {value!r}")
+
+
+def site_of(utility):
+    """Return the site a utility logs in to, which its concurrency limit is shared with."""
+    return UTILITIES[utility][2]
+
+
+def _date(value, field):
+    """Read a manifest date: an ISO string, or a date from TOML."""
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ManifestError(f"{field} must be a YYYY-MM-DD date, got {value!r}")
+
+
+def read_manifest(path):
+    """Return the job entries of a CSV, JSON or TOML manifest with its defaults applied.
+
+    JSON and TOML manifests hold a "jobs" list and optional "defaults"; a JSON
+    manifest may also be a bare list. CSV manifests have one job per row.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".csv":
+            with open(path, newline="", encoding="utf-8-sig") as f:
+                return [{key: value for key, value in row.items() if value not in (None, "")}
+                        for row in csv.DictReader(f)]
+        if extension == ".json":
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        elif extension == ".toml":
+            if tomllib is None:
+                raise ManifestError("TOML manifests need Python 3.11 or newer; use CSV or JSON")
+            with open(path, "rb") as f:
+                data = tomllib.load(f)
+        else:
+            raise ManifestError(f"Unknown manifest type {extension!r}; expected .csv, .json or .toml")
+    except (OSError, ValueError) as e:
+        raise ManifestError(f"Could not read {path}: {e}")
+    if isinstance(data, list):
+        data = {"jobs": data}
+    if not isinstance(data, dict):
+        raise ManifestError(f"{path} must hold a list of jobs or a table with a \"jobs\" list")
+    defaults = data.get("defaults", {})
+    jobs = data.get("jobs", [])
+    if not isinstance(defaults, dict) or not isinstance(jobs, list):
+        raise ManifestError(f"{path}: \"defaults\" must be a table and \"jobs\" a list")
+    for number, entry in enumerate(jobs, 1):
+        if not isinstance(entry, dict):
+            raise ManifestError(f"job {number} must be a table of fields, got {entry!r}")
+    return [dict(defaults, **entry) for entry in jobs]
+
+
+def validate_job(entry, number, base_dir, output_root):
+    """Check one manifest entry and return it as a job dict with every field filled in."""
+    utility = entry.get("utility", "")
+    if not isinstance(utility, str) or utility not in UTILITIES:
+        raise ManifestError(f"job {number}: utility must be one of {', '.join(UTILITIES)}, got {utility!r}")
+    username = _text(entry.get("username", ""), f"job {number}: username")
+    if not username:
+        raise ManifestError(f"job {number}: username is missing")
+    if "password" in entry:
+        raise ManifestError(f"job {number}: put passwords in the environment or a file and reference them "
+                            f"with credentials = \"env:NAME\" or \"file:path\"")
+    credentials = entry.get("credentials", "")
+    if not isinstance(credentials, str) or not credentials.startswith(("env:", "file:")):
+        raise ManifestError(f"job {number}: credentials must be \"env:NAME\" or \"file:path\", got {credentials!r}")
+    end = _date(entry["end"], f"job {number}: end") if entry.get("end") else date.today() - timedelta(days=1)
+    start = _date(entry["start"], f"job {number}: start") if entry.get("start") else end - timedelta(days=364)
+    if start > end:
+        raise ManifestError(f"job {number}: start {start} is after end {end}")
+    output = _text(entry.get("output") or os.path.join(output_root, utility, username), f"job {number}: output")
+    url = _text(entry["url"], f"job {number}: url") if entry.get("url") else None
+    backend = entry.get("backend") or None
+    if backend is not None and (not isinstance(backend, str) or backend not in BACKENDS):
+        raise ManifestError(f"job {number}: backend must be one of {', '.join(BACKENDS)}, got {backend!r}")
+    job = {
+        "id": str(entry.get("id") or f"{utility}/{username}"),
+        "utility": utility,
+        "username": username,
+        "credentials": credentials,
+        "start": start,
+        "end": end,
+        "output": os.path.join(base_dir, os.path.expanduser(output)),
+        "url": url,
+        "sessions": entry.get("sessions", 1),
+        "backend": backend,
+    }
+    try:
+        job["sessions"] = max(1, int(job["sessions"]))
+    except (TypeError, ValueError):
+        raise ManifestError(f"job {number}: sessions must be a number, got {job['sessions']!r}")
+    for field in BOOLEAN_FIELDS:
+        job[field] = _boolean(entry.get(field, False))
+    return job
+
+
+def load_jobs(path, output_root=None):
+    """Read and validate a manifest; job ids are made unique."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    output_root = output_root or os.path.join(base_dir, "downloads")
+    jobs = [validate_job(entry, number, base_dir, output_root)
+            for number, entry in enumerate(read_manifest(path), 1)]
+    seen = Counter()
+    for job in jobs:
+        seen[job["id"]] += 1
+        if seen[job["id"]] > 1:
+            job["id"] = f"{job['id']}#{seen[job['id']]}"
+    return jobs
+
+
+def resolve_credentials(reference, base_dir):
+    """Return the password an "env:NAME" or "file:path" reference points at."""
+    scheme, _, target = reference.partition(":")
+    if scheme == "env":
+        if target not in os.environ:
+            raise ManifestError(f"environment variable {target} is not set")
+        return os.environ[target]
+    path = os.path.join(base_dir, os.path.expanduser(target))
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().rstrip("\r\n")
+    except OSError as e:
+        raise ManifestError(f"could not read password file {path}: {e}")
+
+
+def build_worker(job, pool, password, profile, tracer):
+    """Create the scraper job for a manifest entry."""
+    job_class = UTILITIES[job["utility"]][0]
+    common = dict(pool=pool, profile=profile, direct_export=job["direct_export"], sync=job["sync"], tracer=tracer)
+    if job["utility"] == "myenergycenter":
+        url = job["url"] or f"{MYENERGYCENTER_BASE_URL}/portal/PreLogin/Validate"
+        return job_class(url, job["username"], password, job["start"].isoformat(), job["end"].isoformat(),
+                         job["output"], concurrency=job["sessions"], **common)
+    return job_class(job["username"], password, job["start"], job["end"], job["output"], **common)
+
+
+def run_job(job, pool, profile, base_dir):
+    """Run one job to completion and return its result; never raises."""
+    portal = UTILITIES[job["utility"]][1]
+    result = {"id": job["id"], "utility": job["utility"], "backend": job["backend"], "username": job["username"],
+              "output": job["output"], "started": datetime.now().isoformat(timespec="seconds"), "ok": False,
+              "message": "", "files": []}
+    started = time.monotonic()
+    try:
+        password = resolve_credentials(job["credentials"], base_dir)
+        os.makedirs(job["output"], exist_ok=True)
+        tracer = Tracer(portal)
+        result["run"] = tracer.run_id
+        worker = build_worker(job, pool, password, profile, tracer)
+        ok, message = worker.execute()
+        result.update(ok=ok, message=message, files=list(worker.downloaded_files))
+        if hasattr(worker, "page_loads_saved"):
+            result["page_loads_saved"] = worker.page_loads_saved
+    except Exception as e:
+        result["message"] = str(e) if isinstance(e, ManifestError) else f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.monotonic() - started, 2)
+    return result
+
+
+def run_jobs(jobs, workers, limits, run):
+    """Run jobs with at most `workers` at once and at most limits[site] per site; return results in job order.
+
+    Jobs start in manifest order, skipping past any whose site is at its
+    limit, so one slow site does not hold up the others.
+    """
+    pending = list(jobs)
+    running = {}
+    active = Counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for job in list(pending):
+                if len(running) >= workers:
+                    break
+                site = site_of(job["utility"])
+                if active[site] < limits[site]:
+                    pending.remove(job)
+                    active[site] += 1
+                    running[executor.submit(run, job)] = job
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                active[site_of(job["utility"])] -= 1
+                result = results[job["id"]] = future.result()
+                state = "ok" if result["ok"] else "FAILED"
+                print(f"[{len(results)}/{len(jobs)}] {job['id']}: {state} in {result['seconds']:.1f}s "
+                      f"{result['message']}".rstrip())
+    return [results[job["id"]] for job in jobs]
+
+
+def write_summary(path, manifest, results, started):
+    """Write the machine-readable results of a batch."""
+    failed = [result["id"] for result in results if not result["ok"]]
+    summary = {
+        "manifest": os.path.abspath(manifest),
+        "started": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+        "seconds": round(time.time() - started, 2),
+        "jobs": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": failed,
+        "results": results,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return summary
+
+
+def parse_limits(values, workers):
+    """Turn ["pge=2", ...] into a limit for every site; a utility's limit is its site's."""
+    limits = {site_of(utility): min(DEFAULT_LIMIT, workers) for utility in UTILITIES}
+    for value in values:
+        utility, _, count = value.partition("=")
+        if utility not in UTILITIES or not count.isdigit() or int(count) < 1:
+            raise ManifestError(f"--limit expects UTILITY=COUNT with a utility from {', '.join(UTILITIES)}, "
+                                f"got {value!r}")
+        limits[site_of(utility)] = min(int(count), workers)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Download Green Button data for every login in a manifest, without the GUI.",
+        epilog="Manifest fields: utility (pge, pge-mobile or myenergycenter), username, credentials "
+               "(env:NAME or file:path), start and end (YYYY-MM-DD), output, and optionally id, url, "
+               "sessions, direct_export, sync and backend.")
+    parser.add_argument("manifest", help="CSV, JSON or TOML manifest")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="jobs running at once")
+    parser.add_argument("--limit", action="append", default=[], metavar="UTILITY=COUNT",
+                        help=f"jobs running at once for one site; pge and pge-mobile share a limit "
+                             f"(default {DEFAULT_LIMIT}; repeatable)")
+    parser.add_argument("--profile", choices=PROFILES, default="fast", help="browser profile (fast is headless)")
+    parser.add_argument("--backend", choices=BACKENDS, default="selenium",
+                        help="browser backend for jobs that do not set one (cdp skips chromedriver)")
+    parser.add_argument("--output-root", help="folder for jobs without an output (default: downloads/ next to "
+                                              "the manifest)")
+    parser.add_argument("--summary", help="results file (default: <manifest>.results.json)")
+    parser.add_argument("--dry-run", action="store_true", help="check the manifest and credentials, then stop")
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    try:
+        workers = max(1, args.workers)
+        limits = parse_limits(args.limit, workers)
+        jobs = load_jobs(args.manifest, args.output_root)
+    except ManifestError as e:
+        print(f"Invalid manifest: {e}")
+        return 2
+    if not jobs:
+        print("The manifest has no jobs")
+        return 0
+    for job in jobs:
+        job["backend"] = job["backend"] or args.backend
+
+    if args.dry_run:
+        missing = 0
+        for job in jobs:
+            try:
+                resolve_credentials(job["credentials"], base_dir)
+                state = "ok"
+            except ManifestError as e:
+                state, missing = str(e), missing + 1
+            print(f"{job['id']}: {job['utility']} {job['start']} to {job['end']} -> {job['output']} ({state})")
+        print(f"{len(jobs)} jobs, {missing} with missing credentials; limits {limits}, {workers} workers")
+        return 1 if missing else 0
+
+    # One pool per utility and backend; a pool's drivers all come from the same backend.
+    pools = {}
+    for utility, backend in sorted({(job["utility"], job["backend"]) for job in jobs}):
+        build_driver = UTILITIES[utility][0].build_driver
+        sessions = max(job["sessions"] for job in jobs if job["utility"] == utility)
+        pools[utility, backend] = BrowserPool(
+            lambda path, build_driver=build_driver, backend=backend: build_driver(path, args.profile, None, backend),
+            size=limits[site_of(utility)] * sessions)
+
+    started = time.time()
+    print(f"Running {len(jobs)} jobs with {workers} workers; per-site limits: "
+          + ", ".join(f"{site}={limits[site]}" for site in sorted({site_of(job["utility"]) for job in jobs})))
+    try:
+        results = run_jobs(jobs, workers, limits,
+                           lambda job: run_job(job, pools[job["utility"], job["backend"]], args.profile, base_dir))
+    finally:
+        for pool in pools.values():
+            pool.close()
+    summary_path = args.summary or os.path.splitext(os.path.abspath(args.manifest))[0] + ".results.json"
+    summary = write_summary(summary_path, args.manifest, results, started)
+    print(f"{summary['succeeded']}/{summary['jobs']} jobs succeeded in {summary['seconds']:.0f}s; "
+          f"results saved to {summary_path}")
+    for job_id in summary["failed"]:
+        print(f"  failed: {job_id}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# backend_bench.py - Compare the Selenium and DevTools backends: per-command latency and end-to-end runs
+#
+# Needs Chrome, plus chromedriver for the selenium backend; pages come from benchmarks.mock_portal.
+# Run from the repository root: python -m benchmarks.backend_bench
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from selenium.webdriver.common.by import By
+from browser_pool import BrowserPool
+from driver_cache import BACKENDS
+from driver_profiles import PROFILES
+from form_fill import fill_form
+from benchmarks.mock_portal import MockPortal
+from benchmarks.scraper_bench import SCRAPERS, driver_factory, run_once, summarize
+
+# Command name: call made against the mock PG&E login page, given the driver and the username field.
+COMMANDS = {
+    "find_element (id)": lambda driver, field: driver.find_element(By.ID, "username"),
+    "find_element (xpath)": lambda driver, field: driver.find_element(By.XPATH, "//input[@type='password']"),
+    "execute_script": lambda driver, field: driver.execute_script("return document.readyState"),
+    "current_url": lambda driver, field: driver.current_url,
+    "get_attribute": lambda driver, field: field.get_attribute("value"),
+    "is_displayed": lambda driver, field: field.is_displayed(),
+    "clear": lambda driver, field: field.clear(),
+    "send_keys": lambda driver, field: field.send_keys("demo"),
+    "fill_form": lambda driver, field: fill_form(driver, [(field, "demo")]),
+    "click": lambda driver, field: field.click(),
+}
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of the sorted values fall."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def command_latency(backend, portal, args):
+    """Time each command on one backend; return {command: {"median": ms, "p95": ms}}."""
+    driver = driver_factory(args.profile, args.chromedriver, backend)(tempfile.gettempdir())
+    try:
+        login_url = f"{portal.base_url}/en/login"
+        driver.get(login_url)
+        field = driver.find_element(By.ID, "username")
+        timings = {}
+        for name, command in COMMANDS.items():
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                command(driver, field)
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = samples
+        samples = []
+        for _ in range(max(1, args.repeat // 10)):
+            started = time.perf_counter()
+            driver.get(login_url)
+            samples.append((time.perf_counter() - started) * 1000)
+        timings["get (page load)"] = samples
+    finally:
+        driver.quit()
+    return {name: {"median": statistics.median(samples), "p95": percentile(samples, 0.95)}
+            for name, samples in timings.items()}
+
+
+def end_to_end(backend, portal, args):
+    """Run the scraper on one backend and return its summary."""
+    pool = BrowserPool(driver_factory(args.profile, args.chromedriver, backend), size=1)
+    try:
+        runs = [run_once(args.scraper, portal, pool, args, index) for index in range(args.runs)]
+    finally:
+        pool.close()
+    return summarize(f"{args.scraper} ({backend})", runs, args.accounts if args.scraper == "myenergycenter" else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Selenium and DevTools browser backends.")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=50, help="samples per command")
+    parser.add_argument("--scraper", choices=sorted(SCRAPERS), default="pge", help="scraper for the end-to-end runs")
+    parser.add_argument("--runs", type=int, default=3, help="end-to-end runs per backend (0 to skip)")
+    parser.add_argument("--accounts", type=int, default=3, help="accounts on the mock myenergycenter portal")
+    parser.add_argument("--days", type=int, default=30, help="days of data to request")
+    parser.add_argument("--profile", choices=PROFILES, default="fast")
+    parser.add_argument("--chromedriver", help="path to chromedriver (default: the driver cache)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    # Options run_once reads for the scraper runs; every run takes the click path so backends compare alike.
+    args.direct_export, args.concurrency = False, 1
+    args.deep_links, args.no_shortcuts = None, True
+
+    results = {}
+    with MockPortal(accounts=args.accounts) as portal:
+        print(f"Mock portals at {portal.base_url}")
+        for backend in args.backends:
+            try:
+                results[backend] = {"commands": command_latency(backend, portal, args)}
+            except Exception as e:
+                print(f"{backend}: could not drive the browser: {e}")
+                results[backend] = {"error": str(e)}
+                continue
+            if args.runs:
+                results[backend]["end_to_end"] = end_to_end(backend, portal, args)
+
+    measured = [backend for backend in args.backends if "commands" in results[backend]]
+    if measured:
+        print(f"\n{'command (median / p95 ms)':<28}" + "".join(f"{backend:>20}" for backend in measured))
+        for name in list(COMMANDS) + ["get (page load)"]:
+            cells = [results[backend]["commands"][name] for backend in measured]
+            print(f"{name:<28}" + "".join(f"{cell['median']:>11.2f} / {cell['p95']:<6.2f}" for cell in cells))
+    if args.runs and measured:
+        print(f"\n{args.scraper} end to end (median of {args.runs}):")
+        for backend in measured:
+            summary = results[backend]["end_to_end"]
+            print(f"  {backend:<10}{summary['end_to_end']['median']:>8.2f}s  "
+                  f"{summary['runs'] - summary['failed']}/{summary['runs']} runs passed")
+            for error in summary["errors"]:
+                print(f"    error: {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    failed = any("error" in result or result.get("end_to_end", {}).get("failed") for result in results.values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
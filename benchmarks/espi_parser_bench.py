@@ -0,0 +1,106 @@
+# espi_parser_bench.py - Measure espi_parser throughput on a synthetic multi-year 15-minute ESPI file
+#
+# Run from the repository root: python -m benchmarks.espi_parser_bench
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from espi_parser import parse_file, iter_espi_batches, iter_espi_batches_slow
+
+FEED_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:espi="http://naesb.org/espi">
+<entry><link href="https://example.com/espi/1_1/resource/ReadingType/1" rel="self"/>
+<content><espi:ReadingType><espi:powerOfTenMultiplier>0</espi:powerOfTenMultiplier><espi:uom>72</espi:uom></espi:ReadingType></content></entry>
+"""
+
+BLOCK_HEADER = """<entry><link href="https://example.com/espi/1_1/resource/Subscription/1/UsagePoint/{meter}/MeterReading/1/IntervalBlock/{day}" rel="self"/>
+<link href="https://example.com/espi/1_1/resource/Subscription/1/UsagePoint/{meter}/MeterReading/1/IntervalBlock" rel="up"/>
+<content><espi:IntervalBlock><espi:interval><espi:duration>86400</espi:duration><espi:start>{start}</espi:start></espi:interval>
+"""
+
+# Laid out the way PG&E's Green Button XML is: indented, one element per line.
+READING = """        <espi:IntervalReading>
+          <espi:timePeriod>
+            <espi:duration>900</espi:duration>
+            <espi:start>{start}</espi:start>
+          </espi:timePeriod>
+          <espi:value>{value}</espi:value>
+        </espi:IntervalReading>
+"""
+
+
+def write_feed(path, readings, meters=1, start=1577836800):
+    """Write an ESPI feed with one IntervalBlock per meter-day of 15-minute readings."""
+    per_meter = readings // meters
+    with open(path, "w") as f:
+        f.write(FEED_HEADER)
+        for meter in range(1, meters + 1):
+            for day in range(0, per_meter, 96):
+                day_start = start + day * 900
+                f.write(BLOCK_HEADER.format(meter=meter, day=day // 96, start=day_start))
+                f.write("".join(
+                    READING.format(start=day_start + i * 900, value=(i * 37) % 2000)
+                    for i in range(min(96, per_meter - day))
+                ))
+                f.write("</espi:IntervalBlock></content></entry>\n")
+        f.write("</feed>\n")
+    return meters * per_meter
+
+
+def best_of(repeat, function):
+    """Return the fastest of several timed runs and the last result."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readings", type=int, default=2_000_000)
+    parser.add_argument("--meters", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-rate", type=float, default=1_000_000, help="fail below this many readings/s")
+    parser.add_argument("--baseline", action="store_true", help="also time the ElementTree parser")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "feed.xml")
+        total = write_feed(path, args.readings, args.meters)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"Synthetic feed: {total:,} readings, {args.meters} meters, {size_mb:.1f} MB")
+
+        elapsed, meters = best_of(args.repeat, lambda: parse_file(path))
+        parsed = sum(len(series) for series in meters.values())
+        rate = parsed / elapsed
+        print(f"espi_parser: {elapsed:.3f}s, {rate:,.0f} readings/s, "
+              f"{sum(series.nbytes for series in meters.values()) / 1024 / 1024:.1f} MB of arrays")
+
+        tracemalloc.start()
+        for _ in iter_espi_batches(path):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"Streaming peak memory: {peak / 1024 / 1024:.1f} MB")
+
+        if args.baseline:
+            elapsed_et, count = best_of(1, lambda: sum(len(batch) for _, batch in iter_espi_batches_slow(path)))
+            print(f"ElementTree baseline: {elapsed_et:.3f}s, {count / elapsed_et:,.0f} readings/s "
+                  f"({elapsed_et / elapsed:.1f}x slower)")
+
+    if parsed != total:
+        print(f"FAIL: parsed {parsed:,} of {total:,} readings")
+        return 1
+    if rate < args.min_rate:
+        print(f"FAIL: below {args.min_rate:,.0f} readings/s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
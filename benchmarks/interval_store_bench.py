@@ -0,0 +1,61 @@
+# interval_store_bench.py - Time range scans of the columnar store against re-parsing the source download
+#
+# Run from the repository root: python -m benchmarks.interval_store_bench
+import argparse
+import os
+import sys
+import tempfile
+import time
+from interval_store import IntervalStore
+from espi_parser import parse_file
+from benchmarks.espi_parser_bench import write_feed, best_of
+
+YEAR = 365 * 96
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=10.0, help="fail when a one-year scan takes longer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "download.xml")
+        total = write_feed(path, args.years * YEAR, meters=1)
+        store = IntervalStore(os.path.join(directory, "store"))
+
+        started = time.perf_counter()
+        store.ingest_files([path])
+        print(f"Ingested {total:,} readings in {time.perf_counter() - started:.3f}s")
+        meter = store.meters()[0]
+        first = int(store.read(meter).start[0])
+        year_start, year_end = first + (args.years - 1) * YEAR * 900, first + args.years * YEAR * 900
+
+        # A fresh store object per run, so the timing includes opening the memory maps.
+        def scan():
+            series = IntervalStore(store.root).read(meter, year_start, year_end)
+            return len(series), float(series.value.sum()), float(series.value.max())
+
+        elapsed, (count, kwh, peak) = best_of(args.repeat, scan)
+        print(f"One-year scan from the store: {elapsed * 1000:.2f} ms for {count:,} readings")
+
+        def reparse():
+            series = parse_file(path)[meter]
+            mask = (series.start >= year_start) & (series.start < year_end)
+            return int(mask.sum()), float(series.value[mask].sum())
+
+        elapsed_parse, (count_parse, kwh_parse) = best_of(3, reparse)
+        print(f"Re-parsing the download: {elapsed_parse * 1000:.2f} ms ({elapsed_parse / elapsed:.0f}x slower)")
+
+    if (count, kwh) != (count_parse, kwh_parse):
+        print("FAIL: store and source file disagree")
+        return 1
+    if elapsed * 1000 > args.max_ms:
+        print(f"FAIL: one-year scan slower than {args.max_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+# mock_portal.py - Local HTTP imitation of the PG&E and myenergycenter.com flows the scrapers drive
+#
+# Run from the repository root: python -m benchmarks.mock_portal --port 8765
+import argparse
+import collections
+import html
+import secrets
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from benchmarks.espi_parser_bench import FEED_HEADER, BLOCK_HEADER, READING
+
+VARIANTS = ("standard", "alternate", "spa")
+
+# The mobile PG&E site is served under this prefix; pass it as mobile_url.
+MOBILE_PREFIX = "/m"
+
+DATE_FORMATS = ("%Y-%m-%d", "%B %d, %Y", "%d %B, %Y")
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>{title}</title>
+<style>.modal {{ display: none; }} .filler {{ height: 1800px; }}</style>
+<script>
+function show(id) {{ document.getElementById(id).style.display = 'block'; }}
+function field(selector) {{ return encodeURIComponent(document.querySelector(selector).value); }}
+</script>
+</head>
+<body>{body}</body></html>
+"""
+
+# The "spa" variant renders the page body from script after a delay, like a
+# client-side app, so element lookups have to wait for it.
+SPA_BODY = """<template id="app">{body}</template>
+<script>
+setTimeout(function() {{
+    document.body.appendChild(document.getElementById('app').content.cloneNode(true));
+}}, {delay_ms});
+</script>"""
+
+PGE_LOGIN = {
+    "standard": """<form method="post" action="{action}">
+<input id="username" name="username" type="text" placeholder="Username">
+<input id="password" name="password" type="password" placeholder="Password">
+<button id="login" type="submit">Log In</button>
+</form>{error}""",
+    "alternate": """<form method="post" action="{action}">
+<input name="username" type="text" placeholder="Username">
+<input name="password" type="password" placeholder="Password">
+<button class="login-button" type="submit">Sign In</button>
+</form>{error}""",
+}
+
+PGE_MOBILE_HOME = """<nav><a href="/myaccount/account">Account</a> <a href="/myaccount/dashboard">Full Site</a></nav>"""
+
+PGE_DASHBOARD = {
+    "standard": """<nav><a href="/myaccount/usage">Energy Usage</a> <a href="/myaccount/account">Account</a></nav>
+<div class="dashboard">Welcome back.</div>""",
+    "alternate": """<nav><a href="/myaccount/energy-usage"><span>Energy Usage</span></a></nav>
+<div class="dashboard">Welcome back.</div>""",
+}
+
+PGE_USAGE = {
+    "standard": """<nav><a href="/myaccount/usage/details">Energy Usage Details</a></nav>""",
+    "alternate": """<nav><a href="/myaccount/usage-details">Usage Details</a></nav>""",
+}
+
+PGE_DETAILS = {
+    "standard": """<div class="filler">Usage chart</div>
+<button class="green-button" onclick="show('gb-modal')">Green Button</button>
+<div id="gb-modal" class="modal">
+<label><input type="radio" name="period" value="bill" checked> Last bill</label>
+<label><input type="radio" name="period" value="range"> Date range</label>
+<input id="from-date" type="text"> <input id="to-date" type="text">
+<button onclick="location.href = '/myaccount/usage/greenbutton/export?format=xml&from=' + field('#from-date') + '&to=' + field('#to-date')">Download</button>
+</div>""",
+    "alternate": """<div class="filler">Usage chart</div>
+<a href="#" onclick="show('gb-modal'); return false;">Green Button</a>
+<div id="gb-modal" class="modal">
+<label><input type="radio" name="period" id="period-bill" checked> Last bill</label>
+<label><input type="radio" name="period" id="period-range"> Select a range of days</label>
+<input id="fromDate" name="fromDate" type="text"> <input id="toDate" name="toDate" type="text">
+<a href="#" onclick="location.href = '/myaccount/usage/greenbutton/export?format=xml&from=' + field('#fromDate') + '&to=' + field('#toDate'); return false;">Download</a>
+</div>""",
+}
+
+MEC_LOGIN = """<form method="post" action="/portal/PreLogin/Validate">
+<input id="usernamex" name="username" type="text">
+<input id="passwordx" name="password" type="password">
+<button id="btnlogin" type="submit">Login</button>
+</form>{error}"""
+
+MEC_SELECT = """<select id="accountList" style="display: none"
+ onchange="location.href = '/portal/Dashboard/index?account=' + encodeURIComponent(this.value)">{options}</select>"""
+
+MEC_DROPDOWN = """<div class="bootstrap-select">
+<button type="button" data-id="accountList" onclick="show('account-menu')">{current}</button>
+<ul id="account-menu" class="dropdown-menu modal">{items}</ul>
+</div>"""
+
+MEC_USAGE = """<button id="gbloadpopup" onclick="show('gbmodal')">Green Button Download</button>
+<div id="gbmodal" class="modal">
+<input id="gbfromdatepicker" type="text" readonly> <input id="gbtodatepicker" type="text" readonly>
+<button id="btngbDataDownload" onclick="location.href = '/portal/Usage/GreenButtonDownload?fromDate=' + field('#gbfromdatepicker') + '&toDate=' + field('#gbtodatepicker')">Download</button>
+</div>"""
+
+
+def parse_date(value, default):
+    """Parse a date in any format the portals' forms produce."""
+    value = (value or "").strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return default
+
+
+def espi_feed(meter, start, end):
+    """Return an ESPI feed of 15-minute readings for start..end inclusive."""
+    parts = [FEED_HEADER]
+    day = start
+    index = 0
+    while day <= end:
+        day_start = int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+        parts.append(BLOCK_HEADER.format(meter=meter, day=index, start=day_start))
+        parts.extend(READING.format(start=day_start + i * 900, value=(i * 37 + index) % 2000) for i in range(96))
+        parts.append("</espi:IntervalBlock></content></entry>\n")
+        day += timedelta(days=1)
+        index += 1
+    parts.append("</feed>\n")
+    return "".join(parts).encode()
+
+
+class MockPortal:
+    """Serves both portals from one local HTTP server.
+
+    delay is added to every page, download_delay to every export, and the
+    variant picks the page markup: "standard" matches the scrapers' first
+    selectors, "alternate" only their fallbacks, and "spa" renders pages from
+    script after render_delay seconds. hits counts requests per path.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, accounts=3, delay=0.0, download_delay=0.0, variant="standard",
+                 render_delay=0.3, username="demo", password="demo"):
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown variant: {variant}. Expected one of: {', '.join(VARIANTS)}.")
+        self.accounts = [(str(1001 + i), f"Account {1001 + i} - {100 + i} Main St") for i in range(accounts)]
+        self.delay = delay
+        self.download_delay = download_delay
+        self.variant = variant
+        self.render_delay = render_delay
+        self.username = username
+        self.password = password
+        self.sessions = {}
+        self.hits = collections.Counter()
+        self.lock = threading.Lock()
+        portal = self
+
+        class Handler(MockHandler):
+            pass
+        Handler.portal = portal
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        """Return the server's base URL."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread and return self."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def markup(self, pages):
+        """Pick the variant's markup from {variant: markup}."""
+        return pages.get(self.variant, pages["standard"])
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler for MockPortal."""
+    portal = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def session(self):
+        """Return the session for the request's cookie, or None."""
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "MOCKSESSION":
+                return self.portal.sessions.get(value)
+        return None
+
+    def form(self):
+        """Return the url-encoded POST body as a dict."""
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else ""
+        return {key: values[-1] for key, values in parse_qs(body).items()}
+
+    def send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        """Send a complete response."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def redirect(self, location, headers=None):
+        """Redirect with 302."""
+        self.send(302, headers=dict(headers or {}, Location=location))
+
+    def page(self, title, body):
+        """Send an HTML page after the configured delay."""
+        portal = self.portal
+        time.sleep(portal.delay)
+        if portal.variant == "spa":
+            body = SPA_BODY.format(body=body, delay_ms=int(portal.render_delay * 1000))
+        self.send(200, PAGE.format(title=html.escape(title), body=body).encode())
+
+    def login(self, form, success):
+        """Check posted credentials; start a session and redirect on success."""
+        portal = self.portal
+        if form.get("username") != portal.username or form.get("password") != portal.password:
+            return False
+        token = secrets.token_hex(16)
+        with portal.lock:
+            portal.sessions[token] = {"account": portal.accounts[0][0] if portal.accounts else ""}
+        self.redirect(success, {"Set-Cookie": f"MOCKSESSION={token}; Path=/; HttpOnly"})
+        return True
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        self.route({})
+
+    def do_POST(self):
+        self.route(self.form())
+
+    def route(self, form):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        query.update(form)
+        portal = self.portal
+        with portal.lock:
+            portal.hits[path] += 1
+
+        if path in ("/en/login", MOBILE_PREFIX, f"{MOBILE_PREFIX}/login"):
+            action = "/en/login" if path == "/en/login" else f"{MOBILE_PREFIX}/login"
+            success = "/myaccount/dashboard" if path == "/en/login" else f"{MOBILE_PREFIX}/home"
+            if self.command == "POST" and self.login(query, success):
+                return
+            error = '<p class="error">Invalid username or password.</p>' if self.command == "POST" else ""
+            return self.page("PG&E Login", portal.markup(PGE_LOGIN).format(action=action, error=error))
+        if path == "/portal/PreLogin/Validate":
+            if self.command == "POST" and self.login(query, "/portal/Dashboard/index"):
+                return
+            error = '<p class="error">Invalid username or password.</p>' if self.command == "POST" else ""
+            return self.page("Login", MEC_LOGIN.format(error=error))
+
+        session = self.session()
+        if session is None:
+            if path.startswith("/portal"):
+                return self.redirect("/portal/PreLogin/Validate")
+            if path.startswith(("/myaccount", MOBILE_PREFIX)):
+                return self.redirect("/en/login")
+            return self.send(404, b"Not found")
+
+        if path == f"{MOBILE_PREFIX}/home":
+            return self.page("PG&E Mobile", PGE_MOBILE_HOME)
+        if path in ("/myaccount/dashboard", "/myaccount/account"):
+            return self.page("PG&E Dashboard", portal.markup(PGE_DASHBOARD))
+        if path in ("/myaccount/usage", "/myaccount/energy-usage"):
+            return self.page("Energy Usage", portal.markup(PGE_DASHBOARD) + portal.markup(PGE_USAGE))
+        if path in ("/myaccount/usage/details", "/myaccount/usage-details"):
+            return self.page("Energy Usage Details", portal.markup(PGE_DETAILS))
+        if path == "/myaccount/usage/greenbutton/export":
+            return self.export(session, query.get("from"), query.get("to"), query.get("account"))
+
+        if path == "/portal/Dashboard/index":
+            if query.get("account"):
+                session["account"] = query["account"]
+                return self.redirect("/portal/Dashboard/index")
+            return self.page("Dashboard", self.account_dropdown(session))
+        if path == "/portal/Usage/Index":
+            return self.page("Usage", self.account_dropdown(session) + MEC_USAGE)
+        if path == "/portal/Usage/GreenButtonDownload":
+            return self.export(session, query.get("fromDate"), query.get("toDate"), query.get("accountId"))
+        self.send(404, b"Not found")
+
+    def account_dropdown(self, session):
+        """Render the account selector; the alternate variant has no <select> behind it."""
+        portal = self.portal
+        current = dict(portal.accounts).get(session["account"], "")
+        items = "".join(
+            f'<li onclick="location.href = \'/portal/Dashboard/index?account={account}\'"><a>{html.escape(label)}</a></li>'
+            for account, label in portal.accounts
+        )
+        markup = MEC_DROPDOWN.format(current=html.escape(current), items=items)
+        if portal.variant != "alternate":
+            options = "".join(
+                f'<option value="{account}"{" selected" if account == session["account"] else ""}>'
+                f'{html.escape(label)}</option>'
+                for account, label in portal.accounts
+            )
+            markup = MEC_SELECT.format(options=options) + markup
+        return markup
+
+    def export(self, session, start, end, account):
+        """Send a Green Button file for the session's (or the requested) account."""
+        portal = self.portal
+        today = date.today()
+        end_date = parse_date(end, today)
+        start_date = min(parse_date(start, end_date - timedelta(days=30)), end_date)
+        account = account or session["account"]
+        time.sleep(portal.download_delay)
+        body = espi_feed(account, start_date, end_date)
+        name = f"GreenButton_{account}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.xml"
+        self.send(200, body, "application/xml", {"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the mock PG&E and myenergycenter.com portals.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every page")
+    parser.add_argument("--download-delay", type=float, default=0.0, help="seconds added to every export")
+    parser.add_argument("--variant", choices=VARIANTS, default="standard")
+    parser.add_argument("--render-delay", type=float, default=0.3, help="script render delay of the spa variant")
+    args = parser.parse_args()
+
+    portal = MockPortal(args.host, args.port, args.accounts, args.delay, args.download_delay, args.variant,
+                        args.render_delay).start()
+    base = portal.base_url
+    print(f"Mock portals at {base} (username demo, password demo)")
+    print(f"  PG&E desktop login:   {base}/en/login")
+    print(f"  PG&E mobile login:    {base}{MOBILE_PREFIX}/")
+    print(f"  myenergycenter login: {base}/portal/PreLogin/Validate")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        portal.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
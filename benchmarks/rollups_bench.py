@@ -0,0 +1,98 @@
+# rollups_bench.py - Time batched rollups over many meters against a per-reading Python loop
+#
+# Run from the repository root: python -m benchmarks.rollups_bench
+import argparse
+import sys
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+from espi_parser import IntervalSeries, LOCAL_TIMEZONE
+from rollups import MeterBatch, pge_holidays
+from benchmarks.espi_parser_bench import best_of
+
+YEAR_START = 1672560000  # 2023-01-01 08:00 UTC, local midnight
+
+
+def make_series(meters, days, seed=0):
+    """Build synthetic 15-minute series for many meters."""
+    rng = np.random.default_rng(seed)
+    start = YEAR_START + np.arange(days * 96, dtype=np.int64) * 900
+    count = len(start)
+    return [
+        IntervalSeries(f"meter{index}", start, np.full(count, 900, dtype=np.int32),
+                       rng.integers(0, 2500, count).astype(np.float64), np.zeros(count, dtype=np.int16), 72)
+        for index in range(meters)
+    ]
+
+
+def naive(series_list):
+    """Daily and monthly totals, monthly peaks and E-TOU-D totals one reading at a time."""
+    zone = ZoneInfo(LOCAL_TIMEZONE)
+    holidays = set(pge_holidays(range(2022, 2026)))
+    results = {}
+    for series in series_list:
+        daily, monthly, peaks, tou = {}, {}, {}, {}
+        for start, duration, value in zip(series.start.tolist(), series.duration.tolist(), series.value.tolist()):
+            local = datetime.fromtimestamp(start, zone)
+            kwh = value / 1000.0
+            day, month = local.date(), (local.year, local.month)
+            daily[day] = daily.get(day, 0.0) + kwh
+            monthly[month] = monthly.get(month, 0.0) + kwh
+            peaks[month] = max(peaks.get(month, 0.0), kwh * 3600.0 / duration)
+            working = local.weekday() < 5 and day not in holidays
+            period = "peak" if working and 17 <= local.hour < 20 else "off_peak"
+            tou[(month, period)] = tou.get((month, period), 0.0) + kwh
+        results[series.meter] = (daily, monthly, peaks, tou)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--meters", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--naive-meters", type=int, default=5, help="meters timed with the Python loop")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    args = parser.parse_args()
+
+    series_list = make_series(args.meters, args.days)
+    readings = sum(len(series) for series in series_list)
+
+    def batched():
+        batch = MeterBatch(series_list)
+        return (batch.totals("day"), batch.totals("month"), batch.peak_demand("month"),
+                batch.tou_totals("E-TOU-D", "month"))
+
+    elapsed, (daily, monthly, peaks, tou) = best_of(args.repeat, batched)
+    rate = readings / elapsed
+    print(f"Batched rollups: {readings:,} readings from {args.meters} meters in {elapsed:.3f}s "
+          f"({rate / 1e6:.1f}M readings/s)")
+
+    subset = series_list[:args.naive_meters]
+    started = time.perf_counter()
+    expected = naive(subset)
+    naive_elapsed = time.perf_counter() - started
+    naive_rate = sum(len(series) for series in subset) / naive_elapsed
+    print(f"Python loop: {naive_rate / 1e6:.2f}M readings/s ({rate / naive_rate:.0f}x slower, "
+          f"{readings / naive_rate:.0f}s estimated for all meters)")
+
+    for series in subset:
+        day_totals, month_totals, month_peaks, tou_totals = expected[series.meter]
+        months = {(label.year, label.month): value for label, value in monthly.for_meter(series.meter).items()}
+        peak_months = {(label.year, label.month): value for label, value in peaks.for_meter(series.meter).items()}
+        tou_months = {(label.year, label.month): value for label, value in tou["peak"].for_meter(series.meter).items()}
+        pairs = [(daily.for_meter(series.meter), day_totals), (months, month_totals), (peak_months, month_peaks),
+                 (tou_months, {month: value for (month, period), value in tou_totals.items() if period == "peak"})]
+        for got, want in pairs:
+            if not all(key in got and np.isclose(got[key], value) for key, value in want.items()):
+                print(f"FAIL: batched and Python loop rollups disagree for {series.meter}")
+                return 1
+    if rate / naive_rate < args.min_speedup:
+        print(f"FAIL: batched rollups less than {args.min_speedup:.0f}x faster than the Python loop")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# scraper_bench.py - Time the scrapers end to end against the local mock portals, without network access
+#
+# Needs Chrome and chromedriver on this machine; the portals are served by benchmarks.mock_portal.
+# Run from the repository root: python -m benchmarks.scraper_bench --scraper all
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from browser_pool import BrowserPool
+from deep_links import DeepLinkMemory
+from driver_cache import BACKENDS, launch_chrome
+from driver_profiles import PROFILES, apply_profile, prepare_driver
+from green_button_export import PGE_ENDPOINT, MYENERGYCENTER_ENDPOINT
+from myenergycenter_scraper import MyEnergyCenterJob
+from pge_mobile_scraper import PGEMobileJob
+from pge_scraper import PGEJob
+from session_cache import SessionCache
+from telemetry import Tracer, read_spans
+from benchmarks.mock_portal import MockPortal, MOBILE_PREFIX, VARIANTS
+
+# Scraper name: (job class, portal name used for its spans)
+SCRAPERS = {
+    "pge": (PGEJob, "pge"),
+    "pge-mobile": (PGEMobileJob, "pge-mobile"),
+    "myenergycenter": (MyEnergyCenterJob, "myenergycenter"),
+}
+
+
+def driver_factory(profile, chromedriver=None, backend="selenium"):
+    """Return a BrowserPool factory that launches Chrome on a backend, with the given or the cached chromedriver."""
+    def factory(download_path):
+        options = webdriver.ChromeOptions()
+        options.add_experimental_option("prefs", {"download.default_directory": download_path,
+                                                  "download.prompt_for_download": False})
+        apply_profile(options, profile)
+        if chromedriver and backend == "selenium":
+            driver = webdriver.Chrome(service=Service(chromedriver), options=options)
+        else:
+            driver = launch_chrome(options, backend)
+        return prepare_driver(driver, download_path, profile)
+    return factory
+
+
+def local_endpoint(endpoint, base_url):
+    """Return a copy of an export endpoint pointed at the mock portal."""
+    path = endpoint["url"].split("/", 3)[3]
+    return dict(endpoint, url=f"{base_url}/{path}")
+
+
+def build_worker(name, portal, pool, workdir, tracer, args):
+    """Create one scraper run against the mock portal."""
+    job_class = SCRAPERS[name][0]
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=args.days - 1)
+    common = dict(pool=pool, profile=args.profile, session_cache=SessionCache(os.path.join(workdir, "sessions")),
+                  direct_export=args.direct_export, tracer=tracer, base_url=portal.base_url)
+    if name == "myenergycenter":
+        return job_class(
+            f"{portal.base_url}/portal/PreLogin/Validate", portal.username, portal.password,
+            start.isoformat(), end.isoformat(), os.path.join(workdir, "downloads"),
+            export_endpoint=local_endpoint(MYENERGYCENTER_ENDPOINT, portal.base_url),
+            concurrency=args.concurrency, **common)
+    common.update(deep_links=args.deep_links, shortcuts=not args.no_shortcuts)
+    if name == "pge-mobile":
+        common["mobile_url"] = portal.base_url + MOBILE_PREFIX
+    return job_class(
+        portal.username, portal.password, start, end, os.path.join(workdir, "downloads"),
+        export_endpoint=local_endpoint(PGE_ENDPOINT, portal.base_url), **common)
+
+
+def run_once(name, portal, pool, args, index):
+    """Run a scraper once and return its spans and outcome."""
+    workdir = tempfile.mkdtemp(prefix="youpower-bench-")
+    try:
+        os.makedirs(os.path.join(workdir, "downloads"))
+        telemetry_dir = os.path.join(workdir, "telemetry")
+        tracer = Tracer(SCRAPERS[name][1], telemetry_dir, run_id=f"{name}-{index}")
+        worker = build_worker(name, portal, pool, workdir, tracer, args)
+        started = time.monotonic()
+        ok, message = worker.execute()
+        elapsed = time.monotonic() - started
+        spans = list(read_spans(telemetry_dir))
+        downloads = len(os.listdir(os.path.join(workdir, "downloads")))
+        return {"ok": ok, "message": message, "seconds": elapsed, "downloads": downloads,
+                "page_loads_saved": getattr(worker, "page_loads_saved", 0), "spans": spans}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def summarize(name, runs, accounts):
+    """Reduce a scraper's runs to median step times, end-to-end time and accounts per minute."""
+    steps = {}
+    for run in runs:
+        per_run = {}
+        for span in run["spans"]:
+            if span["span"] == "run":
+                continue
+            key = f"{span['span']} {span['step']}" if span.get("step") else span["span"]
+            per_run[key] = per_run.get(key, 0.0) + span["seconds"]
+        for key, seconds in per_run.items():
+            steps.setdefault(key, []).append(seconds)
+    totals = [run["seconds"] for run in runs]
+    passed = [run for run in runs if run["ok"]]
+    median = statistics.median(totals) if totals else 0.0
+    return {
+        "scraper": name,
+        "runs": len(runs),
+        "failed": len(runs) - len(passed),
+        "end_to_end": {"median": median, "min": min(totals, default=0.0), "max": max(totals, default=0.0)},
+        "accounts_per_minute": accounts * 60.0 / median if passed and median else 0.0,
+        "page_loads_saved": sum(run.get("page_loads_saved", 0) for run in runs),
+        "steps": {key: statistics.median(values) for key, values in steps.items()},
+        "errors": sorted({run["message"] for run in runs if not run["ok"]}),
+    }
+
+
+def print_summary(summary):
+    """Print one scraper's results."""
+    end_to_end = summary["end_to_end"]
+    print(f"\n{summary['scraper']}: {summary['runs'] - summary['failed']}/{summary['runs']} runs passed; "
+          f"end to end median {end_to_end['median']:.2f}s (min {end_to_end['min']:.2f}s, "
+          f"max {end_to_end['max']:.2f}s); {summary['accounts_per_minute']:.1f} accounts/min")
+    if summary["page_loads_saved"]:
+        print(f"  deep links saved {summary['page_loads_saved']} page loads across runs")
+    for key, seconds in sorted(summary["steps"].items(), key=lambda item: -item[1]):
+        print(f"  {key:<40}{seconds:>8.3f}s")
+    for error in summary["errors"]:
+        print(f"  error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against the local mock portals.")
+    parser.add_argument("--scraper", choices=sorted(SCRAPERS) + ["all"], default="all")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--accounts", type=int, default=3, help="accounts on the mock myenergycenter portal")
+    parser.add_argument("--days", type=int, default=30, help="days of data to request")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds the mock adds to every page")
+    parser.add_argument("--download-delay", type=float, default=0.0, help="seconds the mock adds to every export")
+    parser.add_argument("--variant", choices=VARIANTS, default="standard")
+    parser.add_argument("--profile", choices=PROFILES, default="fast")
+    parser.add_argument("--direct-export", action="store_true", help="export over HTTP instead of the dialogs")
+    parser.add_argument("--concurrency", type=int, default=1, help="myenergycenter browser sessions")
+    parser.add_argument("--fresh-driver", action="store_true", help="launch a new browser for every run")
+    parser.add_argument("--no-shortcuts", action="store_true",
+                        help="always take the click path to the Green Button page")
+    parser.add_argument("--backend", choices=BACKENDS, default="selenium", help="browser backend")
+    parser.add_argument("--chromedriver", help="path to chromedriver (default: the driver cache)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    names = sorted(SCRAPERS) if args.scraper == "all" else [args.scraper]
+    summaries = []
+    with MockPortal(accounts=args.accounts, delay=args.delay, download_delay=args.download_delay,
+                    variant=args.variant) as portal:
+        print(f"Mock portals at {portal.base_url} ({args.variant} pages)")
+        for name in names:
+            # Shortcuts are learned on the first run and used by the later ones; none leak into ~/.youpower.
+            shortcut_dir = tempfile.mkdtemp(prefix="youpower-bench-links-")
+            args.deep_links = DeepLinkMemory(os.path.join(shortcut_dir, "deep_links.json"))
+            pool = BrowserPool(driver_factory(args.profile, args.chromedriver, args.backend),
+                               size=max(1, args.concurrency), max_uses=1 if args.fresh_driver else 25)
+            try:
+                runs = [run_once(name, portal, pool, args, index) for index in range(args.runs)]
+            finally:
+                pool.close()
+                shutil.rmtree(shortcut_dir, ignore_errors=True)
+            accounts = args.accounts if name == "myenergycenter" else 1
+            summary = summarize(name, runs, accounts)
+            print_summary(summary)
+            summaries.append(summary)
+        print(f"\nPages served: {sum(portal.hits.values())}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summaries, f, indent=2)
+    return 1 if any(summary["failed"] for summary in summaries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# startup_bench.py - Time each GUI from process start to a visible window and report the slowest imports
+#
+# Run from the repository root: python -m benchmarks.startup_bench
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point: window class
+ENTRY_POINTS = {
+    "youpower_pge.py": "PGEScraperApp",
+    "youpower_2pge.py": "PGEScraperApp",
+    "youpower (1).py": "AutomationApp",
+}
+
+# Modules the windows should not have to wait for.
+DEFERRED = ("selenium", "webdriver_manager", "numpy", "requests", "psutil", "cryptography")
+
+# Runs in a fresh interpreter: build the window the way the entry point does and report when it is up.
+CHILD = """
+import importlib.util, json, sys, time
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+spec = importlib.util.spec_from_file_location("entry_point", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+window = getattr(module, sys.argv[2])()
+window.show()
+app.processEvents()
+print(json.dumps({"shown": time.time(), "loaded": [name for name in %r if name in sys.modules]}))
+""" % (DEFERRED,)
+
+
+def launch(script, window_class, importtime=False):
+    """Start an entry point in a new interpreter; return (seconds to window, deferred modules loaded, stderr)."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [
+        "-c", CHILD, os.path.join(ROOT, script), window_class]
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    started = time.time()
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{script} failed to start:\n{result.stderr.strip()}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["shown"] - started, report["loaded"], result.stderr
+
+
+def slowest_imports(stderr, top):
+    """Return the top (cumulative microseconds, module) pairs from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GUI cold start and report import times.")
+    parser.add_argument("--repeat", type=int, default=3, help="launches per entry point; the fastest counts")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--max-seconds", type=float, default=1.0, help="fail when a window takes longer")
+    args = parser.parse_args()
+
+    failed = False
+    for script, window_class in ENTRY_POINTS.items():
+        timings = []
+        for _ in range(args.repeat):
+            seconds, loaded, _ = launch(script, window_class)
+            timings.append(seconds)
+        _, _, stderr = launch(script, window_class, importtime=True)
+        best = min(timings)
+        print(f"\n{script}: window shown {best:.2f}s after launch (slowest of {args.repeat}: {max(timings):.2f}s)")
+        if loaded:
+            print(f"  loaded before the window: {', '.join(loaded)}")
+        print(f"  {'cumulative ms':>14}  module")
+        for cumulative, name in slowest_imports(stderr, args.top):
+            print(f"  {cumulative / 1000:>14.1f}  {name}")
+        if best > args.max_seconds or loaded:
+            failed = True
+
+    if failed:
+        print(f"\nFAIL: a window took longer than {args.max_seconds}s or waited for the automation stack")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# tariffs_bench.py - Time billing thousands of meters under dozens of rate plans
+#
+# Run from the repository root: python -m benchmarks.tariffs_bench
+import argparse
+import copy
+import sys
+import time
+import numpy as np
+from espi_parser import IntervalSeries
+from rollups import MeterBatch
+from tariffs import PGE_RATE_PLANS, compare, cheapest
+from benchmarks.rollups_bench import YEAR_START
+
+
+def make_hourly_series(meters, days, seed=0):
+    """Build synthetic hourly series for many meters."""
+    rng = np.random.default_rng(seed)
+    start = YEAR_START + np.arange(days * 24, dtype=np.int64) * 3600
+    count = len(start)
+    return [
+        IntervalSeries(f"meter{index}", start, np.full(count, 3600, dtype=np.int32),
+                       rng.integers(0, 3000, count).astype(np.float64), np.zeros(count, dtype=np.int16), 72)
+        for index in range(meters)
+    ]
+
+
+def make_plans(count):
+    """Return count plans: the built-in PG&E plans with their prices scaled up and down."""
+    plans = {}
+    scale = 0.8
+    while len(plans) < count:
+        for name, plan in PGE_RATE_PLANS.items():
+            variant = copy.deepcopy(plan)
+            for prices in variant["energy"].values():
+                for period in prices:
+                    prices[period] = round(prices[period] * scale, 4)
+            plans[f"{name} x{scale:.2f}"] = variant
+            if len(plans) == count:
+                break
+        scale += 0.05
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--meters", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--plans", type=int, default=36)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="fail when billing takes longer")
+    args = parser.parse_args()
+
+    series_list = make_hourly_series(args.meters, args.days)
+    plans = make_plans(args.plans)
+    readings = sum(len(series) for series in series_list)
+
+    started = time.perf_counter()
+    batch = MeterBatch(series_list)
+    batch.hourly_profile("month")
+    batch.day_counts("month")
+    profiled = time.perf_counter() - started
+    bills = compare(batch, plans)
+    choices = cheapest(bills)
+    elapsed = time.perf_counter() - started
+    print(f"Profiled {readings:,} readings from {args.meters} meters in {profiled:.2f}s")
+    print(f"Priced {len(plans)} plans in {elapsed - profiled:.2f}s "
+          f"({(elapsed - profiled) / len(plans) * 1000:.1f} ms per plan for all meters)")
+    print(f"Total: {elapsed:.2f}s; most common cheapest plan: {max(set(choices), key=choices.count)}")
+
+    if elapsed > args.max_seconds:
+        print(f"FAIL: billing took longer than {args.max_seconds}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
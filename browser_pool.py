@@ -0,0 +1,180 @@
+# browser_pool.py - Bounded pool of pre-launched Chrome drivers with lease/return semantics
+import os
+import queue
+import tempfile
+import threading
+from contextlib import contextmanager
+from lazy_import import lazy
+
+# Only needed to measure browser memory, so loaded on first use.
+psutil = lazy("psutil")
+
+
+class BrowserPool:
+    """Keeps up to ``size`` configured drivers warm and hands them out one job at a time.
+
+    ``factory`` is called with a download directory and must return a new driver.
+    Drivers are reset between leases and recycled after ``max_uses`` leases or
+    once the browser process tree grows past ``max_rss_mb``.
+    """
+
+    def __init__(self, factory, size=2, max_uses=25, max_rss_mb=1024, download_path=None):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.download_path = download_path or tempfile.gettempdir()
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.uses = {}
+        self.total = 0
+        self.closed = False
+
+    def _reserve(self):
+        """Reserve room for one more driver, returning False when the pool is full."""
+        with self.lock:
+            if self.closed or self.total >= self.size:
+                return False
+            self.total += 1
+            return True
+
+    def _launch(self):
+        """Start a new driver in a reserved slot."""
+        try:
+            driver = self.factory(self.download_path)
+        except Exception:
+            with self.lock:
+                self.total -= 1
+            raise
+        self.uses[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver):
+        """Quit a driver and free its slot."""
+        self.uses.pop(id(driver), None)
+        with self.lock:
+            self.total -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def warm(self, count=None, background=False):
+        """Pre-launch drivers until ``count`` (default: the pool size) are running."""
+        if background:
+            threading.Thread(target=self.warm, args=(count,), daemon=True).start()
+            return
+        for _ in range((count or self.size) - self.total):
+            if not self._reserve():
+                break
+            try:
+                self.idle.put(self._launch())
+            except Exception as e:
+                print(f"Could not pre-launch browser: {e}")
+                break
+
+    @staticmethod
+    def healthy(driver):
+        """Return True when the driver still answers commands."""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def rss_mb(driver):
+        """Return the resident memory of the driver's whole process tree in MB."""
+        try:
+            process = psutil.Process(driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except (psutil.Error, AttributeError):
+            return 0.0
+
+    @staticmethod
+    def set_download_path(driver, download_path):
+        """Point the browser's downloads at download_path."""
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": os.path.abspath(download_path),
+            "eventsEnabled": True,
+        })
+
+    def reset(self, driver):
+        """Close extra tabs and clear cookies and site data left by the previous job."""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        origin = driver.execute_script("return window.location.origin")
+        if origin and origin.startswith("http"):
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        driver.get("about:blank")
+        self.set_download_path(driver, self.download_path)
+
+    def acquire(self, download_path, timeout=None):
+        """Lease a healthy driver whose downloads go to download_path."""
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser became available in the pool")
+        try:
+            while True:
+                try:
+                    driver = self.idle.get_nowait()
+                except queue.Empty:
+                    if not self._reserve():
+                        raise RuntimeError("Browser pool is closed")
+                    driver = self._launch()
+                    break
+                if self.healthy(driver):
+                    break
+                print("Recycling unresponsive browser")
+                self._discard(driver)
+            self.set_download_path(driver, download_path)
+            self.uses[id(driver)] += 1
+            return driver
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, driver):
+        """Return a leased driver, recycling it if it is worn out or unhealthy."""
+        try:
+            if self.closed or self.uses.get(id(driver), 0) >= self.max_uses:
+                self._discard(driver)
+                return
+            if self.max_rss_mb and self.rss_mb(driver) > self.max_rss_mb:
+                print("Recycling browser over memory limit")
+                self._discard(driver)
+                return
+            try:
+                self.reset(driver)
+            except Exception as e:
+                print(f"Recycling browser that failed to reset: {e}")
+                self._discard(driver)
+                return
+            self.idle.put(driver)
+        finally:
+            self.slots.release()
+
+    @contextmanager
+    def lease(self, download_path, timeout=None):
+        """Context manager around acquire/release."""
+        driver = self.acquire(download_path, timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Quit every idle driver; leased drivers are quit when they are released."""
+        self.closed = True
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
@@ -1,20 +1,52 @@
+import argparse
+import importlib.util
+import os
 import subprocess
 import sys
 
-def build_exe():
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def lazy_modules(script):
+    """Import a script without running it and return the modules it loads through lazy_import.
+
+    PyInstaller only follows import statements, so these are passed to it as hidden imports.
+    """
+    sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location("build_target", os.path.join(ROOT, script))
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    import lazy_import
+    return list(lazy_import.REGISTERED)
+
+
+def build_exe(mode="onefile", script="youpower_pge.py"):
     print("Building YouPower PG&E Scraper executable...")
     try:
-        subprocess.check_call([
+        command = [
             'pyinstaller',
-            '--onefile',
+            f'--{mode}',
             '--noconsole',
             '--icon=icon.ico',
             '--name=YouPowerPGE',
-            'youpower_pge.py'
-        ])
-        print("Build successful! Executable is in the dist folder.")
+        ]
+        command += [f'--hidden-import={name}' for name in lazy_modules(script)]
+        if mode == "onedir":
+            # Start-up build: the bundle is not unpacked to a temp folder on every
+            # launch, and modules load from precompiled bytecode in the archive
+            # without UPX decompression.
+            command += ['--noupx', '--exclude-module=tkinter', '--noconfirm']
+        subprocess.check_call(command + [script])
+        if mode == "onedir":
+            print("Build successful! Run dist/YouPowerPGE/YouPowerPGE; ship the whole dist/YouPowerPGE folder.")
+        else:
+            print("Build successful! Executable is in the dist folder.")
     except Exception as e:
         print(f"Build failed: {e}")
 
+
 if __name__ == "__main__":
-    build_exe()
+    parser = argparse.ArgumentParser(description="Build the YouPower executable with PyInstaller.")
+    parser.add_argument("--mode", choices=("onefile", "onedir"), default="onefile",
+                        help="onedir starts much faster; onefile is a single portable .exe")
+    args = parser.parse_args()
+    build_exe(args.mode)
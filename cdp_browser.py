@@ -0,0 +1,891 @@
+# cdp_browser.py - Drive Chrome directly over the DevTools Protocol websocket with asyncio, without chromedriver
+#
+# CDPBrowser and CDPPage are the native asyncio API. CDPDriver wraps them in the
+# subset of Selenium's WebDriver the scrapers use, so a run can switch backends
+# with launch_chrome(options, backend="cdp") and keep WebDriverWait, the
+# expected conditions, PageReadiness and SelectorResolver unchanged.
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from lazy_import import lazy
+from driver_cache import CHROME_COMMANDS, WINDOWS_CHROME_DIRS
+
+# The facade raises Selenium's exceptions so waits and callers treat both backends alike.
+exceptions = lazy("selenium.common.exceptions")
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+DEFAULT_PAGE_LOAD_TIMEOUT = 60
+# Seconds to wait for a command's reply, and for a page script (Selenium's default script timeout).
+DEFAULT_COMMAND_TIMEOUT = 30
+DEFAULT_SCRIPT_TIMEOUT = 30
+# Seconds an input action is given to start a navigation before it is taken to have none.
+NAVIGATION_GRACE = 0.1
+NODE_KEY = "__ypNode"
+STALE_MARKER = "youpower: stale node"
+
+# Runs a Selenium-style function body. DOM nodes passed in or returned are kept in a
+# per-document registry and cross the wire as {"__ypNode": [document token, index]},
+# so a script that takes or returns elements is still one round trip. The random
+# token makes a handle from an earlier document stale instead of naming whatever
+# node the new document registered under the same index.
+SCRIPT_WRAPPER = """(function() {
+var nodes = window.__ypNodes || (window.__ypNodes = []);
+var doc = window.__ypDocument || (window.__ypDocument = Math.random().toString(36).slice(2) + Date.now().toString(36));
+function decode(value) {
+    if (Array.isArray(value)) return value.map(decode);
+    if (value && typeof value === 'object') {
+        if ('%(key)s' in value) {
+            var ref = value['%(key)s'];
+            var node = ref[0] === doc ? nodes[ref[1]] : null;
+            if (!node || !node.isConnected) throw new Error('%(stale)s');
+            return node;
+        }
+        var out = {};
+        for (var k in value) out[k] = decode(value[k]);
+        return out;
+    }
+    return value;
+}
+function encode(value) {
+    if (value === undefined || value === null) return null;
+    if (value instanceof Node) {
+        var index = nodes.indexOf(value);
+        if (index < 0) { index = nodes.length; nodes.push(value); }
+        return {'%(key)s': [doc, index]};
+    }
+    if (Array.isArray(value) || value instanceof NodeList || value instanceof HTMLCollection) {
+        return Array.prototype.map.call(value, encode);
+    }
+    if (typeof value === 'object') {
+        var out = {};
+        for (var k in value) out[k] = encode(value[k]);
+        return out;
+    }
+    return value;
+}
+var result = (function() { %%s }).apply(window, decode(%%s));
+return (result && typeof result.then === 'function') ? result.then(encode) : encode(result);
+})()""" % {"key": NODE_KEY, "stale": STALE_MARKER}
+
+# Finds elements for a Selenium locator under an optional root node.
+FIND_SCRIPT = """
+var by = arguments[0], value = arguments[1], root = arguments[2] || document, multiple = arguments[3];
+var found;
+switch (by) {
+    case 'id':
+        found = root === document ? [document.getElementById(value)]
+                                  : [root.querySelector('#' + CSS.escape(value))];
+        break;
+    case 'name': found = root.querySelectorAll('[name="' + CSS.escape(value) + '"]'); break;
+    case 'css selector': found = root.querySelectorAll(value); break;
+    case 'class name': found = root.getElementsByClassName(value); break;
+    case 'tag name': found = root.getElementsByTagName(value); break;
+    case 'link text':
+    case 'partial link text':
+        found = Array.prototype.filter.call(root.getElementsByTagName('a'), function(a) {
+            var text = (a.innerText || a.textContent || '').trim();
+            return by === 'link text' ? text === value : text.indexOf(value) !== -1;
+        });
+        break;
+    case 'xpath':
+        var snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        found = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) found.push(snapshot.snapshotItem(i));
+        break;
+    default: throw new Error('Unsupported locator strategy: ' + by);
+}
+found = Array.prototype.filter.call(found, function(node) { return node && node.nodeType === 1; });
+return multiple ? found : (found[0] || null);
+"""
+
+# Scrolls an element into view and returns where a real click would land.
+CLICK_POINT_SCRIPT = """
+var el = arguments[0];
+el.scrollIntoView({block: 'center', inline: 'center'});
+var rect = el.getBoundingClientRect();
+if (!rect.width || !rect.height) return null;
+var x = rect.left + rect.width / 2, y = rect.top + rect.height / 2;
+var hit = document.elementFromPoint(x, y);
+return (hit === el || el.contains(hit)) ? [x, y] : null;
+"""
+
+FOCUS_SCRIPT = """
+var el = arguments[0];
+el.focus();
+if (typeof el.value === 'string' && el.setSelectionRange) {
+    try { el.setSelectionRange(el.value.length, el.value.length); } catch (e) {}
+}
+"""
+
+CLEAR_SCRIPT = """
+var el = arguments[0];
+el.focus();
+el.value = '';
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+# Selenium Keys characters the scrapers send, as (key, code, keyCode, text).
+SPECIAL_KEYS = {
+    "\ue003": ("Backspace", "Backspace", 8, ""),
+    "\ue004": ("Tab", "Tab", 9, ""),
+    "\ue006": ("Enter", "Enter", 13, "\r"),
+    "\ue007": ("Enter", "NumpadEnter", 13, "\r"),
+    "\ue00c": ("Escape", "Escape", 27, ""),
+    "\ue012": ("ArrowLeft", "ArrowLeft", 37, ""),
+    "\ue013": ("ArrowUp", "ArrowUp", 38, ""),
+    "\ue014": ("ArrowRight", "ArrowRight", 39, ""),
+    "\ue015": ("ArrowDown", "ArrowDown", 40, ""),
+    "\ue017": ("Delete", "Delete", 46, ""),
+}
+
+
+class CDPError(Exception):
+    """Raised when Chrome rejects a command or the DevTools connection fails."""
+
+
+class ScriptError(CDPError):
+    """Raised when a script run in the page throws."""
+
+
+class CDPTimeoutError(CDPError):
+    """Raised when a command or page script does not finish in time."""
+
+
+class StaleNodeError(ScriptError):
+    """Raised when a node handle refers to an element no longer in the document."""
+
+
+def _mask(payload, mask):
+    """XOR a websocket payload with its 4-byte mask."""
+    if not payload:
+        return b""
+    key = (mask * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(len(payload), "big")
+
+
+class WebSocket:
+    """Minimal RFC 6455 client over asyncio streams; enough for Chrome's DevTools endpoint."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, url, timeout=10):
+        parts = urlparse(url)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        writer.write((f"GET {path or '/'} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        head = (await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)).decode("latin-1")
+        status, *lines = head.split("\r\n")
+        headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines)}
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        if status.split(" ")[1:2] != ["101"] or headers.get("sec-websocket-accept") != accept:
+            writer.close()
+            raise CDPError(f"WebSocket handshake with {url} failed: {status}")
+        return cls(reader, writer)
+
+    async def send_frame(self, opcode, payload):
+        length = len(payload)
+        header = bytearray([0x80 | opcode])
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += length.to_bytes(2, "big")
+        else:
+            header.append(0x80 | 127)
+            header += length.to_bytes(8, "big")
+        mask = os.urandom(4)
+        self.writer.write(bytes(header) + mask + _mask(payload, mask))
+        await self.writer.drain()
+
+    async def send(self, text):
+        await self.send_frame(0x1, text.encode())
+
+    async def recv(self):
+        """Return the next message; answers pings and raises ConnectionError once the peer closes."""
+        message, opcode = bytearray(), 0x1
+        while True:
+            first, second = await self.reader.readexactly(2)
+            op, length = first & 0x0F, second & 0x7F
+            if length == 126:
+                length = int.from_bytes(await self.reader.readexactly(2), "big")
+            elif length == 127:
+                length = int.from_bytes(await self.reader.readexactly(8), "big")
+            mask = await self.reader.readexactly(4) if second & 0x80 else None
+            payload = await self.reader.readexactly(length)
+            if mask:
+                payload = _mask(payload, mask)
+            if op == 0x8:
+                raise ConnectionError("The DevTools websocket was closed")
+            if op == 0x9:
+                await self.send_frame(0xA, payload)
+                continue
+            if op == 0xA:
+                continue
+            if op:
+                opcode = op
+            message += payload
+            if first & 0x80:
+                return message.decode() if opcode == 0x1 else bytes(message)
+
+    async def close(self):
+        try:
+            await self.send_frame(0x8, b"")
+        except (ConnectionError, OSError):
+            pass
+        self.writer.close()
+
+
+class CDPConnection:
+    """Commands and events for every target on one browser websocket (flat sessions)."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.listeners = {}
+        self.closed = False
+        self.reader = asyncio.get_running_loop().create_task(self._read())
+
+    async def send(self, method, params=None, session_id=None, timeout=DEFAULT_COMMAND_TIMEOUT):
+        """Send a command and return its result, raising CDPTimeoutError if no reply comes within timeout seconds."""
+        if self.closed:
+            raise CDPError("The browser connection is closed")
+        message_id = next(self.ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message_id] = future
+        try:
+            await asyncio.wait_for(self.websocket.send(json.dumps(message)), timeout)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise CDPTimeoutError(f"{method} got no reply within {timeout}s")
+        finally:
+            self.pending.pop(message_id, None)
+
+    def on(self, method, callback, session_id=None):
+        self.listeners.setdefault((session_id, method), []).append(callback)
+
+    def off(self, method, callback, session_id=None):
+        callbacks = self.listeners.get((session_id, method), [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def expect(self, method, session_id=None, predicate=None):
+        """Return a future for the next matching event; create it before sending the command that causes it."""
+        future = asyncio.get_running_loop().create_future()
+
+        def callback(params):
+            if not future.done() and (predicate is None or predicate(params)):
+                future.set_result(params)
+
+        self.on(method, callback, session_id)
+        future.add_done_callback(lambda _: self.off(method, callback, session_id))
+        return future
+
+    async def _read(self):
+        try:
+            while True:
+                message = json.loads(await self.websocket.recv())
+                if "id" in message:
+                    future = self.pending.get(message["id"])
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(CDPError(message["error"].get("message", "CDP error")))
+                    else:
+                        future.set_result(message.get("result", {}))
+                    continue
+                for callback in list(self.listeners.get((message.get("sessionId"), message.get("method")), ())):
+                    callback(message.get("params", {}))
+        except (ConnectionError, OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("The browser connection closed"))
+
+    async def close(self):
+        self.reader.cancel()
+        await self.websocket.close()
+
+
+def find_chrome():
+    """Return the path of the installed Chrome executable."""
+    if sys.platform == "win32":
+        for directory in WINDOWS_CHROME_DIRS:
+            path = os.path.join(directory, "chrome.exe")
+            if os.path.isfile(path):
+                return path
+    for command in CHROME_COMMANDS:
+        path = shutil.which(command) or (command if os.path.isfile(command) else None)
+        if path:
+            return path
+    raise CDPError("Chrome was not found")
+
+
+def write_preferences(user_data_dir, prefs):
+    """Write Chrome prefs given as dotted names ("download.default_directory") into a new profile."""
+    preferences = {}
+    for name, value in prefs.items():
+        *parents, leaf = name.split(".")
+        node = preferences
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    os.makedirs(os.path.join(user_data_dir, "Default"), exist_ok=True)
+    with open(os.path.join(user_data_dir, "Default", "Preferences"), "w") as f:
+        json.dump(preferences, f)
+
+
+async def _devtools_url(user_data_dir, process, timeout):
+    """Wait for Chrome to write its DevTools port and return the browser websocket URL."""
+    path = os.path.join(user_data_dir, "DevToolsActivePort")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if process.poll() is not None:
+            raise CDPError(f"Chrome exited with code {process.returncode} before DevTools started")
+        try:
+            with open(path) as f:
+                port, browser_path = f.read().split()[:2]
+            return f"ws://127.0.0.1:{port}{browser_path}"
+        except (OSError, ValueError):
+            await asyncio.sleep(0.05)
+    raise CDPError(f"Chrome did not open a DevTools port within {timeout}s")
+
+
+class CDPBrowser:
+    """A Chrome process started with remote debugging and connected over one websocket."""
+
+    def __init__(self, process, connection, user_data_dir):
+        self.process = process
+        self.connection = connection
+        self.user_data_dir = user_data_dir
+        self.download_path = None
+        self.pages = {}
+
+    @classmethod
+    async def launch(cls, arguments=(), prefs=None, download_path=None, binary=None, timeout=30):
+        """Start Chrome in a fresh profile and connect to it."""
+        binary = binary or find_chrome()
+        user_data_dir = tempfile.mkdtemp(prefix="youpower-cdp-")
+        if prefs:
+            write_preferences(user_data_dir, prefs)
+        command = [binary, f"--user-data-dir={user_data_dir}", "--remote-debugging-port=0", "--no-first-run",
+                   "--no-default-browser-check", *arguments, "about:blank"]
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            connection = CDPConnection(await WebSocket.connect(await _devtools_url(user_data_dir, process, timeout)))
+        except BaseException:
+            process.kill()
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            raise
+        browser = cls(process, connection, user_data_dir)
+        if download_path:
+            await browser.set_download_path(download_path)
+        return browser
+
+    async def send(self, method, params=None):
+        """Send a browser-level command (Browser.*, Target.*)."""
+        return await self.connection.send(method, params)
+
+    async def set_download_path(self, download_path):
+        """Save downloads to download_path and report them as Browser.download* events."""
+        self.download_path = os.path.abspath(download_path)
+        await self.send("Browser.setDownloadBehavior", {
+            "behavior": "allow", "downloadPath": self.download_path, "eventsEnabled": True,
+        })
+
+    def expect_download(self):
+        """Return a future for the path of the next download to finish; create it before starting the download."""
+        future = asyncio.get_running_loop().create_future()
+        names = {}
+
+        def begin(params):
+            names.setdefault(params["guid"], params.get("suggestedFilename", ""))
+
+        def progress(params):
+            if params["guid"] not in names or future.done():
+                return
+            if params["state"] == "completed":
+                future.set_result(params.get("filePath") or os.path.join(self.download_path or "", names[params["guid"]]))
+            elif params["state"] == "canceled":
+                future.set_exception(CDPError("The download was canceled"))
+
+        self.connection.on("Browser.downloadWillBegin", begin)
+        self.connection.on("Browser.downloadProgress", progress)
+
+        def done(_):
+            self.connection.off("Browser.downloadWillBegin", begin)
+            self.connection.off("Browser.downloadProgress", progress)
+
+        future.add_done_callback(done)
+        return future
+
+    async def targets(self):
+        """Return the ids of the open tabs."""
+        result = await self.send("Target.getTargets")
+        return [target["targetId"] for target in result["targetInfos"] if target["type"] == "page"]
+
+    async def page(self, target_id=None):
+        """Attach to a tab (the first one by default) and return its CDPPage."""
+        if target_id is None:
+            target_id = (await self.targets())[0]
+        if target_id not in self.pages:
+            result = await self.send("Target.attachToTarget", {"targetId": target_id, "flatten": True})
+            page = CDPPage(self, target_id, result["sessionId"])
+            await page.enable()
+            self.pages[target_id] = page
+        return self.pages[target_id]
+
+    async def new_page(self, url="about:blank"):
+        result = await self.send("Target.createTarget", {"url": url})
+        return await self.page(result["targetId"])
+
+    async def close_page(self, page):
+        self.pages.pop(page.target_id, None)
+        await self.send("Target.closeTarget", {"targetId": page.target_id})
+
+    async def close(self):
+        """Close Chrome and delete its temporary profile."""
+        try:
+            await asyncio.wait_for(self.send("Browser.close"), 5)
+        except (CDPError, asyncio.TimeoutError):
+            pass
+        await self.connection.close()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.process.wait, 10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class NodeHandle:
+    """An element found in a page, valid until the document it belongs to goes away."""
+
+    def __init__(self, page, document, index):
+        self.page = page
+        self.document = document
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, NodeHandle) and \
+            (self.page, self.document, self.index) == (other.page, other.document, other.index)
+
+    def __hash__(self):
+        return hash((self.page.session_id, self.document, self.index))
+
+
+class CDPPage:
+    """One attached tab: navigation, scripts, element lookup and input."""
+
+    def __init__(self, browser, target_id, session_id):
+        self.browser = browser
+        self.connection = browser.connection
+        self.target_id = target_id
+        self.session_id = session_id
+        self.frame_id = None
+        self.page_load_timeout = DEFAULT_PAGE_LOAD_TIMEOUT
+        self.script_timeout = DEFAULT_SCRIPT_TIMEOUT
+
+    async def send(self, method, params=None, timeout=DEFAULT_COMMAND_TIMEOUT):
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def enable(self):
+        await self.send("Page.enable")
+        self.frame_id = (await self.send("Page.getFrameTree"))["frameTree"]["frame"]["id"]
+
+    def _expect_stopped_loading(self):
+        return self.connection.expect("Page.frameStoppedLoading", self.session_id,
+                                      lambda params: params.get("frameId") == self.frame_id)
+
+    async def navigate(self, url):
+        """Load a URL and wait for the page to finish loading."""
+        stopped = self._expect_stopped_loading()
+        try:
+            result = await self.send("Page.navigate", {"url": url}, self.page_load_timeout)
+            if result.get("errorText"):
+                raise CDPError(f"Navigation to {url} failed: {result['errorText']}")
+            if result.get("loaderId"):
+                await asyncio.wait_for(asyncio.shield(stopped), self.page_load_timeout)
+        finally:
+            stopped.cancel()
+
+    async def reload(self):
+        stopped = self._expect_stopped_loading()
+        try:
+            await self.send("Page.reload")
+            await asyncio.wait_for(asyncio.shield(stopped), self.page_load_timeout)
+        finally:
+            stopped.cancel()
+
+    async def evaluate(self, expression):
+        """Evaluate an expression in the page and return its JSON value."""
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": True,
+        }, self.script_timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            message = details.get("exception", {}).get("description") or details.get("text", "Script error")
+            if STALE_MARKER in message:
+                raise StaleNodeError("The element is no longer attached to the page")
+            raise ScriptError(message)
+        return result["result"].get("value")
+
+    async def run_script(self, body, *args):
+        """Run a function body with Selenium's ``arguments``; DOM nodes in and out are NodeHandles."""
+        encoded = json.dumps(list(args), default=self._encode)
+        return self._decode(await self.evaluate(SCRIPT_WRAPPER % (body, encoded)))
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, NodeHandle):
+            return {NODE_KEY: [value.document, value.index]}
+        raise TypeError(f"Cannot pass {type(value).__name__} to a page script")
+
+    def _decode(self, value):
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if isinstance(value, dict):
+            if NODE_KEY in value:
+                return NodeHandle(self, *value[NODE_KEY])
+            return {key: self._decode(item) for key, item in value.items()}
+        return value
+
+    async def query(self, by, value, root=None, multiple=False):
+        """Find the first element (or all elements) matching a Selenium locator."""
+        return await self.run_script(FIND_SCRIPT, by, value, root, multiple)
+
+    async def _navigation_after(self, action):
+        """Run an input action and, if it started a navigation, wait for that page to load like chromedriver does.
+
+        The navigation events can arrive after the action's own reply, so they
+        are given NAVIGATION_GRACE seconds before the action counts as having none.
+        """
+        def in_this_tab(params):
+            return params.get("frameId") == self.frame_id and params.get("disposition", "currentTab") == "currentTab"
+
+        requested = self.connection.expect("Page.frameRequestedNavigation", self.session_id, in_this_tab)
+        started = self.connection.expect("Page.frameStartedLoading", self.session_id, in_this_tab)
+        stopped = self._expect_stopped_loading()
+        try:
+            await action()
+            await asyncio.wait({requested, started}, timeout=NAVIGATION_GRACE, return_when=asyncio.FIRST_COMPLETED)
+            if requested.done() or started.done():
+                await asyncio.wait_for(asyncio.shield(stopped), self.page_load_timeout)
+        finally:
+            for future in (requested, started, stopped):
+                future.cancel()
+
+    async def click(self, node):
+        """Click an element with real mouse events, or through the DOM when it is hidden or covered."""
+        point = await self.run_script(CLICK_POINT_SCRIPT, node)
+
+        async def press():
+            if point is None:
+                await self.run_script("arguments[0].click();", node)
+                return
+            x, y = point
+            for kind in ("mousePressed", "mouseReleased"):
+                await self.send("Input.dispatchMouseEvent", {
+                    "type": kind, "x": x, "y": y, "button": "left", "clickCount": 1,
+                })
+
+        await self._navigation_after(press)
+
+    async def clear(self, node):
+        await self.run_script(CLEAR_SCRIPT, node)
+
+    async def type(self, node, text):
+        """Focus an element and type text; runs of plain text are inserted in one command."""
+        await self.run_script(FOCUS_SCRIPT, node)
+        plain = ""
+        for char in text:
+            if char not in SPECIAL_KEYS:
+                plain += char
+                continue
+            if plain:
+                await self.send("Input.insertText", {"text": plain})
+                plain = ""
+            await self._navigation_after(lambda char=char: self.press_key(char))
+        if plain:
+            await self.send("Input.insertText", {"text": plain})
+
+    async def press_key(self, char):
+        key, code, key_code, text = SPECIAL_KEYS[char]
+        event = {"key": key, "code": code, "windowsVirtualKeyCode": key_code, "nativeVirtualKeyCode": key_code}
+        await self.send("Input.dispatchKeyEvent", dict(event, type="keyDown" if text else "rawKeyDown", text=text))
+        await self.send("Input.dispatchKeyEvent", dict(event, type="keyUp"))
+
+
+# One event loop thread multiplexes every browser the process drives through CDPDriver.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop():
+    """Return the background event loop used by CDPDriver, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="cdp-loop", daemon=True).start()
+        return _loop
+
+
+def run(coroutine):
+    """Run a coroutine on the CDP event loop from any other thread and return its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, event_loop()).result()
+
+
+class CDPElement:
+    """Selenium WebElement stand-in for a NodeHandle."""
+
+    def __init__(self, driver, handle):
+        self.driver = driver
+        self.handle = handle
+
+    def __eq__(self, other):
+        return isinstance(other, CDPElement) and self.handle == other.handle
+
+    def __hash__(self):
+        return hash(self.handle)
+
+    def _script(self, body, *args):
+        return self.driver.execute_script(body, self, *args)
+
+    def click(self):
+        self.driver._run(self.handle.page.click(self.handle))
+
+    def clear(self):
+        self.driver._run(self.handle.page.clear(self.handle))
+
+    def send_keys(self, *values):
+        self.driver._run(self.handle.page.type(self.handle, "".join(str(value) for value in values)))
+
+    def get_attribute(self, name):
+        return self._script("""
+            var el = arguments[0], name = arguments[1], value = el[name];
+            if (value === undefined || value === null || typeof value === 'object' || typeof value === 'function') {
+                return el.getAttribute(name);
+            }
+            return typeof value === 'boolean' ? (value ? 'true' : null) : String(value);
+        """, name)
+
+    def get_property(self, name):
+        return self._script("return arguments[0][arguments[1]];", name)
+
+    def get_dom_attribute(self, name):
+        return self._script("return arguments[0].getAttribute(arguments[1]);", name)
+
+    def is_displayed(self):
+        return self._script("""
+            var el = arguments[0], style = window.getComputedStyle(el);
+            if (style.visibility === 'hidden' || style.display === 'none') return false;
+            return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+        """)
+
+    def is_enabled(self):
+        return self._script("return !arguments[0].disabled;")
+
+    def is_selected(self):
+        return self._script("return !!(arguments[0].checked || arguments[0].selected);")
+
+    @property
+    def text(self):
+        return self._script("return (arguments[0].innerText || '').trim();")
+
+    @property
+    def tag_name(self):
+        return self._script("return arguments[0].tagName.toLowerCase();")
+
+    @property
+    def rect(self):
+        return self._script("""
+            var r = arguments[0].getBoundingClientRect();
+            return {x: r.left + window.scrollX, y: r.top + window.scrollY, width: r.width, height: r.height};
+        """)
+
+    @property
+    def location(self):
+        rect = self.rect
+        return {"x": round(rect["x"]), "y": round(rect["y"])}
+
+    @property
+    def size(self):
+        rect = self.rect
+        return {"width": round(rect["width"]), "height": round(rect["height"])}
+
+    def find_element(self, by, value):
+        return self.driver.find_element(by, value, root=self)
+
+    def find_elements(self, by, value):
+        return self.driver.find_elements(by, value, root=self)
+
+
+class _SwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.page = self.driver._run(self.driver.browser.page(handle))
+
+
+class CDPDriver:
+    """The subset of Selenium's WebDriver the scrapers use, sent straight to Chrome over DevTools.
+
+    Every call is one or a few websocket messages instead of an HTTP request
+    through chromedriver. Calls block the calling thread while the shared
+    event loop thread does the I/O, so the existing worker code runs unchanged.
+    """
+
+    def __init__(self, browser, page):
+        self.browser = browser
+        self.page = page
+        self.switch_to = _SwitchTo(self)
+        # BrowserPool measures memory from the browser process tree.
+        self.service = SimpleNamespace(process=browser.process)
+
+    @classmethod
+    def launch(cls, options, timeout=30):
+        """Start Chrome with a Selenium ChromeOptions (arguments, prefs and binary location)."""
+        prefs = dict(options.experimental_options.get("prefs", {}))
+        download_path = prefs.get("download.default_directory")
+        if download_path:
+            # The scrapers build Windows-style paths; normalize for the platform Chrome runs on.
+            download_path = os.path.abspath(download_path.replace("\\", os.sep))
+            prefs["download.default_directory"] = download_path
+        browser = run(CDPBrowser.launch(options.arguments, prefs, download_path, options.binary_location or None,
+                                        timeout))
+        try:
+            page = run(browser.page())
+        except BaseException:
+            run(browser.close())
+            raise
+        return cls(browser, page)
+
+    def _run(self, coroutine):
+        """Run a coroutine and translate failures into the matching Selenium exceptions."""
+        try:
+            return run(coroutine)
+        except StaleNodeError as e:
+            raise exceptions.StaleElementReferenceException(str(e))
+        except CDPTimeoutError as e:
+            raise exceptions.TimeoutException(str(e))
+        except ScriptError as e:
+            raise exceptions.JavascriptException(str(e))
+        except asyncio.TimeoutError:
+            raise exceptions.TimeoutException("Timed out waiting for the page to load")
+        except CDPError as e:
+            raise exceptions.WebDriverException(str(e))
+
+    def _wrap(self, value):
+        if isinstance(value, NodeHandle):
+            return CDPElement(self, value)
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._wrap(item) for key, item in value.items()}
+        return value
+
+    def _unwrap(self, value):
+        if isinstance(value, CDPElement):
+            return value.handle
+        if isinstance(value, (list, tuple)):
+            return [self._unwrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._unwrap(item) for key, item in value.items()}
+        return value
+
+    def get(self, url):
+        self._run(self.page.navigate(url))
+
+    def refresh(self):
+        self._run(self.page.reload())
+
+    def set_page_load_timeout(self, seconds):
+        self.page.page_load_timeout = seconds
+
+    def set_script_timeout(self, seconds):
+        self.page.script_timeout = seconds
+
+    @property
+    def current_url(self):
+        return self._run(self.page.evaluate("location.href"))
+
+    @property
+    def title(self):
+        return self._run(self.page.evaluate("document.title"))
+
+    def execute_script(self, script, *args):
+        return self._wrap(self._run(self.page.run_script(script, *self._unwrap(list(args)))))
+
+    def find_element(self, by, value, root=None):
+        handle = self._run(self.page.query(by, value, self._unwrap(root), False))
+        if handle is None:
+            raise exceptions.NoSuchElementException(f"No element matches {by}={value!r}")
+        return CDPElement(self, handle)
+
+    def find_elements(self, by, value, root=None):
+        return self._wrap(self._run(self.page.query(by, value, self._unwrap(root), True)))
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        if cmd.startswith(("Browser.", "Target.")):
+            if cmd == "Browser.setDownloadBehavior" and cmd_args.get("downloadPath"):
+                self.browser.download_path = cmd_args["downloadPath"]
+            return self._run(self.browser.send(cmd, cmd_args))
+        return self._run(self.page.send(cmd, cmd_args))
+
+    def get_cookies(self):
+        return self.execute_cdp_cmd("Network.getCookies", {})["cookies"]
+
+    def add_cookie(self, cookie):
+        self.execute_cdp_cmd("Network.setCookie", dict(cookie, url=self.current_url))
+
+    def delete_all_cookies(self):
+        self.execute_cdp_cmd("Network.clearBrowserCookies", {})
+
+    def expect_download(self):
+        """Return a concurrent Future for the path of the next download; call before starting it."""
+        async def expect():
+            return self.browser.expect_download()
+
+        download = run(expect())
+
+        async def wait():
+            return await download
+        return asyncio.run_coroutine_threadsafe(wait(), event_loop())
+
+    @property
+    def window_handles(self):
+        targets = self._run(self.browser.targets())
+        return sorted(targets, key=lambda target: target != self.page.target_id)
+
+    @property
+    def current_window_handle(self):
+        return self.page.target_id
+
+    def close(self):
+        self._run(self.browser.close_page(self.page))
+
+    def quit(self):
+        self._run(self.browser.close())
@@ -0,0 +1,127 @@
+# date_chunks.py - Split long Green Button requests into chunks, fetch them concurrently and merge the results
+import csv
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from espi_parser import IntervalSeries, parse_file
+from green_button_export import reserve_path
+
+CHUNK_SIZES = ("day", "week", "month", "quarter", "year")
+
+
+def plan_chunks(start, end, size="month"):
+    """Split the inclusive range start..end into calendar-aligned (start, end) chunks.
+
+    size is one of CHUNK_SIZES or a number of days.
+    """
+    if end < start:
+        raise ValueError(f"End date {end} is before start date {start}.")
+    chunks = []
+    current = start
+    while current <= end:
+        if isinstance(size, int):
+            chunk_end = current + timedelta(days=size - 1)
+        elif size == "day":
+            chunk_end = current
+        elif size == "week":
+            chunk_end = current + timedelta(days=6 - current.weekday())
+        elif size in ("month", "quarter", "year"):
+            months = {"month": 1, "quarter": 3, "year": 12}[size]
+            first_month = current.month - 1 if size == "month" else (current.month - 1) // months * months
+            month_index = current.year * 12 + first_month + months
+            chunk_end = date(month_index // 12, month_index % 12 + 1, 1) - timedelta(days=1)
+        else:
+            raise ValueError(f"Unknown chunk size: {size}. Expected a number of days or one of: {', '.join(CHUNK_SIZES)}.")
+        chunk_end = min(chunk_end, end)
+        chunks.append((current, chunk_end))
+        current = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def fetch_chunks(fetch, chunks, concurrency=4, retries=2, backoff=1.0, log=None):
+    """Call fetch(start, end, index) for every chunk concurrently and return the results in chunk order.
+
+    A failing chunk is retried on its own up to ``retries`` times; if it still
+    fails, RuntimeError lists every chunk that could not be fetched. Retries
+    are reported to ``log`` when one is given.
+    """
+    def attempt(index, chunk):
+        for tries in range(retries + 1):
+            try:
+                return fetch(chunk[0], chunk[1], index)
+            except Exception as e:
+                if log is not None:
+                    log(f"Chunk {chunk[0]}..{chunk[1]} failed (attempt {tries + 1}): {e}")
+                if tries == retries:
+                    raise
+                time.sleep(backoff * (2 ** tries))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(attempt, index, chunk) for index, chunk in enumerate(chunks)]
+        results, failed = [], []
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                failed.append(f"{chunk[0]}..{chunk[1]} ({e})")
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(chunks)} chunks failed: {'; '.join(failed)}")
+    return results
+
+
+def merge_chunks(paths, output_dir, prefix="GreenButton", log=None):
+    """Merge chunk files into one time-ordered CSV per meter and return the written paths.
+
+    The portal's Green Button XML is not rewritten: each meter is saved as a
+    start,duration,value,quality CSV (UTC epoch seconds, the meter's unit) that
+    espi_parser.parse_file reads back. Readings with the same start that
+    appear in two chunks (the shared boundary interval) are kept once, taking
+    the value from the later chunk. Existing files are never overwritten; a
+    name already taken gets a _1, _2, ... suffix.
+    """
+    meters = {}
+    for path in paths:
+        for meter, series in parse_file(path).items():
+            meters.setdefault(meter, []).append(series)
+    written = []
+    for meter, parts in sorted(meters.items()):
+        series = IntervalSeries.concatenate(meter, parts)
+        name = f"{prefix}_{meter}_{time.strftime('%Y%m%d', time.gmtime(series.start[0]))}_" \
+               f"{time.strftime('%Y%m%d', time.gmtime(series.start[-1]))}.csv"
+        path = reserve_path(os.path.join(output_dir, name))
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["start", "duration", "value", "quality"])
+            writer.writerows(zip(series.start.tolist(), series.duration.tolist(),
+                                 series.value.tolist(), series.quality.tolist()))
+        if log is not None:
+            log(f"Merged {len(series)} readings for meter {meter} into {path}")
+        written.append(path)
+    return written
+
+
+def export_in_chunks(exporter, start, end, download_path, size="month", concurrency=4, retries=2, account="",
+                     log=None):
+    """Export a long range chunk by chunk with a GreenButtonExporter and merge the chunks into one CSV per meter.
+
+    Progress messages go to ``log`` (for a job, its log signal) when one is given.
+    """
+    chunks = plan_chunks(start, end, size)
+    # A fresh directory per call, so exports for other accounts into the same folder keep their chunks.
+    work_dir = tempfile.mkdtemp(prefix=".chunks-", dir=download_path)
+    if log is not None:
+        log(f"Fetching {len(chunks)} chunks with {concurrency} concurrent requests...")
+
+    def fetch(chunk_start, chunk_end, index):
+        chunk_dir = os.path.join(work_dir, str(index))
+        os.makedirs(chunk_dir, exist_ok=True)
+        return exporter.export(chunk_start, chunk_end, chunk_dir, account)
+
+    try:
+        paths = fetch_chunks(fetch, chunks, concurrency, retries, log=log)
+        return merge_chunks(paths, download_path, log=log)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
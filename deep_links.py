@@ -0,0 +1,142 @@
+# deep_links.py - Learned shortcuts straight to the Green Button page, skipping the navigation clicks
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+from lazy_import import lazy
+
+WebDriverWait = lazy("selenium.webdriver.support.ui", "WebDriverWait")
+EC = lazy("selenium.webdriver.support.expected_conditions")
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".youpower", "deep_links.json")
+
+# A shortcut is forgotten after this many failed validations in a row, so a
+# moved page costs at most this many wasted loads before the click path is relearned.
+MAX_FAILURES = 2
+
+# Seconds to wait for the learned marker element on the shortcut page.
+MARKER_TIMEOUT = 5
+
+
+def account_key(username):
+    """Return the storage key for an account; usernames are not stored in the clear."""
+    return hashlib.sha256(username.encode("utf-8")).hexdigest()
+
+
+class DeepLinkMemory:
+    """Remembers per portal and account where the click path to the Green Button page ended.
+
+    Each entry holds the page's path relative to the portal's base URL, the
+    locator that proved the page was right (the Green Button the click path
+    found there), and how many page loads the click path took. The preconditions
+    for using it are an authenticated session on the same account and that
+    marker being present after the jump.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_failures=MAX_FAILURES):
+        self.path = path
+        self.max_failures = max_failures
+        self.lock = threading.Lock()
+        self.data = self.load()
+        self.changed = set()
+
+    def load(self):
+        """Load the store from disk, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write this instance's changes over the current file atomically.
+
+        Only the accounts changed here are written, so jobs running side by
+        side with their own memory do not drop each other's shortcuts.
+        """
+        with self.lock:
+            data = self.load()
+            for portal, key in self.changed:
+                entry = self.data.get(portal, {}).get(key)
+                if entry is None:
+                    data.get(portal, {}).pop(key, None)
+                else:
+                    data.setdefault(portal, {})[key] = entry
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=os.path.basename(self.path) + ".",
+                                            suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            self.data = data
+            self.changed.clear()
+
+    def lookup(self, portal, username):
+        """Return the learned entry for an account, or None."""
+        with self.lock:
+            return self.data.get(portal, {}).get(account_key(username))
+
+    @staticmethod
+    def url_for(entry, base_url):
+        """Return the absolute URL of an entry on a portal."""
+        return base_url.rstrip("/") + entry["path"]
+
+    def learn(self, portal, username, url, base_url, marker, click_loads):
+        """Record the page a successful click path ended on; return False if it is off the portal."""
+        base = base_url.rstrip("/")
+        if not url.startswith(base + "/"):
+            return False
+        path = url[len(base):].split("#", 1)[0]
+        key = account_key(username)
+        with self.lock:
+            entries = self.data.setdefault(portal, {})
+            entry = entries.get(key) or {"hits": 0, "failures": 0, "saved": 0}
+            if entry.get("path") != path:
+                entry["hits"], entry["failures"] = 0, 0
+            entry.update(path=path, marker=list(marker), click_loads=click_loads, updated=time.time())
+            entries[key] = entry
+            self.changed.add((portal, key))
+        return True
+
+    def record(self, portal, username, ok, saved):
+        """Record a shortcut attempt and the page loads it saved (negative when it failed)."""
+        key = account_key(username)
+        with self.lock:
+            entry = self.data.get(portal, {}).get(key)
+            if entry is None:
+                return
+            entry["saved"] = entry.get("saved", 0) + saved
+            if ok:
+                entry["hits"] += 1
+                entry["failures"] = 0
+            else:
+                entry["failures"] += 1
+                if entry["failures"] >= self.max_failures:
+                    del self.data[portal][key]
+            self.changed.add((portal, key))
+
+
+def on_page(driver, entry, base_url, timeout=MARKER_TIMEOUT):
+    """Return True when the driver shows an entry's page: not redirected away, and its marker present."""
+    expected = urlsplit(DeepLinkMemory.url_for(entry, base_url))
+    current = urlsplit(driver.current_url)
+    # A redirect (to login, an error page or a new address) fails at once, without waiting for the marker.
+    if (current.netloc, current.path.rstrip("/")) != (expected.netloc, expected.path.rstrip("/")):
+        return False
+    try:
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located(tuple(entry["marker"])))
+        return True
+    except Exception:
+        return False
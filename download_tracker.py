@@ -0,0 +1,313 @@
+# download_tracker.py - Detect finished browser downloads and match them to the jobs that requested them
+import ctypes
+import ctypes.util
+import itertools
+import os
+import select
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from green_button_export import reserve_path
+
+PARTIAL_SUFFIXES = (".crdownload", ".part", ".partial", ".download", ".tmp")
+
+# inotify event masks (see inotify(7)).
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def is_partial(name):
+    """Return True for in-progress download files."""
+    return name.endswith(PARTIAL_SUFFIXES)
+
+
+def final_name(partial):
+    """Return the name a partial download will have once it finishes."""
+    for suffix in PARTIAL_SUFFIXES:
+        if partial.endswith(suffix):
+            return partial[:-len(suffix)]
+    return partial
+
+
+# Seconds the inotify reader waits for events before checking whether it was stopped.
+WATCH_STOP_INTERVAL = 0.5
+
+
+def watch_directory(directory, callback):
+    """Call callback on every change in directory using inotify.
+
+    Returns a function that stops watching (the reader thread ends and closes
+    the inotify descriptor), or None if inotify is unavailable.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+    except (OSError, AttributeError):
+        return None
+    stopped = threading.Event()
+
+    def reader():
+        try:
+            while not stopped.is_set():
+                try:
+                    ready = select.select([fd], [], [], WATCH_STOP_INTERVAL)[0]
+                    if ready and not os.read(fd, 4096):
+                        break
+                except OSError:
+                    break
+                if ready:
+                    callback()
+        finally:
+            os.close(fd)
+
+    thread = threading.Thread(target=reader, name=f"inotify:{directory}", daemon=True)
+    thread.start()
+
+    def stop():
+        stopped.set()
+        if thread is not threading.current_thread():
+            thread.join(WATCH_STOP_INTERVAL * 2)
+    return stop
+
+
+class DownloadJob:
+    """One expected download; claims the first new file that appears after it starts."""
+
+    def __init__(self, job_id, label, baseline):
+        self.id = job_id
+        self.label = label
+        self.baseline = baseline
+        self.started = time.monotonic()
+        self.partial = None
+        self.candidate = None
+        self.candidate_size = None
+        self.candidate_seen = None
+        self.result = None
+
+
+class DownloadTracker:
+    """Watches one download directory and resolves each job to its finished file.
+
+    Jobs are matched in start order: each job claims the first partial or
+    finished file that appeared after it started and is not claimed by an
+    earlier job. That keeps the downloads of one browser apart, but not those
+    of several browsers saving to the same folder at once; give each browser
+    its own folder with private_downloads().
+
+    With a destination, finished files are moved there (under a new name if
+    one is taken) before wait() returns their path.
+
+    Trackers from for_directory are shared and reference counted: use one as
+    a context manager (or call release()) so the last user stops the watch.
+    """
+
+    _trackers = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, directory, poll_interval=0.25, settle_time=0.5, destination=None):
+        self.directory = directory
+        self.destination = destination
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.changed = threading.Condition()
+        self.jobs = []
+        self.delivered = set()
+        self.ids = itertools.count(1)
+        self.users = 0
+        self.stop_watching = watch_directory(directory, self.notify)
+        self.uses_inotify = self.stop_watching is not None
+
+    @classmethod
+    def for_directory(cls, directory):
+        """Return the shared tracker for a directory, counting one more user until release()."""
+        key = os.path.abspath(directory)
+        with cls._registry_lock:
+            tracker = cls._trackers.get(key)
+            if tracker is None:
+                tracker = cls._trackers[key] = cls(key)
+            tracker.users += 1
+            return tracker
+
+    def release(self):
+        """Drop one for_directory() user; the last one closes the tracker."""
+        with self._registry_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            if self._trackers.get(self.directory) is self:
+                del self._trackers[self.directory]
+        self.close()
+
+    def close(self):
+        """Stop watching the directory; waits fall back to polling."""
+        stop, self.stop_watching = self.stop_watching, None
+        if stop:
+            stop()
+        self.notify()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def notify(self):
+        """Wake every waiting job."""
+        with self.changed:
+            self.changed.notify_all()
+
+    def scan(self):
+        """Return {name: size} for the files currently in the directory."""
+        sizes = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            sizes[entry.name] = entry.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return sizes
+
+    def start_job(self, label=""):
+        """Register a download that is about to be triggered."""
+        with self.changed:
+            job = DownloadJob(next(self.ids), label, set(self.scan()))
+            self.jobs.append(job)
+            return job
+
+    def _claimed(self, job):
+        """Return the names claimed by other jobs or already delivered."""
+        names = set(self.delivered)
+        for other in self.jobs:
+            if other is not job:
+                names.update(n for n in (other.partial, other.candidate) if n)
+        return names
+
+    def _may_claim(self, job):
+        """Jobs claim files in start order: every earlier pending job must hold a claim first."""
+        for other in self.jobs:
+            if other is job:
+                return True
+            if not other.partial and not other.candidate:
+                return False
+        return True
+
+    def _update(self, job, sizes, now):
+        """Advance a job's claim; return True once its file is complete."""
+        claimed = self._claimed(job)
+        new = [name for name in sorted(sizes) if name not in job.baseline and name not in claimed]
+
+        if job.partial and job.partial in sizes:
+            return False
+        if job.partial and not job.candidate:
+            finished = final_name(job.partial)
+            if finished in sizes and finished not in claimed:
+                # Chrome renames the partial only after the last byte is written.
+                job.candidate = finished
+                job.result = (os.path.join(self.directory, finished), sizes[finished])
+                self.delivered.add(finished)
+                return True
+        if not job.partial and not job.candidate:
+            if not self._may_claim(job):
+                return False
+            partials = [name for name in new if is_partial(name)]
+            if partials:
+                job.partial = partials[0]
+                return False
+        if not job.candidate:
+            complete = [name for name in new if not is_partial(name)]
+            if not complete:
+                return False
+            job.candidate = complete[0]
+        if job.candidate not in sizes:
+            job.candidate = None
+            return False
+        size = sizes[job.candidate]
+        if size != job.candidate_size:
+            job.candidate_size, job.candidate_seen = size, now
+            return False
+        if size > 0 and now - job.candidate_seen >= self.settle_time:
+            job.result = (os.path.join(self.directory, job.candidate), size)
+            self.delivered.add(job.candidate)
+            return True
+        return False
+
+    def _deliver(self, job):
+        """Move a finished file to the destination, if there is one, and return (path, size)."""
+        if self.destination is None:
+            return job.result
+        path, size = job.result
+        target = reserve_path(os.path.join(self.destination, os.path.basename(path)))
+        os.replace(path, target)
+        job.result = (target, size)
+        return job.result
+
+    def wait(self, job, timeout=120):
+        """Block until the job's file is complete and return (path, size)."""
+        deadline = time.monotonic() + timeout
+        try:
+            with self.changed:
+                while True:
+                    now = time.monotonic()
+                    if self._update(job, self.scan(), now):
+                        return self._deliver(job)
+                    if now >= deadline:
+                        raise TimeoutError(f"Download did not complete within {timeout}s")
+                    self.changed.wait(min(self.poll_interval, deadline - now))
+        finally:
+            with self.changed:
+                if job in self.jobs:
+                    self.jobs.remove(job)
+
+
+def set_download_path(driver, download_path):
+    """Point the browser's downloads at download_path."""
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": os.path.abspath(download_path),
+        "eventsEnabled": True,
+    })
+
+
+@contextmanager
+def private_downloads(driver, download_path):
+    """Send the browser's downloads to a new folder of its own inside download_path.
+
+    Yields a DownloadTracker for that folder which moves finished files into
+    download_path. Sessions downloading to the same download_path at once
+    each get their own folder, so one account's file cannot be matched to
+    another's job. On exit the browser saves to download_path again and the
+    folder is removed.
+    """
+    work_dir = tempfile.mkdtemp(prefix=".download-", dir=download_path)
+    tracker = None
+    try:
+        set_download_path(driver, work_dir)
+        tracker = DownloadTracker(work_dir, destination=download_path)
+        yield tracker
+    finally:
+        if tracker is not None:
+            tracker.close()
+        try:
+            set_download_path(driver, download_path)
+        except Exception as e:
+            print(f"Could not point downloads back at {download_path}: {e}")
+        shutil.rmtree(work_dir, ignore_errors=True)
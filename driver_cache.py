@@ -0,0 +1,301 @@
+# driver_cache.py - Offline chromedriver resolution: match the installed Chrome to a pinned, locally cached driver
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from lazy_import import lazy
+
+webdriver = lazy("selenium.webdriver")
+Service = lazy("selenium.webdriver.chrome.service", "Service")
+# Only needed to refresh the cache after a version mismatch.
+ChromeDriverManager = lazy("webdriver_manager.chrome", "ChromeDriverManager")
+# Only needed for runs on the DevTools backend.
+CDPDriver = lazy("cdp_browser", "CDPDriver")
+
+DEFAULT_DIR = os.environ.get("YOUPOWER_DRIVER_DIR", os.path.join(os.path.expanduser("~"), ".youpower", "drivers"))
+MANIFEST_FILE = "manifest.json"
+DRIVER_NAME = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+
+# selenium drives Chrome through chromedriver; cdp talks to Chrome's DevTools websocket directly.
+BACKENDS = ("selenium", "cdp")
+
+CHROME_COMMANDS = (
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+)
+WINDOWS_CHROME_DIRS = (
+    os.path.join(os.environ.get("PROGRAMFILES", r"C:\Program Files"), "Google", "Chrome", "Application"),
+    os.path.join(os.environ.get("PROGRAMFILES(X86)", r"C:\Program Files (x86)"), "Google", "Chrome", "Application"),
+    os.path.join(os.environ.get("LOCALAPPDATA", ""), "Google", "Chrome", "Application"),
+)
+
+VERSION_PATTERN = re.compile(r"(\d+)\.\d+\.\d+\.\d+")
+
+
+class DriverCacheError(Exception):
+    """Raised when no cached chromedriver matches the installed Chrome and none could be fetched."""
+
+
+def _windows_chrome_version():
+    """Read the Chrome version from the registry or the install folder."""
+    import winreg
+    for root in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+        try:
+            with winreg.OpenKey(root, r"Software\Google\Chrome\BLBeacon") as key:
+                return winreg.QueryValueEx(key, "version")[0]
+        except OSError:
+            continue
+    for directory in WINDOWS_CHROME_DIRS:
+        try:
+            versions = [name for name in os.listdir(directory) if VERSION_PATTERN.fullmatch(name)]
+        except OSError:
+            continue
+        if versions:
+            return max(versions, key=lambda name: [int(part) for part in name.split(".")])
+    return None
+
+
+def _version_of(command):
+    """Run ``command --version`` and return the version it prints, or None."""
+    try:
+        output = subprocess.run([command, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_PATTERN.search(output)
+    return match.group(0) if match else None
+
+
+def chrome_version():
+    """Return the installed Chrome version without touching the network, or None when Chrome is not found."""
+    if sys.platform == "win32":
+        return _windows_chrome_version()
+    for command in CHROME_COMMANDS:
+        version = _version_of(command)
+        if version:
+            return version
+    return None
+
+
+def major(version):
+    """Return the major part of a version string."""
+    return version.split(".")[0] if version else None
+
+
+def _remove(path):
+    """Delete a file if it exists."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def file_sha256(path):
+    """Return the SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DriverCache:
+    """Chromedrivers kept in a local folder and pinned by a manifest.
+
+    manifest.json maps each Chrome major version to the exact driver version,
+    its path relative to the folder and its SHA-256, so the folder can be
+    copied to machines without network access. resolve() never downloads
+    anything; refresh() is only called when the installed Chrome has no
+    matching driver in the manifest.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.path = None
+        self.chrome = None
+
+    def manifest(self):
+        """Return the manifest, empty when there is none yet."""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"drivers": {}}
+
+    def save_manifest(self, manifest):
+        """Write the manifest atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=MANIFEST_FILE + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, os.path.join(self.directory, MANIFEST_FILE))
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+    def verify(self, entry):
+        """Return the driver path for a manifest entry if the file is present and unmodified, else None."""
+        path = os.path.join(self.directory, entry["path"])
+        try:
+            if file_sha256(path) != entry["sha256"]:
+                print(f"Cached chromedriver {entry['version']} does not match its pinned checksum")
+                return None
+            if sys.platform != "win32":
+                os.chmod(path, os.stat(path).st_mode | 0o111)
+        except OSError:
+            return None
+        return path
+
+    def add(self, driver_path, version=None):
+        """Copy a chromedriver into the cache and pin it in the manifest; return the cached path."""
+        version = version or _version_of(driver_path)
+        if not version:
+            raise DriverCacheError(f"Could not read the version of {driver_path}")
+        relative = os.path.join(version, DRIVER_NAME)
+        target = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.abspath(driver_path) != os.path.abspath(target):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=DRIVER_NAME + ".", suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copy2(driver_path, tmp_path)
+                os.replace(tmp_path, target)
+            except BaseException:
+                _remove(tmp_path)
+                raise
+        manifest = self.manifest()
+        manifest.setdefault("drivers", {})[major(version)] = {
+            "version": version, "path": relative, "sha256": file_sha256(target),
+        }
+        self.save_manifest(manifest)
+        return self.verify(manifest["drivers"][major(version)])
+
+    def refresh(self, chrome):
+        """Fetch a driver for the installed Chrome with webdriver_manager and pin it. Needs network access."""
+        print(f"No cached chromedriver for Chrome {chrome}; downloading one")
+        with tempfile.TemporaryDirectory() as download_dir:
+            try:
+                driver_path = ChromeDriverManager(path=download_dir).install()
+            except Exception as e:
+                raise DriverCacheError(f"No cached chromedriver for Chrome {chrome} and the download failed: {e}")
+            version = _version_of(driver_path)
+            if major(version) != major(chrome):
+                raise DriverCacheError(f"Downloaded chromedriver {version} does not support Chrome {chrome}")
+            return self.add(driver_path, version)
+
+    def prewarm(self, allow_refresh=True):
+        """Find and verify the driver for the installed Chrome, refreshing the cache only on a mismatch."""
+        with self.lock:
+            chrome = chrome_version()
+            drivers = self.manifest().get("drivers", {})
+            if chrome:
+                entry = drivers.get(major(chrome))
+            else:
+                # Chrome's version is unknown; fall back to the newest pinned driver.
+                entry = drivers[max(drivers, key=int)] if drivers else None
+            path = self.verify(entry) if entry else None
+            if path is None and chrome and allow_refresh:
+                path = self.refresh(chrome)
+            if path is None:
+                raise DriverCacheError("Chrome was not found and no chromedriver is cached" if chrome is None
+                                       else f"No cached chromedriver for Chrome {chrome}")
+            self.path, self.chrome = path, chrome
+            return path
+
+    def resolve(self):
+        """Return the verified driver path; after prewarm() this does no I/O at all."""
+        return self.path or self.prewarm()
+
+    def invalidate(self):
+        """Forget the resolved driver, e.g. after Chrome updated underneath a running app."""
+        with self.lock:
+            self.path = None
+
+
+_default = DriverCache()
+
+
+def resolve_driver():
+    """Return the chromedriver path for the installed Chrome from the default cache."""
+    return _default.resolve()
+
+
+def prewarm(background=False):
+    """Verify the default cache's driver now, or in a background thread at application start."""
+    def run():
+        try:
+            path = _default.prewarm()
+            print(f"Using chromedriver {path}")
+        except Exception as e:
+            print(f"Chromedriver pre-warm failed: {e}")
+    if not background:
+        return _default.prewarm()
+    thread = threading.Thread(target=run, name="driver-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def launch_chrome(options, backend="selenium"):
+    """Start Chrome with the cached driver, resolving a new one once if Chrome has updated past it.
+
+    With backend="cdp" no chromedriver is involved and the returned driver is a CDPDriver.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown browser backend: {backend}. Expected one of: {', '.join(BACKENDS)}.")
+    if backend == "cdp":
+        return CDPDriver.launch(options)
+    try:
+        return webdriver.Chrome(service=Service(resolve_driver()), options=options)
+    except Exception as e:
+        if "only supports Chrome version" not in str(e):
+            raise
+        print("Chrome was updated since the driver was resolved; looking for a matching chromedriver")
+        _default.invalidate()
+        return webdriver.Chrome(service=Service(resolve_driver()), options=options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the offline chromedriver cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="show the installed Chrome and the pinned drivers")
+    add = subparsers.add_parser("add", help="pin a chromedriver copied onto this machine")
+    add.add_argument("driver", help="path to a chromedriver executable")
+    subparsers.add_parser("refresh", help="download and pin a driver for the installed Chrome")
+    parser.add_argument("--dir", default=DEFAULT_DIR, help="cache folder")
+    args = parser.parse_args()
+
+    cache = DriverCache(args.dir)
+    try:
+        if args.command == "status":
+            chrome = chrome_version()
+            print(f"Chrome: {chrome or 'not found'}")
+            drivers = cache.manifest().get("drivers", {})
+            for key in sorted(drivers, key=int):
+                entry = drivers[key]
+                state = "ok" if cache.verify(entry) else "missing or modified"
+                marker = " <- installed Chrome" if key == major(chrome) else ""
+                print(f"  Chrome {key}: chromedriver {entry['version']} ({state}){marker}")
+            if chrome and major(chrome) not in drivers:
+                print("  No pinned driver matches the installed Chrome; run refresh or add one.")
+        elif args.command == "add":
+            print(f"Pinned {cache.add(args.driver)}")
+        else:
+            chrome = chrome_version()
+            if not chrome:
+                raise DriverCacheError("Chrome was not found")
+            print(f"Pinned {cache.refresh(chrome)}")
+    except DriverCacheError as e:
+        print(e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
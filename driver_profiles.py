@@ -0,0 +1,66 @@
+# driver_profiles.py - Chrome option profiles for the YouPower scrapers
+import os
+
+PROFILES = ("standard", "fast")
+
+# URL patterns blocked by the fast profile. Only third-party trackers, fonts and
+# media are listed; utility-portal documents and the Green Button export are
+# never matched, so downloads are byte-identical to the standard profile.
+DEFAULT_BLOCK_LIST = [
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googleadservices.com*",
+    "*facebook.net*",
+    "*facebook.com/tr*",
+    "*hotjar.com*",
+    "*newrelic.com*",
+    "*nr-data.net*",
+    "*optimizely.com*",
+    "*demdex.net*",
+    "*omtrdc.net*",
+    "*adobedtm.com*",
+    "*qualtrics.com*",
+    "*clarity.ms*",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.mp4",
+    "*.webm",
+]
+
+
+def apply_profile(options, profile="standard"):
+    """Add the Chrome options for a profile to options."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown driver profile: {profile}. Expected one of: {', '.join(PROFILES)}.")
+    if profile == "fast":
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--mute-audio")
+        options.add_argument("--log-level=3")
+        options.add_experimental_option("excludeSwitches", ["enable-logging"])
+        prefs = options.experimental_options.setdefault("prefs", {})
+        prefs["profile.managed_default_content_settings.images"] = 2
+    return options
+
+
+def prepare_driver(driver, download_path, profile="standard", block_list=None):
+    """Finish setting up a launched driver: request blocking and headless downloads."""
+    if profile != "fast":
+        return driver
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {
+        "urls": DEFAULT_BLOCK_LIST if block_list is None else list(block_list)
+    })
+    # Headless Chrome ignores the download prefs unless downloads are allowed explicitly.
+    driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+        "behavior": "allow",
+        "downloadPath": os.path.abspath(download_path),
+        "eventsEnabled": True,
+    })
+    return driver
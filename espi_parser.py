@@ -0,0 +1,541 @@
+# espi_parser.py - Stream Green Button (ESPI) XML and CSV downloads into compact interval arrays
+import os
+import re
+import warnings
+import xml.etree.ElementTree as ET
+from zoneinfo import ZoneInfo
+import numpy as np
+
+# Bytes read per step; the parser's working set stays around this size however long the file is.
+CHUNK_SIZE = 512 * 1024
+
+# PG&E CSV exports use local wall-clock times.
+LOCAL_TIMEZONE = "America/Los_Angeles"
+
+# ESPI unit-of-measure codes used by the CSV variant.
+UOM_WH = 72
+UOM_THERM = 169
+
+START_DTYPE = np.int64
+DURATION_DTYPE = np.int32
+VALUE_DTYPE = np.float64
+QUALITY_DTYPE = np.int16
+
+_NS = rb"(?:[\w.-]+:)?"
+
+
+def _element(name, value=rb"(-?\d+)"):
+    """Build the pattern for <name>value</name> with any namespace prefix."""
+    return rb"<" + _NS + name + rb">\s*" + value + rb"\s*</" + _NS + name + rb">\s*"
+
+
+_QUALITY = rb"(?:<" + _NS + rb"ReadingQuality>\s*" + _element(rb"quality", rb"(\d+)") + rb"</" + _NS + rb"ReadingQuality>\s*)?"
+
+# One IntervalReading in schema order: cost?, ReadingQuality?, timePeriod (duration, start), value,
+# with a trailing ReadingQuality accepted as some utilities write it after the value.
+READING_PATTERN = re.compile(
+    rb"<" + _NS + rb"IntervalReading>\s*"
+    + rb"(?:" + _element(rb"cost", rb"-?\d+") + rb")?"
+    + _QUALITY
+    + rb"<" + _NS + rb"timePeriod>\s*" + _element(rb"duration", rb"(\d+)") + _element(rb"start")
+    + rb"</" + _NS + rb"timePeriod>\s*"
+    + _element(rb"value")
+    + _QUALITY
+    + rb"</" + _NS + rb"IntervalReading>"
+)
+LINK_PATTERN = re.compile(rb"<" + _NS + rb"link\s")
+HREF_PATTERN = re.compile(rb"""\bhref=["']([^"']*)["']""")
+UP_PATTERN = re.compile(rb"""\brel=["']up["']""")
+# What precedes "IntervalBlock" in its start and end tags; group 1 is the slash of an end tag.
+BLOCK_TAG_PATTERN = re.compile(rb"<(/?)(?:[\w.-]+:)?")
+# How an href to the IntervalBlock collection ends, with or without a trailing slash.
+HREF_ENDS = (b'"', b"'", b'/"', b"/'")
+REL_PATTERN = re.compile(rb"""\brel=["']([^"']*)["']""")
+LINK_TAG_PATTERN = re.compile(rb"<" + _NS + rb"link\s[^>]*>")
+MULTIPLIER_PATTERN = re.compile(_element(rb"powerOfTenMultiplier"))
+UOM_PATTERN = re.compile(_element(rb"uom", rb"(\d+)"))
+
+# bytes.translate arguments that reduce XML to its numbers: each tag becomes one
+# space and every other byte except digits, "-" and "I" is dropped. Inside an
+# IntervalBlock only the IntervalReading tags contain an "I", so the readings
+# can be counted on the much shorter result.
+TAG_TO_SPACE = bytes(0x20 if c == ord("<") else c for c in range(256))
+NOT_NUMBERS = bytes(c for c in range(256) if chr(c) not in "0123456789-<IB")
+I_TO_SPACE = bytes(0x20 if c == ord("I") else c for c in range(256))
+
+# Older NumPy stops at the first unexpected byte and warns instead of raising;
+# the short result already sends the block to the regular-expression path.
+warnings.filterwarnings("ignore", "string or file could not be read to its end", DeprecationWarning, __name__)
+
+
+class ParseError(Exception):
+    """Raised when a download is not a Green Button file this module can read."""
+
+
+class IntervalSeries:
+    """Interval readings for one meter held as parallel typed arrays.
+
+    start is epoch seconds (UTC), duration is seconds, value is in the unit
+    given by uom with its ReadingType's power-of-ten multiplier already applied, and
+    quality is the ESPI reading quality code (0 when the file has none).
+    """
+
+    def __init__(self, meter, start, duration, value, quality, uom=None):
+        self.meter = meter
+        self.start = np.asarray(start, dtype=START_DTYPE)
+        self.duration = np.asarray(duration, dtype=DURATION_DTYPE)
+        self.value = np.asarray(value, dtype=VALUE_DTYPE)
+        self.quality = np.asarray(quality, dtype=QUALITY_DTYPE)
+        self.uom = uom
+
+    def __len__(self):
+        return len(self.start)
+
+    def __repr__(self):
+        return f"IntervalSeries({self.meter!r}, {len(self)} readings)"
+
+    @property
+    def end(self):
+        """Epoch seconds at which each interval ends."""
+        return self.start + self.duration
+
+    @property
+    def nbytes(self):
+        """Memory used by the arrays."""
+        return self.start.nbytes + self.duration.nbytes + self.value.nbytes + self.quality.nbytes
+
+    @classmethod
+    def concatenate(cls, meter, parts, uom=None):
+        """Join batches into one series ordered by start; a later reading replaces an earlier one with the same start."""
+        if not parts:
+            return cls(meter, [], [], [], [], uom)
+        series = cls(
+            meter,
+            np.concatenate([part.start for part in parts]),
+            np.concatenate([part.duration for part in parts]),
+            np.concatenate([part.value for part in parts]),
+            np.concatenate([part.quality for part in parts]),
+            uom,
+        )
+        if len(series) > 1 and not np.all(series.start[1:] > series.start[:-1]):
+            # Keep the last occurrence of each start, in start order.
+            reverse = series.start[::-1]
+            _, last = np.unique(reverse, return_index=True)
+            keep = len(reverse) - 1 - last
+            series = series.take(keep)
+        return series
+
+    def take(self, index):
+        """Return a new series with the readings at index."""
+        return IntervalSeries(self.meter, self.start[index], self.duration[index], self.value[index],
+                              self.quality[index], self.uom)
+
+
+def meter_id(href):
+    """Build a meter identifier from an ESPI resource link."""
+    usage_point = re.search(r"UsagePoint/([^/]+)", href or "")
+    meter_reading = re.search(r"MeterReading/([^/]+)", href or "")
+    parts = [m.group(1) for m in (usage_point, meter_reading) if m]
+    return "_".join(parts) or "meter"
+
+
+def reading_type_key(href):
+    """Return the part of a link that names a ReadingType ("ReadingType/<id>"), so absolute and relative links match."""
+    index = href.rfind("ReadingType")
+    return href[index:].rstrip("/") if index != -1 else href
+
+
+class _ReadingTypes:
+    """Applies each MeterReading's own ReadingType (multiplier and unit) to its readings.
+
+    A MeterReading names its ReadingType with a "related" link. Meters without
+    a MeterReading entry use the ReadingType last seen before their readings.
+    Readings whose ReadingType is not known yet are held back, in order, until
+    it turns up or the file ends.
+    """
+
+    def __init__(self):
+        self.types = {}
+        self.links = {}
+        self.last = None
+        self.pending = []
+
+    def add_type(self, href, multiplier, uom):
+        """Record a ReadingType from its self link and its powerOfTenMultiplier and uom texts."""
+        reading_type = (10.0 ** int(multiplier) if multiplier else 1, int(uom) if uom else None)
+        self.types[reading_type_key(href)] = reading_type
+        self.last = reading_type
+
+    def link(self, meter_reading_href, related_hrefs):
+        """Record which ReadingType a MeterReading's related links point at."""
+        for href in related_hrefs:
+            if "ReadingType" in href:
+                self.links[meter_id(meter_reading_href)] = reading_type_key(href)
+                return
+
+    def add_entry(self, entry):
+        """Record a ReadingType or MeterReading entry given as raw bytes."""
+        links = {}
+        for tag in LINK_TAG_PATTERN.finditer(entry):
+            href, rel = HREF_PATTERN.search(tag.group()), REL_PATTERN.search(tag.group())
+            if href and rel:
+                links.setdefault(rel.group(1), []).append(href.group(1).decode("utf-8", "replace"))
+        this = (links.get(b"self") or [""])[0]
+        multiplier, uom = MULTIPLIER_PATTERN.search(entry), UOM_PATTERN.search(entry)
+        if multiplier or uom:
+            self.add_type(this, multiplier and multiplier.group(1), uom and uom.group(1))
+        elif "MeterReading" in this:
+            self.link(this, links.get(b"related", []))
+
+    def resolve(self, meter):
+        """Return (scale, uom) for a meter's readings, or None while its ReadingType is unknown."""
+        key = self.links.get(meter)
+        if key is not None:
+            return self.types.get(key)
+        return self.last
+
+    def batches(self, meter=None, arrays=None, final=False):
+        """Queue raw (start, duration, value, quality) arrays and return the IntervalSeries now ready, in order."""
+        if arrays is not None:
+            self.pending.append((meter, arrays))
+        ready, waiting, blocked = [], [], set()
+        for meter, arrays in self.pending:
+            reading_type = None if meter in blocked else self.resolve(meter)
+            if reading_type is None and final:
+                reading_type = (1, None)
+            if reading_type is None:
+                # Later readings of this meter wait too, so batches stay in file order.
+                blocked.add(meter)
+                waiting.append((meter, arrays))
+                continue
+            scale, uom = reading_type
+            start, duration, value, quality = arrays
+            value = value.astype(VALUE_DTYPE)
+            if scale != 1:
+                value *= scale
+            ready.append((meter, IntervalSeries(meter, start, duration, value, quality, uom)))
+        self.pending = waiting
+        return ready
+
+
+def _type_entries(buffer, gaps, cut, final):
+    """Return (cut, [(position, entry bytes)]) for the ReadingType and MeterReading entries in gaps before cut.
+
+    An entry that is not complete yet moves the cut back to its start, so it
+    is read whole with the next chunk.
+    """
+    entries = []
+    for start, end in gaps:
+        end = min(end, cut)
+        index = buffer.find(b"ReadingType", start, end)
+        while index != -1:
+            name = buffer.rfind(b"entry", 0, index)
+            tag = buffer.rfind(b"<", 0, name) if name != -1 else -1
+            if tag == -1 or buffer[tag + 1:tag + 2] == b"/":
+                # Not inside an entry.
+                index = buffer.find(b"ReadingType", index + 1, end)
+                continue
+            close = buffer.find(b"entry>", index)
+            if close == -1 or close + 6 > cut:
+                if not final:
+                    return tag, entries
+                return cut, entries
+            close += 6
+            entries.append((tag, buffer[tag:close]))
+            index = buffer.find(b"ReadingType", close, end)
+    return cut, entries
+
+
+def _match_readings(buffer, pos, endpos):
+    """Parse IntervalReadings with READING_PATTERN; used for blocks with quality or cost elements."""
+    rows = READING_PATTERN.findall(buffer, pos, endpos)
+    expected = buffer.count(b"IntervalReading>", pos, endpos) // 2
+    if len(rows) != expected:
+        raise ParseError(f"Parsed {len(rows)} of {expected} IntervalReading elements")
+    table = np.array(rows)
+    quality = np.char.add(table[:, 0], table[:, 4])
+    quality = np.where(quality == b"", b"0", quality).astype(QUALITY_DTYPE)
+    return table[:, 2].astype(START_DTYPE), table[:, 1].astype(DURATION_DTYPE), table[:, 3].astype(np.int64), quality
+
+
+def _readings(buffer, pos, endpos):
+    """Parse every IntervalReading between pos and endpos into (start, duration, value, quality) arrays.
+
+    Values are the raw integers; _ReadingTypes applies the multiplier.
+
+    With the markup stripped, blocks holding only timePeriod and value
+    elements read as a flat run of duration, start, value triples, which
+    np.fromstring converts without any per-reading Python work. The range may
+    span several IntervalBlocks of one meter: what is left of each
+    "IntervalBlock" is "IB", and the block headers between them are dropped
+    by keeping only the text from the first to the last reading tag ("I").
+    """
+    if buffer.find(b"IntervalReading>", pos, endpos) == -1:
+        return None
+    if pos == 0:
+        # Translating the whole buffer and trimming the tail is cheaper than copying a slice first.
+        numbers = buffer.translate(TAG_TO_SPACE, NOT_NUMBERS)
+        if endpos < len(buffer):
+            numbers = numbers[:len(numbers) - len(buffer[endpos:].translate(None, NOT_NUMBERS))]
+    else:
+        numbers = buffer[pos:endpos].translate(TAG_TO_SPACE, NOT_NUMBERS)
+    parts = []
+    for part in numbers.split(b"IB"):
+        first, last = part.find(b"I"), part.rfind(b"I")
+        if last > first:
+            parts.append(part[first:last + 1])
+    numbers = b" ".join(parts)
+    marks = numbers.count(b"I")
+    count = marks // 2
+    try:
+        flat = np.fromstring(numbers.translate(I_TO_SPACE), dtype=np.int64, sep=" ")
+    except ValueError:
+        flat = ()
+    if marks % 2 == 0 and len(flat) == 3 * count:
+        table = flat.reshape(-1, 3)
+        start, duration, value = table[:, 1], table[:, 0], table[:, 2]
+        quality = np.zeros(count, dtype=QUALITY_DTYPE)
+    else:
+        start, duration, value, quality = _match_readings(buffer, pos, endpos)
+    return start.astype(START_DTYPE), duration.astype(DURATION_DTYPE), value, quality
+
+
+def _cut(buffer):
+    """Return where the buffer can be split so no IntervalReading or element is cut in half."""
+    index = buffer.rfind(b"IntervalReading>")
+    if index != -1:
+        tag = buffer.rfind(b"<", 0, index)
+        if buffer[tag + 1:tag + 2] == b"/":
+            return index + len(b"IntervalReading>")
+        return tag
+    close = buffer.rfind(b"</")
+    if close == -1:
+        return 0
+    end = buffer.find(b">", close)
+    return end + 1 if end != -1 else close
+
+
+def _block_links(buffer, end):
+    """Return the rel="up" links to an IntervalBlock collection before end, and the gaps between IntervalBlocks.
+
+    Links are (position, href) pairs. Gaps are the (start, end) ranges outside
+    IntervalBlock elements, the only places other entries can be, so the
+    readings themselves are scanned once rather than once more per entry type.
+    """
+    links, gaps = [], []
+    gap = 0
+    index = buffer.find(b"IntervalBlock", 0, end)
+    while index != -1:
+        after = index + len(b"IntervalBlock")
+        if buffer[after:after + 1] in HREF_ENDS or buffer[after:after + 2] in HREF_ENDS:
+            tag = buffer.rfind(b"<", 0, index)
+            close = buffer.find(b">", index, end)
+            if close == -1:
+                break
+            if LINK_PATTERN.match(buffer, tag):
+                attributes = buffer[tag:close]
+                href = HREF_PATTERN.search(attributes)
+                if href and UP_PATTERN.search(attributes) and b"IntervalBlock" in href.group(1):
+                    links.append((tag, href.group(1).decode("utf-8", "replace")))
+        elif buffer[index - 1:index] in b"</:":
+            tag = buffer.rfind(b"<", 0, index)
+            element = BLOCK_TAG_PATTERN.fullmatch(buffer, tag, index) if tag != -1 else None
+            if element and element.group(1):
+                gap = after
+            elif element and gap is not None:
+                gaps.append((gap, tag))
+                gap = None
+        index = buffer.find(b"IntervalBlock", after, end)
+    if gap is not None:
+        gaps.append((gap, end))
+    return links, gaps
+
+
+def iter_espi_batches(path, chunk_size=CHUNK_SIZE):
+    """Yield (meter, IntervalSeries) batches from an ESPI XML file read in fixed-size chunks.
+
+    Each chunk is cut after its last complete IntervalReading and split into
+    IntervalBlocks at their "up" links; the readings of a block become arrays
+    without building any elements. ReadingType and MeterReading entries are
+    read as they pass, so every meter gets its own multiplier and unit.
+    """
+    types = _ReadingTypes()
+    meter = "meter"
+    meters = {}
+    buffer = b""
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            buffer = buffer + data if buffer else data
+            cut = len(buffer) if not data else _cut(buffer)
+            links, gaps = _block_links(buffer, cut)
+            cut, entries = _type_entries(buffer, gaps, cut, not data)
+            # Block links and ReadingType/MeterReading entries, in file order.
+            points = [(link, href, None) for link, href in links if link < cut]
+            if entries:
+                points = sorted(points + [(position, None, entry) for position, entry in entries],
+                                key=lambda point: point[0])
+            pos = 0
+            for position, href, entry in points:
+                if href is not None:
+                    if href not in meters:
+                        meters[href] = meter_id(href)
+                    if meters[href] == meter:
+                        # Consecutive blocks of one meter are parsed together.
+                        continue
+                yield from types.batches(meter, _readings(buffer, pos, position))
+                if href is None:
+                    types.add_entry(entry)
+                else:
+                    meter = meters[href]
+                pos = position
+            yield from types.batches(meter, _readings(buffer, pos, cut))
+            buffer = buffer[cut:]
+            if not data:
+                yield from types.batches(final=True)
+                return
+
+
+def iter_espi_batches_slow(path):
+    """Yield (meter, IntervalSeries) batches using ElementTree; handles layouts the fast path rejects."""
+    atom = "{http://www.w3.org/2005/Atom}"
+    espi = "{http://naesb.org/espi}"
+    types = _ReadingTypes()
+    meter = "meter"
+    links = {}
+    rows = []
+
+    def flush():
+        arrays = tuple(np.array(column, dtype=np.int64) for column in zip(*rows))
+        rows.clear()
+        return types.batches(meter, arrays)
+
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start" and elem.tag == f"{atom}entry":
+            links = {}
+        elif event == "start" and elem.tag == f"{atom}link":
+            href = elem.get("href") or ""
+            links.setdefault(elem.get("rel"), []).append(href)
+            if elem.get("rel") == "up" and "IntervalBlock" in href:
+                if rows:
+                    yield from flush()
+                meter = meter_id(href)
+        elif event == "end" and elem.tag == f"{espi}ReadingType":
+            types.add_type((links.get("self") or [""])[0], elem.findtext(f"{espi}powerOfTenMultiplier"),
+                           elem.findtext(f"{espi}uom"))
+            yield from types.batches()
+        elif event == "end" and elem.tag == f"{espi}MeterReading":
+            types.link((links.get("self") or [""])[0], links.get("related", []))
+            yield from types.batches()
+        elif event == "end" and elem.tag == f"{espi}IntervalReading":
+            quality = elem.findtext(f"{espi}ReadingQuality/{espi}quality")
+            rows.append((
+                int(elem.findtext(f"{espi}timePeriod/{espi}start")),
+                int(elem.findtext(f"{espi}timePeriod/{espi}duration")),
+                int(elem.findtext(f"{espi}value")),
+                int(quality) if quality else 0,
+            ))
+            elem.clear()
+        elif event == "end" and elem.tag == f"{espi}IntervalBlock" and rows:
+            yield from flush()
+        elif event == "end" and elem.tag == f"{atom}entry":
+            elem.clear()
+    if rows:
+        yield from flush()
+    yield from types.batches(final=True)
+
+
+def _local_to_epoch(local_minutes, timezone):
+    """Convert naive local times (datetime64[m]) to UTC epoch seconds, resolving DST per distinct hour.
+
+    A repeated wall-clock time during the fall-back hour is taken as the second
+    (standard time) occurrence.
+    """
+    zone = ZoneInfo(timezone)
+    hours = local_minutes.astype("datetime64[h]")
+    keys, inverse = np.unique(hours, return_inverse=True)
+    offsets = np.empty((len(keys), 2), dtype=np.int64)
+    for i, key in enumerate(keys.astype(object)):
+        for fold in (0, 1):
+            offsets[i, fold] = int(key.replace(tzinfo=zone, fold=fold).utcoffset().total_seconds())
+    fold = np.zeros(len(local_minutes), dtype=np.intp)
+    _, first = np.unique(local_minutes, return_index=True)
+    if len(first) != len(local_minutes):
+        fold[:] = 1
+        fold[first] = 0
+    seconds = local_minutes.astype("datetime64[s]").astype(np.int64)
+    return seconds - offsets[inverse.reshape(-1), fold]
+
+
+def _read_merged_csv(path, meter):
+    """Read a start,duration,value,quality CSV written by date_chunks.merge_chunks."""
+    with open(path, "rb") as f:
+        f.readline()
+        table = np.fromstring(f.read().replace(b",", b" "), dtype=np.float64, sep=" ").reshape(-1, 4)
+    return IntervalSeries(meter, table[:, 0], table[:, 1], table[:, 2], table[:, 3])
+
+
+def _read_pge_csv(path, lines, timezone):
+    """Read PG&E's 'Download my data' CSV (TYPE,DATE,START TIME,END TIME,USAGE,...)."""
+    details = {}
+    for number, line in enumerate(lines):
+        fields = [field.strip().strip('"') for field in line.split(",")]
+        if fields[0].upper() == "TYPE":
+            header = [field.upper() for field in fields]
+            break
+        if len(fields) > 1:
+            details[fields[0].lower()] = fields[1]
+    else:
+        raise ParseError(f"{path} has no TYPE,DATE,... header row")
+
+    usage = next((i for i, name in enumerate(header) if name.startswith(("USAGE", "IMPORT"))), None)
+    if usage is None or "DATE" not in header or "START TIME" not in header:
+        raise ParseError(f"{path} has no usage column")
+    unit = header[usage][header[usage].find("(") + 1:header[usage].rfind(")")].lower()
+    scale, uom = (1000.0, UOM_WH) if unit == "kwh" else (1.0, UOM_THERM if unit == "therms" else None)
+    date, start, end = header.index("DATE"), header.index("START TIME"), header.index("END TIME")
+
+    rows = [line.split(",") for line in lines[number + 1:] if line.strip()]
+    if not rows:
+        raise ParseError(f"{path} has no readings")
+    starts = np.array([f"{row[date]}T{row[start]}" for row in rows], dtype="datetime64[m]")
+    ends = np.array([f"{row[date]}T{row[end]}" for row in rows], dtype="datetime64[m]")
+    duration = ((ends - starts).astype(np.int64) + 1) * 60
+    duration[duration <= 0] += 24 * 3600
+    value = np.array([row[usage] for row in rows], dtype=VALUE_DTYPE) * scale
+    meter = "_".join(part for part in (details.get("account number"), details.get("service")) if part)
+    meter = re.sub(r"[^\w.-]+", "-", meter) or "meter"
+    return IntervalSeries(meter, _local_to_epoch(starts, timezone), duration, value,
+                          np.zeros(len(rows), dtype=QUALITY_DTYPE), uom)
+
+
+def parse_csv(path, timezone=LOCAL_TIMEZONE):
+    """Parse a Green Button CSV download and return {meter: IntervalSeries}."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        first = f.readline()
+        if first.strip().lower() == "start,duration,value,quality":
+            match = re.match(r"[^_]+_(.+)_\d{8}_\d{8}(?:_\d+)?\.csv$", os.path.basename(path))
+            series = _read_merged_csv(path, match.group(1) if match else "meter")
+        else:
+            series = _read_pge_csv(path, [first] + f.read().splitlines(), timezone)
+    return {series.meter: series}
+
+
+def parse_file(path, chunk_size=CHUNK_SIZE, timezone=LOCAL_TIMEZONE):
+    """Parse a Green Button XML or CSV download and return {meter: IntervalSeries}."""
+    if path.lower().endswith(".csv"):
+        batches = list(parse_csv(path, timezone).items())
+    else:
+        try:
+            batches = list(iter_espi_batches(path, chunk_size))
+        except ParseError as e:
+            print(f"Fast ESPI parser could not read {path} ({e}); using ElementTree")
+            batches = list(iter_espi_batches_slow(path))
+    meters = {}
+    for meter, batch in batches:
+        meters.setdefault(meter, []).append(batch)
+    return {
+        meter: IntervalSeries.concatenate(meter, parts, parts[0].uom)
+        for meter, parts in meters.items()
+    }
+
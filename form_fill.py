@@ -0,0 +1,72 @@
+# form_fill.py - Fill a group of form fields in one script execution, with a keystroke fallback per field
+from lazy_import import lazy
+
+Keys = lazy("selenium.webdriver.common.keys", "Keys")
+
+# Sets every field through the native value setter, so frameworks that wrap the
+# value property (React, Angular) see the change, then fires the events they
+# listen for. Returns the indexes of fields that did not keep the value.
+FILL_SCRIPT = """
+var fields = arguments[0], unlock = arguments[1], pressEnter = arguments[2];
+var rejected = [];
+function fire(el, type) {
+    el.dispatchEvent(new Event(type, {bubbles: true}));
+}
+function key(el, type) {
+    var event = new KeyboardEvent(type, {key: 'Enter', code: 'Enter', bubbles: true, cancelable: true});
+    // Older widgets (jQuery UI datepickers) read keyCode/which, which the constructor leaves at 0.
+    Object.defineProperty(event, 'keyCode', {get: function() { return 13; }});
+    Object.defineProperty(event, 'which', {get: function() { return 13; }});
+    el.dispatchEvent(event);
+}
+for (var i = 0; i < fields.length; i++) {
+    var el = fields[i][0], value = fields[i][1];
+    try {
+        if (unlock) el.removeAttribute('readonly');
+        if (el.disabled || el.readOnly) { rejected.push(i); continue; }
+        el.focus();
+        var proto = Object.getPrototypeOf(el);
+        var setter = Object.getOwnPropertyDescriptor(proto, 'value');
+        if (setter && setter.set) setter.set.call(el, value); else el.value = value;
+        fire(el, 'input');
+        if (el.value !== value) { rejected.push(i); continue; }
+        fire(el, 'change');
+        if (pressEnter) { key(el, 'keydown'); key(el, 'keypress'); key(el, 'keyup'); }
+        el.blur();
+    } catch (e) {
+        rejected.push(i);
+    }
+}
+return rejected;
+"""
+
+
+def fill_form(driver, fields, unlock=False, press_enter=False):
+    """Fill [(element, value), ...] in one round trip and return the fields typed by hand.
+
+    unlock removes the readonly attribute first, as date pickers set it to
+    force their calendar popup; press_enter sends Enter after each value to
+    close such popups. Fields that are disabled, stay read-only, drop the
+    value or make the script fail are cleared and typed with real keystrokes.
+    Entries whose element is None are skipped.
+    """
+    fields = [(element, value) for element, value in fields if element is not None]
+    if not fields:
+        return []
+    try:
+        rejected = driver.execute_script(FILL_SCRIPT, [[element, value] for element, value in fields],
+                                         unlock, press_enter)
+    except Exception as e:
+        print(f"Scripted form fill failed, typing every field: {e}")
+        rejected = range(len(fields))
+    typed = []
+    for index in rejected:
+        element, value = fields[index]
+        element.clear()
+        element.send_keys(value)
+        if press_enter:
+            element.send_keys(Keys.RETURN)
+        typed.append(element)
+    if typed:
+        print(f"Typed {len(typed)} of {len(fields)} fields that rejected scripted input")
+    return typed
@@ -0,0 +1,146 @@
+# green_button_export.py - Direct HTTP Green Button export using the browser's authenticated cookies
+import os
+import re
+import tempfile
+from datetime import date, datetime
+from lazy_import import lazy
+
+# Loaded on first use so the GUIs can import the endpoints without loading requests.
+requests = lazy("requests")
+HTTPAdapter = lazy("requests.adapters", "HTTPAdapter")
+capture_cookies = lazy("session_cache", "capture_cookies")
+
+# Export requests for the portals' Green Button dialogs. These defaults are
+# the requests the stand-in portal (benchmarks/mock_portal.py) serves and have
+# not been confirmed against live portal traffic: capture the request the
+# dialog's download button sends (browser devtools, Network tab) and pass it as
+# the scrapers' export_endpoint if it differs. Direct export falls back to the
+# click path whenever the request fails. Values in "params" are formatted with
+# {start}, {end} and {account}.
+PGE_ENDPOINT = {
+    "url": "https://www.pge.com/myaccount/usage/greenbutton/export",
+    "method": "GET",
+    "date_format": "%Y-%m-%d",
+    "params": {"from": "{start}", "to": "{end}", "format": "xml", "account": "{account}"},
+}
+
+MYENERGYCENTER_ENDPOINT = {
+    "url": "https://myenergycenter.com/portal/Usage/GreenButtonDownload",
+    "method": "POST",
+    "date_format": "%B %d, %Y",
+    "params": {"fromDate": "{start}", "toDate": "{end}", "accountId": "{account}"},
+}
+
+
+class ExportError(Exception):
+    """Raised when the portal does not return a Green Button file."""
+
+
+def reserve_path(path):
+    """Create an empty file at path, or at path with _1, _2, ... before the extension if taken, and return its path."""
+    root, extension = os.path.splitext(path)
+    candidate, number = path, 0
+    while True:
+        try:
+            os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return candidate
+        except FileExistsError:
+            number += 1
+            candidate = f"{root}_{number}{extension}"
+
+
+def to_date(value):
+    """Convert a QDate, datetime, date or ISO string to a date."""
+    if hasattr(value, "toPyDate"):
+        return value.toPyDate()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+class GreenButtonExporter:
+    """Calls a portal's Green Button export request directly over a pooled HTTP session."""
+
+    def __init__(self, endpoint, session=None, timeout=120, pool_size=8):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    @classmethod
+    def from_driver(cls, driver, endpoint, **kwargs):
+        """Build an exporter that reuses a logged-in WebDriver's cookies and user agent."""
+        exporter = cls(endpoint, **kwargs)
+        exporter.session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+        for cookie in capture_cookies(driver):
+            exporter.session.cookies.set(
+                cookie["name"], cookie["value"],
+                domain=cookie.get("domain"), path=cookie.get("path", "/"),
+                secure=cookie.get("secure", False)
+            )
+        return exporter
+
+    def build_request(self, start, end, account=""):
+        """Return the (method, url, params) for one export."""
+        fmt = self.endpoint["date_format"]
+        values = {
+            "start": to_date(start).strftime(fmt),
+            "end": to_date(end).strftime(fmt),
+            "account": account or "",
+        }
+        params = {key: template.format(**values) for key, template in self.endpoint["params"].items()}
+        params = {key: value for key, value in params.items() if value != ""}
+        return self.endpoint.get("method", "GET").upper(), self.endpoint["url"], params
+
+    @staticmethod
+    def filename_for(response, start, end, account=""):
+        """Use the server's file name prefixed with the account, or build one from the account and date range."""
+        disposition = response.headers.get("Content-Disposition", "")
+        match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition)
+        if match:
+            name = os.path.basename(match.group(1))
+            # Portals often name every export the same, whatever the account.
+            return f"{account}_{name}" if account and account not in name else name
+        suffix = ".csv" if "csv" in response.headers.get("Content-Type", "") else ".xml"
+        prefix = f"{account}_" if account else ""
+        return f"GreenButton_{prefix}{to_date(start):%Y%m%d}_{to_date(end):%Y%m%d}{suffix}"
+
+    def export(self, start, end, download_path, account=""):
+        """Download one date range for one account and return the saved file path.
+
+        An existing file is never replaced: the download gets a numbered name instead.
+        """
+        method, url, params = self.build_request(start, end, account)
+        if method == "GET":
+            response = self.session.get(url, params=params, timeout=self.timeout, stream=True)
+        else:
+            response = self.session.post(url, data=params, timeout=self.timeout, stream=True)
+        with response:
+            if response.status_code != 200:
+                raise ExportError(f"Export request failed with HTTP {response.status_code}")
+            if "text/html" in response.headers.get("Content-Type", ""):
+                raise ExportError("Export returned an HTML page; the session is probably not authenticated")
+            name = self.filename_for(response, start, end, account)
+            fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".part", dir=download_path)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                path = reserve_path(os.path.join(download_path, name))
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        print(f"Exported {path}")
+        return path
+
+    def close(self):
+        """Release pooled connections."""
+        self.session.close()
@@ -0,0 +1,186 @@
+# interval_store.py - Columnar per-meter interval store with memory-mapped reads
+import json
+import os
+import re
+import tempfile
+import threading
+import numpy as np
+from espi_parser import IntervalSeries, parse_file
+from download_tracker import is_partial
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".youpower", "store")
+
+# One raw little-endian file per column in every meter directory, named
+# "<column>.<generation>"; a rewrite writes the next generation and switches
+# to it by updating meta.json, so readers never see half-written columns.
+COLUMNS = {"start": "<i8", "duration": "<i4", "value": "<f8", "quality": "<i2"}
+
+DOWNLOAD_SUFFIXES = (".xml", ".csv")
+
+
+def _load_json(path, default):
+    """Read a JSON file, returning default when it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _save_json(path, data):
+    """Write a JSON file atomically."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class IntervalStore:
+    """Append-only column files per meter, read back through np.memmap without copying.
+
+    Readings newer than a meter's last stored start are appended to the column
+    files. Older readings (a backfill) or changed values for stored intervals
+    (a late revision) rewrite that meter's columns once, merged in start order.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.lock = threading.Lock()
+        self.manifest_path = os.path.join(root, "ingested.json")
+        self.manifest = _load_json(self.manifest_path, {})
+        self.maps = {}
+
+    def meter_dir(self, meter):
+        """Return the directory holding a meter's columns."""
+        return os.path.join(self.root, re.sub(r"[^\w.-]+", "-", meter))
+
+    def meta(self, meter):
+        """Return a meter's metadata: row count, last start, unit and column generation."""
+        return _load_json(os.path.join(self.meter_dir(meter), "meta.json"),
+                          {"meter": meter, "count": 0, "last_start": None, "uom": None, "generation": 0})
+
+    def column_path(self, meter, name, generation):
+        """Return the file holding one column of a meter."""
+        return os.path.join(self.meter_dir(meter), f"{name}.{generation}")
+
+    def meters(self):
+        """Return the meters in the store."""
+        found = []
+        for name in sorted(os.listdir(self.root)):
+            meta = _load_json(os.path.join(self.root, name, "meta.json"), None)
+            if meta:
+                found.append(meta["meter"])
+        return found
+
+    def read(self, meter, start=None, end=None):
+        """Return readings with start in [start, end) (epoch seconds) as memory-mapped arrays."""
+        meta = self.meta(meter)
+        count = meta["count"]
+        if not count:
+            return IntervalSeries(meter, [], [], [], [], meta["uom"])
+        key = (count, meta["generation"])
+        cached = self.maps.get(meter)
+        if cached is None or cached[0] != key:
+            columns = {
+                name: np.memmap(self.column_path(meter, name, meta["generation"]), dtype=dtype, mode="r",
+                                shape=(count,))
+                for name, dtype in COLUMNS.items()
+            }
+            cached = self.maps[meter] = (key, columns)
+        columns = cached[1]
+        low = 0 if start is None else int(np.searchsorted(columns["start"], start, "left"))
+        high = count if end is None else int(np.searchsorted(columns["start"], end, "left"))
+        return IntervalSeries(meter, *(columns[name][low:high] for name in COLUMNS), uom=meta["uom"])
+
+    def _write_columns(self, meta, series, offset):
+        """Write series into the current generation's column files starting at row offset."""
+        for name, dtype in COLUMNS.items():
+            path = self.column_path(meta["meter"], name, meta["generation"])
+            position = offset * np.dtype(dtype).itemsize
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                if os.path.getsize(path) > position:
+                    # Drop rows left by an append that did not finish updating meta.json.
+                    f.truncate(position)
+                f.seek(position)
+                np.ascontiguousarray(getattr(series, name), dtype=dtype).tofile(f)
+        meta.update(count=offset + len(series), last_start=int(series.start[-1]))
+        if meta["uom"] is None:
+            meta["uom"] = series.uom
+        _save_json(os.path.join(self.meter_dir(meta["meter"]), "meta.json"), meta)
+
+    def _rewrite(self, meta, series):
+        """Replace a meter's columns with series by writing the next generation."""
+        old = meta["generation"]
+        meta["generation"] = old + 1
+        self._write_columns(meta, series, 0)
+        self.maps.pop(meta["meter"], None)
+        for name in COLUMNS:
+            try:
+                os.remove(self.column_path(meta["meter"], name, old))
+            except OSError:
+                # Still mapped by a reader on Windows; it is removed by the next rewrite.
+                pass
+
+    def append(self, series):
+        """Store a meter's readings; return how many readings were added or revised."""
+        series = IntervalSeries.concatenate(series.meter, [series], series.uom)
+        if not len(series):
+            return 0
+        with self.lock:
+            os.makedirs(self.meter_dir(series.meter), exist_ok=True)
+            meta = self.meta(series.meter)
+            if not meta["count"]:
+                self._write_columns(meta, series, 0)
+                return len(series)
+
+            newer = series.start > meta["last_start"]
+            older = series.take(np.flatnonzero(~newer))
+            stored = self.read(series.meter) if len(older) else None
+            if len(older):
+                index = np.minimum(np.searchsorted(stored.start, older.start), len(stored) - 1)
+                present = stored.start[index] == older.start
+                changed = ~present | (stored.value[index] != older.value) | (stored.quality[index] != older.quality)
+                if changed.any():
+                    self._rewrite(meta, IntervalSeries.concatenate(series.meter, [stored, series], meta["uom"]))
+                    return int(changed.sum() + newer.sum())
+            if newer.any():
+                self._write_columns(meta, series.take(np.flatnonzero(newer)), meta["count"])
+            return int(newer.sum())
+
+    def ingest_files(self, paths):
+        """Parse downloaded files that are new or changed since their last ingest; return {meter: readings added}."""
+        added = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+                signature = [stat.st_size, stat.st_mtime]
+                if self.manifest.get(path) == signature:
+                    continue
+                for meter, series in parse_file(path).items():
+                    added[meter] = added.get(meter, 0) + self.append(series)
+                with self.lock:
+                    self.manifest[path] = signature
+                    _save_json(self.manifest_path, self.manifest)
+            except Exception as e:
+                print(f"Could not ingest {path}: {e}")
+        for meter, count in added.items():
+            print(f"Stored {count} readings for meter {meter}")
+        return added
+
+    def ingest_directory(self, directory):
+        """Ingest the Green Button files in a download folder, oldest first."""
+        paths = [
+            entry.path for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.lower().endswith(DOWNLOAD_SUFFIXES) and not is_partial(entry.name)
+        ]
+        return self.ingest_files(sorted(paths, key=os.path.getmtime))
@@ -0,0 +1,70 @@
+# lazy_import.py - Deferred imports so the windows can show before Selenium, numpy and requests have loaded
+import importlib
+import threading
+import time
+
+# Every module named through lazy(), in registration order; preload() imports
+# them and build.py passes them to PyInstaller as hidden imports.
+REGISTERED = []
+
+
+class LazyImport:
+    """Stands in for a module, or one of its attributes, until it is first used.
+
+    Attribute access and calls import the module on demand, so code written
+    against the real object keeps working. Imports run under Python's import
+    lock, so resolving from the GUI thread, a worker thread and preload() at
+    the same time is safe.
+    """
+
+    def __init__(self, module, attribute=None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def resolve(self):
+        """Import the module and return the real object."""
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attribute) if self._attribute else target
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        return f"<lazy {name}{'' if self._target is None else ' (loaded)'}>"
+
+
+def lazy(module, attribute=None):
+    """Return a LazyImport for a module or module attribute and register the module for preloading."""
+    if module not in REGISTERED:
+        REGISTERED.append(module)
+    return LazyImport(module, attribute)
+
+
+def preload(modules=None, on_done=None):
+    """Import modules (default: everything registered) in a background thread and return the thread.
+
+    on_done, if given, is called from that thread with the seconds it took.
+    An import that fails here is retried, and raises, where it is first used.
+    """
+    names = list(REGISTERED if modules is None else modules)
+
+    def load():
+        started = time.perf_counter()
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                print(f"Background import of {name} failed: {e}")
+        if on_done:
+            on_done(time.perf_counter() - started)
+
+    thread = threading.Thread(target=load, name="preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,495 @@
+# myenergycenter_scraper.py - myenergycenter.com Green Button scraper core, usable without Qt (see scraper_core.py)
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from lazy_import import lazy
+from driver_profiles import apply_profile, prepare_driver
+from driver_cache import launch_chrome
+from green_button_export import GreenButtonExporter, MYENERGYCENTER_ENDPOINT, to_date
+from scraper_core import Cancelled, ScraperJob
+from sync_state import SyncState, DEFAULT_OVERLAP_DAYS
+
+
+# Loaded on first use, or in the background by preload() once the window is up, so the
+# window does not wait for Selenium and numpy to import.
+webdriver = lazy("selenium.webdriver")
+By = lazy("selenium.webdriver.common.by", "By")
+WebDriverWait = lazy("selenium.webdriver.support.ui", "WebDriverWait")
+EC = lazy("selenium.webdriver.support.expected_conditions")
+Keys = lazy("selenium.webdriver.common.keys", "Keys")
+PageReadiness = lazy("readiness", "PageReadiness")
+SessionCache = lazy("session_cache", "SessionCache")
+restore_session = lazy("session_cache", "restore_session")
+store_session = lazy("session_cache", "store_session")
+private_downloads = lazy("download_tracker", "private_downloads")
+fill_form = lazy("form_fill", "fill_form")
+Tracer = lazy("telemetry", "Tracer")
+
+MYENERGYCENTER_BASE_URL = "https://myenergycenter.com"
+
+# Reads every account from the select behind the bootstrap-select dropdown in one
+# call, falling back to the rendered dropdown entries when there is no select.
+ACCOUNT_LIST_SCRIPT = """
+var select = document.getElementById('accountList');
+if (select && select.options && select.options.length) {
+    return Array.prototype.map.call(select.options, function(option, i) {
+        return {index: i, id: option.value, label: (option.text || '').trim()};
+    });
+}
+return Array.prototype.map.call(document.querySelectorAll('ul.dropdown-menu > li'), function(item, i) {
+    return {index: i, id: '', label: (item.innerText || item.textContent || '').trim()};
+});
+"""
+
+# Selects an account by value and fires the change event the portal listens for.
+SELECT_ACCOUNT_SCRIPT = """
+var accountId = arguments[0];
+var select = document.getElementById('accountList');
+if (!select) return 'missing';
+var option = Array.prototype.find.call(select.options, function(o) { return o.value === accountId; });
+if (!option) return 'missing';
+if (select.value === option.value) return 'current';
+select.value = option.value;
+if (window.jQuery && jQuery(select).selectpicker) { jQuery(select).selectpicker('refresh'); }
+select.dispatchEvent(new Event('change', {bubbles: true}));
+return 'switched';
+"""
+
+# Posts an account ID to the portal's switch endpoint from the current page, so
+# the session's account changes without loading the Dashboard. The redirect
+# the portal answers with is not followed.
+POST_ACCOUNT_SCRIPT = """
+var done = arguments[arguments.length - 1];
+fetch(arguments[0], {
+    method: 'POST', credentials: 'same-origin', redirect: 'manual',
+    headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+    body: 'account=' + encodeURIComponent(arguments[1])
+}).then(function(r) { done(r.ok || r.type === 'opaqueredirect'); }, function() { done(false); });
+"""
+ACCOUNT_SWITCH_PATH = "/portal/Dashboard/index"
+
+class MyEnergyCenterJob(ScraperJob):
+    """Selenium automation for myenergycenter.com."""
+    step_counter = 0
+    driver = None
+
+    def __init__(self, url, username, password, start_date, end_date, download_path, timeouts=None,
+                 session_cache=None, pool=None, profile="standard", block_list=None,
+                 direct_export=False, export_endpoint=None, concurrency=1, account_switch_url=None,
+                 sync=False, overlap_days=DEFAULT_OVERLAP_DAYS, sync_state=None, store=None, tracer=None,
+                 base_url=MYENERGYCENTER_BASE_URL, backend="selenium", cancel_token=None):
+        super().__init__(cancel_token)
+        self.url = url
+        self.username = username
+        self.password = password
+        self.start_date = start_date
+        self.end_date = end_date
+        self.download_path = download_path
+        self.downloaded_files = []
+        self.timeouts = timeouts
+        self.readiness = None
+        self.session_cache = session_cache
+        self.pool = pool
+        self.profile = profile
+        self.block_list = block_list
+        self.direct_export = direct_export
+        self.export_endpoint = export_endpoint or MYENERGYCENTER_ENDPOINT
+        self.concurrency = max(1, concurrency)
+        self.account_switch_url = account_switch_url
+        self.sync = sync
+        self.overlap_days = overlap_days
+        self.sync_state = sync_state
+        self.store = store
+        self.tracer = tracer
+        self.base_url = base_url.rstrip("/")
+        self.backend = backend
+        self.account_results = {}
+        self.progress_lock = threading.Lock()
+
+    def wait_for_element(self, driver, locator, step, clickable=False, timeout=10):
+        """Wait for an element and record the lookup as a selector span."""
+        condition = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+        with self.tracer.span("selector", step=step, selector=locator[1]):
+            return WebDriverWait(driver, timeout).until(condition(locator))
+
+    def login_to_portal(self, driver, url, username, password):
+        """Perform login actions."""
+        for attempt in range(3):
+            with self.tracer.span("navigate", step="login_page"):
+                driver.get(url)
+                self.readiness.wait_for_document_ready("login_page")
+                driver.refresh()
+                self.readiness.wait_for_document_ready("login_page")
+
+            try:
+                print(f"Attempt {attempt + 1}: Logging in...")
+                login_form_present = self.wait_for_element(driver, (By.ID, "usernamex"), "username", timeout=5)
+
+                if login_form_present:
+                    username_field = driver.find_element(By.ID, "usernamex")
+                    password_field = driver.find_element(By.ID, "passwordx")
+                    with self.tracer.span("fill", step="login_form"):
+                        fill_form(driver, [(username_field, username), (password_field, password)])
+
+                    login_url = driver.current_url
+                    driver.find_element(By.ID, "btnlogin").click()
+                    self.readiness.wait_for_url_change(login_url, "login_submit")
+                    self.readiness.wait_for_page("login_submit")
+                else:
+                    print("Login form not found. Assuming login was successful.")
+                    return True
+
+                form_still_present = driver.find_elements(By.ID, "usernamex")
+                if not form_still_present:
+                    print("Login successful!")
+                    return True
+
+            except Exception as e:
+                print(f"Login attempt {attempt + 1} failed: {e}")
+        return False
+
+    @staticmethod
+    def is_logged_in(driver):
+        """Check whether the dashboard account selector is available."""
+        try:
+            WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "button[data-id='accountList']"))
+            )
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def validate_and_format_date(date_string):
+        """Validate and format the date to MMM DD, YYYY."""
+        accepted_formats = ["%B %d, %Y", "%Y-%m-%d", "%d %B, %Y"]
+        for date_format in accepted_formats:
+            try:
+                date_obj = datetime.strptime(date_string, date_format)
+                return date_obj.strftime("%B %d, %Y")
+            except ValueError:
+                continue
+        raise ValueError(f"Invalid date format: {date_string}. Expected formats: {', '.join(accepted_formats)}.")
+
+    def export_file(self, driver, start_date, end_date, total_steps, account_id=""):
+        """Export the selected account's data over HTTP with the logged-in session and return the file path."""
+        exporter = GreenButtonExporter.from_driver(driver, self.export_endpoint)
+        try:
+            with self.tracer.span("direct_export"):
+                path = exporter.export(start_date, end_date, self.download_path, account_id)
+            self.downloaded_files.append(path)
+        finally:
+            exporter.close()
+        self.advance(total_steps, 2)
+        return path
+
+    def download_file(self, driver, start_date, end_date, total_steps, account_id=""):
+        """Download file with custom date range and return the downloaded file path."""
+        if self.direct_export:
+            try:
+                return self.export_file(driver, start_date, end_date, total_steps, account_id)
+            except Exception as e:
+                print(f"Direct export failed, falling back to the Green Button modal: {e}")
+
+        with self.tracer.span("navigate", step="usage_page"):
+            driver.get(f"{self.base_url}/portal/Usage/Index")
+            self.readiness.wait_for_page("usage_page")
+        self.advance(total_steps)
+
+        start_date = self.validate_and_format_date(start_date)
+        end_date = self.validate_and_format_date(end_date)
+
+        green_button_download = self.wait_for_element(driver, (By.ID, "gbloadpopup"), "green_button", timeout=5)
+        green_button_download.click()
+        print("Modal opened.")
+        self.readiness.wait_for_network_idle("green_button_modal")
+
+        from_date_picker = self.wait_for_element(driver, (By.ID, "gbfromdatepicker"), "from_field", timeout=5)
+        self.readiness.wait_for_element_stable(from_date_picker, "date_fields")
+        to_date_picker = self.wait_for_element(driver, (By.ID, "gbtodatepicker"), "to_field", timeout=5)
+        # The pickers are read-only to force their calendar; unlock and fill both, pressing Enter to close it.
+        with self.tracer.span("fill", step="date_range"):
+            fill_form(driver, [(from_date_picker, start_date), (to_date_picker, end_date)],
+                      unlock=True, press_enter=True)
+        print(f"Date range entered: {start_date} to {end_date}")
+
+        download_button = self.wait_for_element(driver, (By.ID, "btngbDataDownload"), "download_button",
+                                                clickable=True)
+        self.readiness.wait_for_element_stable(download_button, "download_button")
+        with private_downloads(driver, self.download_path) as downloads:
+            download_job = downloads.start_job()
+            download_button.click()
+            print("Download initiated.")
+            downloaded = self.readiness.wait_for_download(downloads, download_job)
+        if not downloaded:
+            raise Exception("Download did not complete in time")
+        print(f"Downloaded {downloaded[0]} ({downloaded[1]} bytes)")
+        self.downloaded_files.append(downloaded[0])
+        self.advance(total_steps)
+        return downloaded[0]
+
+    def interact_with_dropdown(self, driver, start_date, end_date):
+        """Read the account list once and download every account."""
+        self.wait_for_element(driver, (By.CSS_SELECTOR, "button[data-id='accountList']"), "account_list")
+        accounts = driver.execute_script(ACCOUNT_LIST_SCRIPT)
+        total_items = len(accounts)
+        steps_per_cycle = 3
+        total_steps = total_items * steps_per_cycle
+        print(f"Found {total_items} items in the dropdown. Total steps: {total_steps}.")
+
+        if self.concurrency > 1 and total_items > 1:
+            self.fan_out(driver, start_date, end_date, accounts, total_steps)
+        else:
+            self.process_accounts(driver, start_date, end_date, accounts, total_steps)
+
+    def switch_account(self, driver, account):
+        """Make an account current by its ID, falling back to its Dashboard dropdown entry."""
+        if account["id"]:
+            try:
+                if self.account_switch_url:
+                    driver.get(self.account_switch_url.format(account=account["id"]))
+                    self.readiness.wait_for_page("account_switch")
+                    return
+                if driver.execute_async_script(POST_ACCOUNT_SCRIPT, self.base_url + ACCOUNT_SWITCH_PATH,
+                                               account["id"]):
+                    return
+                print("Account switch was refused, falling back to the Dashboard.")
+            except Exception as e:
+                print(f"Account switch failed, falling back to the Dashboard: {e}")
+
+        if not driver.find_elements(By.CSS_SELECTOR, "button[data-id='accountList']"):
+            driver.get(f"{self.base_url}/portal/Dashboard/index")
+            self.readiness.wait_for_page("dashboard")
+        dropdown_button = self.wait_for_element(driver, (By.CSS_SELECTOR, "button[data-id='accountList']"),
+                                                "account_list")
+
+        state = driver.execute_script(SELECT_ACCOUNT_SCRIPT, account["id"]) if account["id"] else "missing"
+        if state == "current":
+            return
+        if state == "missing":
+            dropdown_button.click()
+            clickable_item = WebDriverWait(driver, 10).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.dropdown-menu > li"))
+            )[account["index"]]
+            driver.execute_script("arguments[0].scrollIntoView(true);", clickable_item)
+            self.readiness.wait_for_element_stable(clickable_item, "dropdown_item")
+            clickable_item.click()
+
+        print("Waiting for page to reload...")
+        WebDriverWait(driver, 20).until(EC.staleness_of(dropdown_button))
+        self.readiness.wait_for_document_ready("account_switch")
+        print("Page reloaded successfully.")
+
+    def sync_window(self, account, start_date, end_date):
+        """Return the (start, end) strings still to fetch for an account, or None when it is up to date."""
+        window = self.sync_state.sync_range("myenergycenter", account["id"] or account["label"],
+                                            to_date(start_date), to_date(end_date), self.overlap_days)
+        if window is None:
+            return None
+        return window[0].strftime("%Y-%m-%d"), window[1].strftime("%Y-%m-%d")
+
+    def process_accounts(self, driver, start_date, end_date, accounts, total_steps):
+        """Switch to each account and download its data."""
+        for account in accounts:
+            self.check_cancelled()
+            label = account["label"] or f"Account {account['index'] + 1}"
+            started = time.monotonic()
+            with self.tracer.span("account", index=account["index"]) as account_span:
+                try:
+                    account_start, account_end = start_date, end_date
+                    if self.sync:
+                        window = self.sync_window(account, start_date, end_date)
+                        if window is None:
+                            print(f"{label} is already up to date.")
+                            self.advance(total_steps, 3)
+                            self.account_results[account["index"]] = {
+                                "account": label, "id": account["id"], "ok": True, "seconds": time.monotonic() - started
+                            }
+                            continue
+                        account_start, account_end = window
+                        print(f"Sync: fetching {account_start} to {account_end} for {label}")
+
+                    print(f"Selecting item {account['index'] + 1}: {label}")
+                    with self.tracer.span("navigate", step="account_switch"):
+                        self.switch_account(driver, account)
+                    self.advance(total_steps)
+
+                    path = self.download_file(driver, account_start, account_end, total_steps, account["id"])
+                    if self.sync:
+                        self.sync_state.record_files("myenergycenter", account["id"] or account["label"], [path])
+                    self.account_results[account["index"]] = {
+                        "account": label, "id": account["id"], "ok": True, "seconds": time.monotonic() - started
+                    }
+                except Exception as e:
+                    account_span["ok"] = False
+                    print(f"{label} failed: {e}")
+                    self.account_results[account["index"]] = {
+                        "account": label, "id": account["id"], "ok": False, "error": str(e),
+                        "seconds": time.monotonic() - started
+                    }
+                    try:
+                        driver.get(f"{self.base_url}/portal/Dashboard/index")
+                        self.readiness.wait_for_page("dashboard")
+                    except Exception:
+                        pass
+
+    def advance(self, total_steps, steps=1):
+        """Count completed steps and report overall progress."""
+        self.check_cancelled()
+        with self.progress_lock:
+            self.step_counter += steps
+            self.progress.emit(int((self.step_counter / total_steps) * 100))
+
+    def open_session(self):
+        """Start an extra logged-in browser session that reports progress through this worker."""
+        session = type(self)(
+            self.url, self.username, self.password, self.start_date, self.end_date, self.download_path,
+            timeouts=self.timeouts, profile=self.profile, block_list=self.block_list,
+            direct_export=self.direct_export, export_endpoint=self.export_endpoint,
+            account_switch_url=self.account_switch_url, sync=self.sync, overlap_days=self.overlap_days,
+            sync_state=self.sync_state, tracer=self.tracer, base_url=self.base_url, backend=self.backend,
+            cancel_token=self.cancel_token
+        )
+        # Only borrow from the pool when it can serve every session at once.
+        if self.pool and self.pool.size >= self.concurrency:
+            session.pool = self.pool
+        session.advance = self.advance
+        session.account_results = self.account_results
+        session.downloaded_files = self.downloaded_files
+        with self.tracer.span("driver_launch", pooled=bool(session.pool)):
+            session.driver = session.configure_driver()
+        session.readiness = PageReadiness(session.driver, self.timeouts, tracer=self.tracer)
+        # Each session logs in separately: the portal keeps the selected account per session.
+        with self.tracer.span("login", session_restored=False) as login:
+            login["ok"] = logged_in = session.login_to_portal(session.driver, self.url, self.username, self.password)
+        if not logged_in:
+            session.close_driver()
+            raise Exception("Login failed for additional browser session")
+        return session
+
+    def run_session(self, start_date, end_date, accounts, total_steps):
+        """Process a share of the accounts in a new session; return the accounts it could not start."""
+        try:
+            session = self.open_session()
+        except Exception as e:
+            print(f"Could not start browser session: {e}")
+            return accounts
+        try:
+            session.process_accounts(session.driver, start_date, end_date, accounts, total_steps)
+        finally:
+            session.readiness.report()
+            session.close_driver()
+        return []
+
+    def fan_out(self, driver, start_date, end_date, accounts, total_steps):
+        """Split the accounts across concurrent browser sessions."""
+        groups = [accounts[i::self.concurrency] for i in range(self.concurrency)]
+        groups = [group for group in groups if group]
+        print(f"Processing {len(accounts)} accounts in {len(groups)} browser sessions.")
+        with ThreadPoolExecutor(max_workers=len(groups) - 1) as executor:
+            futures = [
+                executor.submit(self.run_session, start_date, end_date, group, total_steps)
+                for group in groups[1:]
+            ]
+            self.process_accounts(driver, start_date, end_date, groups[0], total_steps)
+            leftovers = [account for future in futures for account in future.result()]
+        if leftovers:
+            print(f"Processing {len(leftovers)} accounts from sessions that failed to start.")
+            self.process_accounts(driver, start_date, end_date, leftovers, total_steps)
+
+    def summarize_accounts(self):
+        """Return (success, message) for the processed accounts."""
+        results = [self.account_results[index] for index in sorted(self.account_results)]
+        failed = [result for result in results if not result["ok"]]
+        for result in results:
+            status = "ok" if result["ok"] else f"failed: {result['error']}"
+            print(f"{result['account']}: {status} ({result['seconds']:.1f}s)")
+        if not failed:
+            return True, f"Automation completed successfully! {len(results)} accounts downloaded."
+        names = ", ".join(result["account"] for result in failed)
+        return False, f"{len(results) - len(failed)} of {len(results)} accounts downloaded. Failed: {names}"
+
+    @staticmethod
+    def build_driver(download_path, profile="standard", block_list=None, backend="selenium"):
+        """Configure Chrome WebDriver with custom download folder."""
+        
+        # abspath gives the platform's separators, as Chrome wants an absolute native path.
+        normalized_path = os.path.abspath(download_path)
+        options = webdriver.ChromeOptions()
+        prefs = {
+            "download.default_directory": normalized_path,  # Set custom download folder
+            "download.prompt_for_download": False,  # Disable prompt
+            "directory_upgrade": True,
+        }
+        options.add_experimental_option("prefs", prefs)
+        apply_profile(options, profile)
+        driver = launch_chrome(options, backend)
+        return prepare_driver(driver, download_path, profile, block_list)
+
+    def ingest_downloads(self):
+        """Add this run's downloads to the interval store."""
+        if self.store is not None and self.downloaded_files:
+            try:
+                with self.tracer.span("ingest", files=len(self.downloaded_files)):
+                    self.store.ingest_files(self.downloaded_files)
+            except Exception as e:
+                print(f"Could not update the interval store: {e}")
+
+    def configure_driver(self):
+        """Lease a warm driver from the pool, or launch a dedicated one."""
+        if self.pool:
+            return self.pool.acquire(self.download_path)
+        return self.build_driver(self.download_path, self.profile, self.block_list, self.backend)
+
+    def close_driver(self):
+        """Return the driver to the pool, or quit it."""
+        if self.driver:
+            if self.pool:
+                self.pool.release(self.driver)
+            else:
+                self.driver.quit()
+            self.driver = None
+
+    def run(self):
+        """Run the Selenium script."""
+        started = time.monotonic()
+        try:
+            # Created inside the try, so a telemetry folder that cannot be written still ends in finished().
+            if self.tracer is None:
+                self.tracer = Tracer("myenergycenter")
+            with self.tracer.span("driver_launch", pooled=bool(self.pool)):
+                self.driver = self.configure_driver()  # Use configured driver
+            self.readiness = PageReadiness(self.driver, self.timeouts, tracer=self.tracer)
+            if self.session_cache is None:
+                self.session_cache = SessionCache()
+            if self.sync and self.sync_state is None:
+                self.sync_state = SyncState()
+
+            with self.tracer.span("login") as login:
+                restored = restore_session(self.driver, self.session_cache, "myenergycenter", self.username,
+                                           self.password, f"{self.base_url}/portal/Dashboard/index",
+                                           self.is_logged_in)
+                logged_in = restored or self.login_to_portal(self.driver, self.url, self.username, self.password)
+                login.update(session_restored=restored, ok=logged_in)
+            if not restored:
+                if not logged_in:
+                    self.session_cache.invalidate("myenergycenter", self.username)
+                    self.finished.emit(False, "Login failed. Please check your credentials.")
+                    return
+                store_session(self.driver, self.session_cache, "myenergycenter", self.username, self.password)
+            self.interact_with_dropdown(self.driver, self.start_date, self.end_date)
+            self.ingest_downloads()
+            self.finished.emit(*self.summarize_accounts())
+        except Cancelled:
+            self.finished.emit(False, "Cancelled.")
+        except Exception as e:
+            self.finished.emit(False, f"An error occurred: {e}")
+        finally:
+            if self.readiness:
+                self.readiness.report()
+            self.close_driver()
+            if self.tracer is not None:
+                self.tracer.record("run", time.monotonic() - started, self.succeeded)
+                self.tracer.finish()
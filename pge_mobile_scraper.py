@@ -0,0 +1,342 @@
+# pge_mobile_scraper.py - PG&E mobile-site Green Button scraper core, usable without Qt (see scraper_core.py)
+from lazy_import import lazy
+from selector_memory import SelectorMemory
+from pge_scraper import PGE_BASE_URL, PGEBaseJob, format_date
+from sync_state import DEFAULT_OVERLAP_DAYS
+
+# Loaded on first use, or in the background by preload() once the window is up, so the
+# window does not wait for Selenium and numpy to import.
+By = lazy("selenium.webdriver.common.by", "By")
+SelectorResolver = lazy("selector_resolver", "SelectorResolver")
+private_downloads = lazy("download_tracker", "private_downloads")
+fill_form = lazy("form_fill", "fill_form")
+
+PGE_MOBILE_URL = "https://m.pge.com"
+
+
+class PGEMobileJob(PGEBaseJob):
+    """Selenium automation for the PG&E mobile site."""
+    portal = "pge-mobile"
+
+    def __init__(self, username, password, start_date, end_date, download_path, timeouts=None,
+                 selector_memory=None, session_cache=None, pool=None, profile="standard", block_list=None,
+                 direct_export=False, export_endpoint=None, chunk_size=None, chunk_concurrency=4,
+                 sync=False, overlap_days=DEFAULT_OVERLAP_DAYS, sync_state=None, store=None, tracer=None,
+                 base_url=PGE_BASE_URL, mobile_url=PGE_MOBILE_URL, deep_links=None, shortcuts=True,
+                 backend="selenium", cancel_token=None):
+        super().__init__(username, password, start_date, end_date, download_path, timeouts=timeouts,
+                         session_cache=session_cache, pool=pool, profile=profile, block_list=block_list,
+                         direct_export=direct_export, export_endpoint=export_endpoint, chunk_size=chunk_size,
+                         chunk_concurrency=chunk_concurrency, sync=sync, overlap_days=overlap_days,
+                         sync_state=sync_state, store=store, tracer=tracer, base_url=base_url,
+                         deep_links=deep_links, shortcuts=shortcuts, backend=backend, cancel_token=cancel_token)
+        self.resolver = None
+        self.selector_memory = selector_memory
+        self.mobile_url = mobile_url.rstrip("/")
+
+    def prepare_run(self):
+        """Resolve the fallback selector lists with the learned selector memory."""
+        if self.selector_memory is None:
+            self.selector_memory = SelectorMemory()
+        self.resolver = SelectorResolver(self.driver, memory=self.selector_memory, portal=self.portal,
+                                         tracer=self.tracer)
+
+    def close_run(self):
+        """Save what the run learned about the selectors."""
+        if self.selector_memory:
+            try:
+                self.selector_memory.save()
+            except OSError as e:
+                print(f"Could not save selector memory: {e}")
+
+    def login_to_pge(self, driver):
+        """Perform login to PG&E mobile portal."""
+        try:
+            print("Logging in to PG&E...")
+            with self.tracer.span("navigate", step="login_page"):
+                driver.get(f"{self.mobile_url}/?WT.mc_id=Vanity_myaccount#login")
+                self.readiness.wait_for_page("login_page")
+            
+            # Try different selectors for username and password fields
+            # Mobile site might use different IDs or classes
+            username_selectors = [
+                (By.ID, "username"),
+                (By.NAME, "username"),
+                (By.CSS_SELECTOR, "input[type='text']"),
+                (By.XPATH, "//input[@placeholder='Username' or contains(@placeholder, 'user')]")
+            ]
+            
+            password_selectors = [
+                (By.ID, "password"),
+                (By.NAME, "password"),
+                (By.CSS_SELECTOR, "input[type='password']"),
+                (By.XPATH, "//input[@placeholder='Password' or contains(@placeholder, 'pass')]")
+            ]
+            
+            login_button_selectors = [
+                (By.ID, "login"),
+                (By.XPATH, "//button[contains(text(), 'Log In') or contains(text(), 'Sign In')]"),
+                (By.CSS_SELECTOR, "button.login-button, input[type='submit']")
+            ]
+            
+            # Find username field
+            username_field, locator = self.resolver.resolve(username_selectors, step="username")
+            if not username_field:
+                print("Could not find username field")
+                return False
+            print(f"Found username field with selector: {locator[1]}")
+            
+            # Find password field
+            password_field, locator = self.resolver.resolve(password_selectors, step="password")
+            if not password_field:
+                print("Could not find password field")
+                return False
+            print(f"Found password field with selector: {locator[1]}")
+            
+            # Fill both credential fields in one script call
+            with self.tracer.span("fill", step="login_form"):
+                fill_form(driver, [(username_field, self.username), (password_field, self.password)])
+            
+            # Find and click login button
+            login_button, locator = self.resolver.resolve(login_button_selectors, clickable=True, step="login_button")
+            if not login_button:
+                print("Could not find login button")
+                return False
+            print(f"Found login button with selector: {locator[1]}")
+                
+            login_button.click()
+            self.readiness.wait_for_page("login_submit")
+            
+            if self.is_logged_in(driver):
+                self.update_progress()
+                return True
+            
+            print("Login verification failed - couldn't find success indicators")
+            return False
+                
+        except Exception as e:
+            print(f"Login error: {e}")
+            return False
+    
+    def is_logged_in(self, driver):
+        """Check the current page for indicators of an authenticated session."""
+        success_indicators = [
+            (By.XPATH, "//a[contains(text(), 'Energy Usage')]"),
+            (By.XPATH, "//a[contains(text(), 'Account')]"),
+            (By.XPATH, "//a[contains(text(), 'Dashboard')]"),
+            (By.XPATH, "//div[contains(@class, 'dashboard')]")
+        ]
+        
+        self.readiness.wait_for_document_ready("session_check")
+        indicator, locator = self.resolver.resolve(success_indicators, step="login_indicator")
+        if indicator:
+            print(f"Login successful! Found indicator: {locator[1]}")
+            return True
+        return False
+    
+    def download_green_button_data(self, driver):
+        """Navigate to Green Button and download data."""
+        try:
+            loads = 0
+            if self.open_shortcut(driver):
+                self.update_progress()
+                self.update_progress()
+            else:
+                # Try switching to desktop view for better navigation if we're on mobile
+                try:
+                    with self.tracer.span("navigate", step="desktop_view"):
+                        # Look for a desktop version link or switch to desktop URL
+                        desktop_links = [
+                            (By.XPATH, "//a[contains(text(), 'Desktop') or contains(text(), 'Full Site')]"),
+                            (By.CSS_SELECTOR, "a.desktop-link")
+                        ]
+                
+                        desktop_link, locator = self.resolver.resolve(desktop_links, clickable=True, timeout=3, step="desktop_link")
+                        if desktop_link:
+                            desktop_link.click()
+                            print("Switched to desktop view")
+                            self.readiness.wait_for_page("desktop_view")
+                            loads += 1
+                        
+                        # If no desktop link found, manually navigate to desktop URL
+                        if driver.current_url.startswith(self.mobile_url):
+                            driver.get(f"{self.base_url}/myaccount/dashboard")
+                            self.readiness.wait_for_page("dashboard")
+                            loads += 1
+                            print("Navigated to desktop dashboard")
+                except Exception:
+                    print("Could not switch to desktop view, continuing with current view")
+            
+                # Multiple approaches to navigate to Energy Usage
+                energy_usage_selectors = [
+                    (By.XPATH, "//a[contains(text(), 'Energy Usage')]"),
+                    (By.XPATH, "//a[contains(@href, 'energy-usage')]"),
+                    (By.XPATH, "//span[contains(text(), 'Energy Usage')]/parent::a"),
+                    (By.XPATH, "//div[contains(text(), 'Energy Usage')]")
+                ]
+            
+                with self.tracer.span("navigate", step="energy_usage"):
+                    print("Attempting to navigate to Energy Usage...")
+                    energy_link, locator = self.resolver.resolve(energy_usage_selectors, clickable=True, step="energy_usage")
+                    if energy_link:
+                        try:
+                            energy_link.click()
+                            print(f"Clicked Energy Usage with selector: {locator[1]}")
+                            self.readiness.wait_for_page("energy_usage")
+                            loads += 1
+                            self.update_progress()
+                        except Exception as e:
+                            print(f"Could not click Energy Usage: {e}")
+            
+                    # If we couldn't find Energy Usage link, try direct navigation
+                    if "usage" not in driver.current_url.lower():
+                        print("Direct navigation to Energy Usage page")
+                        driver.get(f"{self.base_url}/myaccount/usage")
+                        self.readiness.wait_for_page("energy_usage")
+                        loads += 1
+            
+                # Try to find Energy Usage Details or similar link
+                details_selectors = [
+                    (By.XPATH, "//a[contains(text(), 'Energy Usage Details')]"),
+                    (By.XPATH, "//a[contains(@href, 'usage-details')]"),
+                    (By.XPATH, "//a[contains(text(), 'Usage Details')]"),
+                    (By.XPATH, "//span[contains(text(), 'Details')]/parent::a")
+                ]
+            
+                with self.tracer.span("navigate", step="usage_details"):
+                    print("Looking for Energy Usage Details...")
+                    details_link, locator = self.resolver.resolve(details_selectors, clickable=True, step="usage_details")
+                    if details_link:
+                        try:
+                            details_link.click()
+                            print(f"Clicked Details with selector: {locator[1]}")
+                            self.readiness.wait_for_page("usage_details")
+                            loads += 1
+                            self.update_progress()
+                        except Exception as e:
+                            print(f"Could not click Details: {e}")
+            
+                    # If we couldn't find Details link, try direct navigation
+                    if "details" not in driver.current_url.lower():
+                        print("Direct navigation to Usage Details page")
+                        driver.get(f"{self.base_url}/myaccount/usage/details")
+                        self.readiness.wait_for_page("usage_details")
+                        loads += 1
+            
+            # Scroll down to find Green Button
+            print("Scrolling to find Green Button...")
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            self.readiness.wait_for_network_idle("scroll")
+            
+            # Multiple selectors for Green Button
+            green_button_selectors = [
+                (By.XPATH, "//button[contains(text(), 'Green Button')]"),
+                (By.XPATH, "//a[contains(text(), 'Green Button')]"),
+                (By.CSS_SELECTOR, "button.green-button"),
+                (By.XPATH, "//img[contains(@src, 'green-button')]/parent::*"),
+                (By.XPATH, "//div[contains(text(), 'Green Button')]")
+            ]
+            
+            green_button, locator = self.resolver.resolve(green_button_selectors, clickable=True, step="green_button")
+            if not green_button:
+                print("Could not find Green Button, trying to locate by screenshot...")
+                # If the button isn't found, we might want to do something else or return False
+                return False
+            print(f"Found Green Button with selector: {locator[1]}")
+            if self.deep_links is not None and not self.shortcut_result and loads:
+                # Remember where the click path ended and how many page loads it took.
+                self.deep_links.learn(self.portal, self.username, driver.current_url, self.base_url, locator, loads)
+            green_button.click()
+            self.readiness.wait_for_network_idle("green_button")
+            self.update_progress()
+            
+            # Multiple selectors for date range option
+            range_option_selectors = [
+                (By.XPATH, "//input[@type='radio' and @value='range']"),
+                (By.XPATH, "//input[@type='radio' and contains(@id, 'range')]"),
+                (By.XPATH, "//label[contains(text(), 'range of days')]//input"),
+                (By.XPATH, "//label[contains(text(), 'range')]//input")
+            ]
+            
+            print("Selecting date range option...")
+            range_option, locator = self.resolver.resolve(range_option_selectors, clickable=True, step="range_option")
+            if range_option:
+                range_option.click()
+                print(f"Selected date range with selector: {locator[1]}")
+            
+            # Format dates
+            from_date = format_date(self.start_date)
+            to_date = format_date(self.end_date)
+            
+            # Multiple selectors for date fields
+            from_field_selectors = [
+                (By.ID, "from-date"),
+                (By.XPATH, "//input[contains(@id, 'from')]"),
+                (By.XPATH, "//input[contains(@name, 'from')]"),
+                (By.XPATH, "//label[contains(text(), 'From')]/following-sibling::input"),
+                (By.XPATH, "//label[contains(text(), 'From')]/parent::*/input")
+            ]
+            
+            to_field_selectors = [
+                (By.ID, "to-date"),
+                (By.XPATH, "//input[contains(@id, 'to')]"),
+                (By.XPATH, "//input[contains(@name, 'to')]"),
+                (By.XPATH, "//label[contains(text(), 'To')]/following-sibling::input"),
+                (By.XPATH, "//label[contains(text(), 'To')]/parent::*/input")
+            ]
+            
+            # Find From date field
+            print("Entering date range...")
+            from_field, locator = self.resolver.resolve(from_field_selectors, step="from_field")
+            if not from_field:
+                raise Exception("Could not find From date field")
+            print(f"Found From date field with selector: {locator[1]}")
+            
+            # Find To date field
+            to_field, locator = self.resolver.resolve(to_field_selectors, step="to_field")
+            if not to_field:
+                raise Exception("Could not find To date field")
+            print(f"Found To date field with selector: {locator[1]}")
+            
+            # Fill both date fields in one script call; a blank date would export the wrong range
+            with self.tracer.span("fill", step="date_range"):
+                fill_form(driver, [(from_field, from_date), (to_field, to_date)])
+            
+            # Multiple selectors for download button
+            download_button_selectors = [
+                (By.XPATH, "//button[contains(text(), 'Download')]"),
+                (By.XPATH, "//a[contains(text(), 'Download')]"),
+                (By.CSS_SELECTOR, "button.download-button"),
+                (By.XPATH, "//input[@type='submit' and contains(@value, 'Download')]")
+            ]
+            
+            print("Initiating download...")
+            download_button, locator = self.resolver.resolve(download_button_selectors, clickable=True, step="download_button")
+            if download_button:
+                with private_downloads(driver, self.download_path) as downloads:
+                    download_job = downloads.start_job()
+                    download_button.click()
+                    print(f"Clicked download button with selector: {locator[1]}")
+                    downloaded = self.readiness.wait_for_download(downloads, download_job)
+                if not downloaded:
+                    print("Download did not complete in time")
+                    return False
+                print(f"Downloaded {downloaded[0]} ({downloaded[1]} bytes)")
+                self.downloaded_files.append(downloaded[0])
+                self.update_progress()
+                return True
+            
+            print("Could not find download button")
+            return False
+            
+        except Exception as e:
+            print(f"Error downloading data: {e}")
+            return False
+    
+    @classmethod
+    def chrome_arguments(cls, profile):
+        """Add arguments for better compatibility, and logging for debugging; the fast profile keeps Chrome quiet."""
+        arguments = ["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu", "--window-size=1920,1080"]
+        if profile == "standard":
+            arguments += ["--enable-logging", "--v=1"]
+        return arguments
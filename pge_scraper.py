@@ -0,0 +1,451 @@
+# pge_scraper.py - PG&E Green Button scraper core, usable without Qt (see scraper_core.py)
+import os
+import time
+from lazy_import import lazy
+from driver_profiles import apply_profile, prepare_driver
+from deep_links import DeepLinkMemory, on_page
+from driver_cache import launch_chrome
+from green_button_export import GreenButtonExporter, PGE_ENDPOINT, to_date
+from scraper_core import Cancelled, ScraperJob
+from sync_state import SyncState, DEFAULT_OVERLAP_DAYS
+
+# Loaded on first use, or in the background by preload() once the window is up, so the
+# window does not wait for Selenium and numpy to import.
+webdriver = lazy("selenium.webdriver")
+By = lazy("selenium.webdriver.common.by", "By")
+WebDriverWait = lazy("selenium.webdriver.support.ui", "WebDriverWait")
+EC = lazy("selenium.webdriver.support.expected_conditions")
+Keys = lazy("selenium.webdriver.common.keys", "Keys")
+PageReadiness = lazy("readiness", "PageReadiness")
+SessionCache = lazy("session_cache", "SessionCache")
+restore_session = lazy("session_cache", "restore_session")
+store_session = lazy("session_cache", "store_session")
+private_downloads = lazy("download_tracker", "private_downloads")
+export_in_chunks = lazy("date_chunks", "export_in_chunks")
+fill_form = lazy("form_fill", "fill_form")
+Tracer = lazy("telemetry", "Tracer")
+
+PGE_BASE_URL = "https://www.pge.com"
+
+
+def format_date(value):
+    """Format a date the way the Green Button date fields expect it, e.g. "March 5, 2024"."""
+    return f"{value:%B} {value.day}, {value.year}"
+
+
+class PGEBaseJob(ScraperJob):
+    """Shared run for the PG&E jobs: session restore, sync window, direct export and the download path.
+
+    Subclasses implement login_to_pge(), is_logged_in() and
+    download_green_button_data() for their site; ``portal`` keys their
+    telemetry, sync state and learned selectors and shortcuts.
+    """
+    portal = "pge"
+    driver = None
+
+    def __init__(self, username, password, start_date, end_date, download_path, timeouts=None,
+                 session_cache=None, pool=None, profile="standard", block_list=None,
+                 direct_export=False, export_endpoint=None, chunk_size=None, chunk_concurrency=4,
+                 sync=False, overlap_days=DEFAULT_OVERLAP_DAYS, sync_state=None, store=None, tracer=None,
+                 base_url=PGE_BASE_URL, deep_links=None, shortcuts=True, backend="selenium", cancel_token=None):
+        super().__init__(cancel_token)
+        self.username = username
+        self.password = password
+        self.start_date = to_date(start_date)
+        self.end_date = to_date(end_date)
+        self.download_path = download_path
+        self.downloaded_files = []
+        self.timeouts = timeouts
+        self.readiness = None
+        self.session_cache = session_cache
+        self.pool = pool
+        self.profile = profile
+        self.block_list = block_list
+        self.direct_export = direct_export
+        self.export_endpoint = export_endpoint or PGE_ENDPOINT
+        self.chunk_size = chunk_size
+        self.chunk_concurrency = chunk_concurrency
+        self.sync = sync
+        self.overlap_days = overlap_days
+        self.sync_state = sync_state
+        self.store = store
+        self.tracer = tracer
+        self.base_url = base_url.rstrip("/")
+        self.deep_links = deep_links
+        self.shortcuts = shortcuts
+        self.shortcut = None
+        self.shortcut_result = None
+        self.page_loads_saved = 0
+        self.backend = backend
+        self.step = 0
+        self.total_steps = 5
+
+    def update_progress(self, step_completed=True):
+        """Update progress bar."""
+        self.check_cancelled()
+        if step_completed:
+            self.step += 1
+        self.progress.emit(int((self.step / self.total_steps) * 100))
+
+    def login_to_pge(self, driver):
+        """Sign in on the site and return True when the session is authenticated."""
+        raise NotImplementedError
+
+    def is_logged_in(self, driver):
+        """Check the current page for signs of an authenticated session."""
+        raise NotImplementedError
+
+    def download_green_button_data(self, driver):
+        """Find the Green Button page and download the date range; return True on success."""
+        raise NotImplementedError
+
+    def prepare_run(self):
+        """Set up per-run helpers once the driver and readiness waits exist."""
+
+    def close_run(self):
+        """Save per-run state before the driver is released."""
+
+    def return_to_click_path(self, driver):
+        """Load the page the click path starts from after a failed shortcut; return the page loads it took."""
+        return 0
+
+    def is_signed_in(self, driver):
+        """Session check for restore_session; landing on the learned shortcut page also counts."""
+        if self.shortcut is None:
+            return self.is_logged_in(driver)
+        if on_page(driver, self.shortcut, self.base_url):
+            self.shortcut_result = True
+            return True
+        if self.is_logged_in(driver):
+            # Signed in, but the shortcut page did not validate.
+            self.shortcut_result = False
+            return True
+        return False
+    
+    def open_shortcut(self, driver):
+        """Jump straight to the Green Button page learned on an earlier run; return True when it validated."""
+        if self.shortcut is None:
+            return False
+        click_loads = self.shortcut["click_loads"]
+        if self.shortcut_result is None:
+            with self.tracer.span("navigate", step="deep_link") as span:
+                driver.get(DeepLinkMemory.url_for(self.shortcut, self.base_url))
+                self.readiness.wait_for_page("deep_link")
+                self.shortcut_result = on_page(driver, self.shortcut, self.base_url)
+                span.update(ok=self.shortcut_result)
+            # One load replaced the click path's, or was wasted.
+            saved = click_loads - 1 if self.shortcut_result else -1
+            if not self.shortcut_result:
+                saved -= self.return_to_click_path(driver)
+        else:
+            # Checked by the session restore, whose one load replaced the dashboard's and the click path's.
+            saved = click_loads if self.shortcut_result else 0
+        self.page_loads_saved += saved
+        self.deep_links.record(self.portal, self.username, self.shortcut_result, saved)
+        if self.shortcut_result:
+            print(f"Opened the Green Button page directly, saving {saved} page loads")
+        else:
+            print("Learned shortcut to the Green Button page failed validation, using the click path")
+        return self.shortcut_result
+    
+    @classmethod
+    def chrome_arguments(cls, profile):
+        """Return extra Chrome arguments for a profile."""
+        return []
+
+    @classmethod
+    def build_driver(cls, download_path, profile="standard", block_list=None, backend="selenium"):
+        """Configure Chrome WebDriver with custom download folder."""
+        # abspath gives the platform's separators, as Chrome wants an absolute native path.
+        normalized_path = os.path.abspath(download_path)
+        options = webdriver.ChromeOptions()
+        prefs = {
+            "download.default_directory": normalized_path,
+            "download.prompt_for_download": False,
+            "directory_upgrade": True,
+        }
+        options.add_experimental_option("prefs", prefs)
+        for argument in cls.chrome_arguments(profile):
+            options.add_argument(argument)
+        apply_profile(options, profile)
+        driver = launch_chrome(options, backend)
+        return prepare_driver(driver, download_path, profile, block_list)
+
+    def export_green_button_data(self, driver):
+        """Download Green Button data over HTTP with the logged-in session, skipping the UI."""
+        exporter = GreenButtonExporter.from_driver(driver, self.export_endpoint)
+        try:
+            with self.tracer.span("direct_export", chunked=bool(self.chunk_size)):
+                self.export_in_range(exporter)
+            self.step = self.total_steps - 1
+            self.update_progress()
+            return True
+        except Exception as e:
+            print(f"Direct export failed, falling back to the Green Button page: {e}")
+            return False
+        finally:
+            exporter.close()
+
+    def export_in_range(self, exporter):
+        """Export the date range with an exporter, in chunks when a chunk size is set.
+
+        A chunked export is merged into one start,duration,value,quality CSV per
+        meter rather than the portal's Green Button XML.
+        """
+        if self.chunk_size:
+            self.downloaded_files.extend(export_in_chunks(
+                exporter, self.start_date, self.end_date, self.download_path,
+                self.chunk_size, self.chunk_concurrency, log=self.log.emit
+            ))
+        else:
+            self.downloaded_files.append(exporter.export(self.start_date, self.end_date, self.download_path))
+    
+    def apply_sync_window(self):
+        """Narrow the date range to data after the last sync; return False when already up to date."""
+        if self.sync_state is None:
+            self.sync_state = SyncState()
+        window = self.sync_state.sync_range(self.portal, self.username, self.start_date, self.end_date, self.overlap_days)
+        if window is None:
+            print("Sync: already up to date.")
+            return False
+        start, end = window
+        if start != self.start_date:
+            print(f"Sync: fetching {start} to {end} instead of {self.start_date} to {end}")
+        self.start_date = start
+        return True
+
+    def record_sync(self):
+        """Advance the high-water marks from this run's downloads."""
+        if self.sync and self.sync_state is not None:
+            for meter, last_end in self.sync_state.record_files(self.portal, self.username, self.downloaded_files).items():
+                print(f"Sync: meter {meter} now ingested through {time.strftime('%Y-%m-%d %H:%M', time.gmtime(last_end))} UTC")
+
+    def ingest_downloads(self):
+        """Add this run's downloads to the interval store."""
+        if self.store is not None and self.downloaded_files:
+            try:
+                with self.tracer.span("ingest", files=len(self.downloaded_files)):
+                    self.store.ingest_files(self.downloaded_files)
+            except Exception as e:
+                print(f"Could not update the interval store: {e}")
+
+    def configure_driver(self):
+        """Lease a warm driver from the pool, or launch a dedicated one."""
+        if self.pool:
+            return self.pool.acquire(self.download_path)
+        return self.build_driver(self.download_path, self.profile, self.block_list, self.backend)
+
+    def run(self):
+        """Run the Selenium script."""
+        started = time.monotonic()
+        try:
+            # Created inside the try, so a telemetry folder that cannot be written still ends in finished().
+            if self.tracer is None:
+                self.tracer = Tracer(self.portal)
+            with self.tracer.span("driver_launch", pooled=bool(self.pool)):
+                self.driver = self.configure_driver()
+            self.readiness = PageReadiness(self.driver, self.timeouts, tracer=self.tracer)
+            self.prepare_run()
+            
+            if self.session_cache is None:
+                self.session_cache = SessionCache()
+            
+            if self.shortcuts:
+                if self.deep_links is None:
+                    self.deep_links = DeepLinkMemory()
+                self.shortcut = self.deep_links.lookup(self.portal, self.username)
+            # With a learned shortcut, the session check loads the Green Button page instead of the dashboard.
+            check_url = (DeepLinkMemory.url_for(self.shortcut, self.base_url) if self.shortcut
+                         else f"{self.base_url}/myaccount/dashboard")
+            
+            # Sessions are kept under "pge" for every PG&E job: they all sign in to the same account.
+            with self.tracer.span("login") as login:
+                restored = restore_session(self.driver, self.session_cache, "pge", self.username, self.password,
+                                           check_url, self.is_signed_in)
+                logged_in = restored or self.login_to_pge(self.driver)
+                login.update(session_restored=restored, ok=logged_in)
+            if restored:
+                self.update_progress()
+            elif logged_in:
+                store_session(self.driver, self.session_cache, "pge", self.username, self.password)
+            else:
+                self.session_cache.invalidate("pge", self.username)
+                self.finished.emit(False, "Login failed. Please check your credentials.")
+                return
+                
+            if self.sync and not self.apply_sync_window():
+                self.progress.emit(100)
+                self.finished.emit(True, "PG&E Green Button data is already up to date.")
+                return
+                
+            if self.direct_export and self.export_green_button_data(self.driver):
+                self.record_sync()
+                self.ingest_downloads()
+                self.finished.emit(True, "Successfully downloaded PG&E Green Button data!")
+                return
+                
+            if not self.download_green_button_data(self.driver):
+                self.finished.emit(False, "Failed to download Green Button data.")
+                return
+                
+            self.record_sync()
+            self.ingest_downloads()
+            self.finished.emit(True, "Successfully downloaded PG&E Green Button data!")
+            
+        except Cancelled:
+            self.finished.emit(False, "Cancelled.")
+        except Exception as e:
+            self.finished.emit(False, f"An error occurred: {e}")
+        finally:
+            if self.readiness:
+                self.readiness.report()
+            self.close_run()
+            if self.deep_links:
+                if self.shortcut_result is not None:
+                    print(f"Deep link: {self.page_loads_saved} page loads saved this run")
+                try:
+                    self.deep_links.save()
+                except OSError as e:
+                    print(f"Could not save deep links: {e}")
+            if self.driver:
+                if self.pool:
+                    self.pool.release(self.driver)
+                else:
+                    self.driver.quit()
+            if self.tracer is not None:
+                self.tracer.record("run", time.monotonic() - started, self.succeeded,
+                                   page_loads_saved=self.page_loads_saved)
+                self.tracer.finish()
+
+
+class PGEJob(PGEBaseJob):
+    """Selenium automation for PG&E."""
+
+    def wait_for_element(self, locator, step, clickable=False, timeout=10):
+        """Wait for an element and record the lookup as a selector span."""
+        condition = EC.element_to_be_clickable if clickable else EC.presence_of_element_located
+        with self.tracer.span("selector", step=step, selector=locator[1]):
+            return WebDriverWait(self.driver, timeout).until(condition(locator))
+
+    def login_to_pge(self, driver):
+        """Perform login to PG&E portal."""
+        try:
+            print("Logging in to PG&E...")
+            with self.tracer.span("navigate", step="login_page"):
+                driver.get(f"{self.base_url}/en/login")
+                self.readiness.wait_for_page("login_page")
+            
+            # Find and fill both credential fields in one script call
+            username_field = self.wait_for_element((By.ID, "username"), "username")
+            password_field = driver.find_element(By.ID, "password")
+            with self.tracer.span("fill", step="login_form"):
+                fill_form(driver, [(username_field, self.username), (password_field, self.password)])
+            
+            # Click login button
+            login_button = driver.find_element(By.ID, "login")
+            login_button.click()
+            self.readiness.wait_for_page("login_submit")
+            
+            # Verify login was successful
+            if self.is_logged_in(driver):
+                self.update_progress()
+                return True
+            print("Login failed: couldn't find Energy Usage link")
+            return False
+                
+        except Exception as e:
+            print(f"Login error: {e}")
+            return False
+    
+    def is_logged_in(self, driver):
+        """Check the current page for the Energy Usage link shown to signed-in users."""
+        try:
+            self.wait_for_element((By.XPATH, "//a[contains(text(), 'Energy Usage')]"), "login_indicator")
+            print("Login successful!")
+            return True
+        except Exception:
+            return False
+    
+    def return_to_click_path(self, driver):
+        """Open the dashboard unless the current page already has the Energy Usage link."""
+        if driver.find_elements(By.XPATH, "//a[contains(text(), 'Energy Usage')]"):
+            return 0
+        with self.tracer.span("navigate", step="dashboard"):
+            driver.get(f"{self.base_url}/myaccount/dashboard")
+            self.readiness.wait_for_page("dashboard")
+        return 1
+
+    def download_green_button_data(self, driver):
+        """Navigate to Green Button and download data."""
+        try:
+            if self.open_shortcut(driver):
+                self.step += 1
+                self.update_progress()
+            else:
+                # Click on Energy Usage
+                with self.tracer.span("navigate", step="energy_usage"):
+                    energy_link = self.wait_for_element((By.XPATH, "//a[contains(text(), 'Energy Usage')]"),
+                                                        "energy_usage", clickable=True)
+                    energy_link.click()
+                    self.readiness.wait_for_page("energy_usage")
+                self.update_progress()
+                
+                # Click on Energy Usage Details 
+                with self.tracer.span("navigate", step="usage_details"):
+                    details_link = self.wait_for_element((By.XPATH, "//a[contains(text(), 'Energy Usage Details')]"),
+                                                         "usage_details", clickable=True)
+                    details_link.click()
+                    self.readiness.wait_for_page("usage_details")
+                self.update_progress()
+            
+            # Scroll down to find Green Button
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            self.readiness.wait_for_network_idle("scroll")
+            
+            # Find and click Green Button
+            green_button_locator = (By.XPATH,
+                                    "//button[contains(text(), 'Green Button') or contains(@class, 'green-button')]")
+            green_button = self.wait_for_element(green_button_locator, "green_button", clickable=True)
+            if self.deep_links is not None and not self.shortcut_result:
+                # Remember where the click path ended; it took two loads (Energy Usage, then Details).
+                self.deep_links.learn(self.portal, self.username, driver.current_url, self.base_url,
+                                      green_button_locator, 2)
+            green_button.click()
+            self.readiness.wait_for_network_idle("green_button")
+            self.update_progress()
+            
+            # Select date range option
+            range_option = self.wait_for_element((By.XPATH, "//input[@type='radio' and @value='range']"),
+                                                 "range_option", clickable=True)
+            range_option.click()
+            
+            # Format dates
+            from_date = format_date(self.start_date)
+            to_date = format_date(self.end_date)
+            
+            # Fill in both date fields in one script call
+            from_field = self.wait_for_element((By.ID, "from-date"), "from_field")
+            to_field = self.wait_for_element((By.ID, "to-date"), "to_field")
+            with self.tracer.span("fill", step="date_range"):
+                fill_form(driver, [(from_field, from_date), (to_field, to_date)])
+            
+            # Click download button
+            download_button = self.wait_for_element((By.XPATH, "//button[contains(text(), 'Download')]"),
+                                                    "download_button", clickable=True)
+            with private_downloads(driver, self.download_path) as downloads:
+                download_job = downloads.start_job()
+                download_button.click()
+                print("Download initiated")
+                downloaded = self.readiness.wait_for_download(downloads, download_job)
+            if not downloaded:
+                print("Download did not complete in time")
+                return False
+            print(f"Downloaded {downloaded[0]} ({downloaded[1]} bytes)")
+            self.downloaded_files.append(downloaded[0])
+            self.update_progress()
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error downloading data: {e}")
+            return False
@@ -0,0 +1,33 @@
+# qt_worker.py - Run a scraper_core job on a QThread and relay its callbacks as Qt signals
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class JobThread(QThread):
+    """Qt adapter over a ScraperJob.
+
+    The job's callbacks fire on this thread; re-emitting them as signals lets
+    Qt queue them to slots on the GUI thread.
+    """
+    progress = pyqtSignal(int)
+    log = pyqtSignal(str)
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        job.progress.connect(self.progress.emit)
+        job.log.connect(self.log.emit)
+        job.finished.connect(self.finished.emit)
+
+    def __getattr__(self, name):
+        # Expose the job's state (downloaded_files, succeeded, ...) as the worker's own.
+        if name == "job":
+            raise AttributeError(name)
+        return getattr(self.job, name)
+
+    def run(self):
+        self.job.run()
+
+    def cancel(self):
+        """Ask the job to stop at its next step."""
+        self.job.cancel()
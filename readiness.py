@@ -0,0 +1,153 @@
+# readiness.py - Event-driven page readiness waits for the YouPower scrapers
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+# Default per-step timeouts in seconds. Any key can be overridden through the
+# ``timeouts`` argument of the scrapers.
+DEFAULT_TIMEOUTS = {
+    "page_load": 15,
+    "network_idle": 10,
+    "element": 10,
+    "url_change": 15,
+    "download": 120,
+}
+
+# Counts in-flight fetch/XHR requests so network idle can be detected from the page.
+NETWORK_PROBE_SCRIPT = """
+if (!window.__ypNet) {
+    window.__ypNet = {inflight: 0};
+    var net = window.__ypNet;
+    if (window.fetch) {
+        var origFetch = window.fetch;
+        window.fetch = function() {
+            net.inflight++;
+            return origFetch.apply(this, arguments).finally(function() { net.inflight--; });
+        };
+    }
+    var origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        net.inflight++;
+        this.addEventListener('loadend', function() { net.inflight--; });
+        return origSend.apply(this, arguments);
+    };
+}
+var resources = window.performance && performance.getEntriesByType
+    ? performance.getEntriesByType('resource').length : 0;
+return [window.__ypNet.inflight, resources, document.readyState];
+"""
+
+
+class PageReadiness:
+    """Waits on real page signals instead of fixed sleeps and records how long each wait took.
+
+    With a telemetry Tracer, every wait is also recorded as a span.
+    """
+
+    def __init__(self, driver, timeouts=None, poll_frequency=0.1, tracer=None):
+        self.driver = driver
+        self.tracer = tracer
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.poll_frequency = poll_frequency
+        self.timings = []
+
+    def timeout_for(self, step, kind):
+        """Return the timeout for a step, falling back to the wait kind default."""
+        return self.timeouts.get(step, self.timeouts[kind])
+
+    def _wait(self, step, kind, condition):
+        """Run a condition until it is truthy or the step timeout expires."""
+        timeout = self.timeout_for(step, kind)
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=self.poll_frequency,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(condition)
+            ok = True
+        except TimeoutException:
+            result = None
+            ok = False
+        self.record(step, time.monotonic() - started, ok)
+        return result if ok else False
+
+    def record(self, step, elapsed, ok=True, span="wait"):
+        """Record how long a wait took."""
+        self.timings.append((step, elapsed, ok))
+        if self.tracer is not None:
+            self.tracer.record(span, elapsed, ok, step=step)
+        print(f"[wait] {step}: {elapsed:.2f}s" + ("" if ok else " (timed out)"))
+
+    def wait_for_document_ready(self, step="page_load"):
+        """Wait until document.readyState is 'complete'."""
+        return self._wait(step, "page_load", lambda d: d.execute_script(
+            "return document.readyState") == "complete")
+
+    def wait_for_network_idle(self, step="network_idle", idle_time=0.5):
+        """Wait until no fetch/XHR is in flight and no new resources load for idle_time seconds."""
+        state = {"resources": None, "since": None}
+
+        def idle(driver):
+            inflight, resources, ready_state = driver.execute_script(NETWORK_PROBE_SCRIPT)
+            now = time.monotonic()
+            if ready_state != "complete" or inflight > 0 or resources != state["resources"]:
+                state["resources"] = resources
+                state["since"] = now
+                return False
+            return now - state["since"] >= idle_time
+
+        return self._wait(step, "network_idle", idle)
+
+    def wait_for_page(self, step="page_load"):
+        """Wait for the document to finish loading and the network to settle."""
+        if not self.wait_for_document_ready(step):
+            return False
+        return self.wait_for_network_idle(step)
+
+    def wait_for_url_change(self, old_url, step="url_change"):
+        """Wait until the browser navigates away from old_url."""
+        return self._wait(step, "url_change", lambda d: d.current_url != old_url)
+
+    def wait_for_element_stable(self, element, step="element", settle_polls=2):
+        """Wait until an element is displayed and its bounding box stops moving."""
+        state = {"rect": None, "count": 0}
+
+        def stable(driver):
+            if not element.is_displayed():
+                state["count"] = 0
+                return False
+            rect = element.rect
+            if rect == state["rect"]:
+                state["count"] += 1
+            else:
+                state["rect"] = rect
+                state["count"] = 0
+            return element if state["count"] >= settle_polls else False
+
+        return self._wait(step, "element", stable)
+
+    def wait_for_download(self, tracker, job, step="download"):
+        """Wait until a DownloadTracker job's file is complete and return (path, size)."""
+        started = time.monotonic()
+        try:
+            result = tracker.wait(job, self.timeout_for(step, "download"))
+        except TimeoutError:
+            result = None
+        self.record(step, time.monotonic() - started, result is not None, span="download")
+        return result or False
+
+    def summary(self):
+        """Return the total seconds spent waiting per step."""
+        totals = {}
+        for step, elapsed, ok in self.timings:
+            totals[step] = totals.get(step, 0.0) + elapsed
+        return totals
+
+    def report(self):
+        """Print how long each wait step actually took."""
+        total = sum(elapsed for _, elapsed, _ in self.timings)
+        print(f"Readiness waits: {len(self.timings)} waits, {total:.2f}s total")
+        for step, elapsed in self.summary().items():
+            print(f"  {step}: {elapsed:.2f}s")
@@ -0,0 +1,307 @@
+# rollups.py - Vectorized hourly, daily, monthly, peak demand and time-of-use totals for many meters at once
+import csv
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import numpy as np
+from espi_parser import IntervalSeries, LOCAL_TIMEZONE, UOM_WH, parse_file
+
+FREQUENCIES = ("hour", "day", "month")
+
+OFF_PEAK = "off_peak"
+
+# PG&E residential time-of-use schedules: period -> [(first hour, end hour, days)] in
+# local time, where days is "all" or "weekdays" (weekdays exclude PG&E holidays).
+# Hours that no period covers are off-peak.
+PGE_TOU_SCHEDULES = {
+    "E-TOU-C": {"peak": [(16, 21, "all")]},
+    "E-TOU-D": {"peak": [(17, 20, "weekdays")]},
+    "EV2-A": {"peak": [(16, 21, "all")], "part_peak": [(15, 16, "all"), (21, 24, "all")]},
+    "E-ELEC": {"peak": [(16, 21, "all")], "part_peak": [(15, 16, "all"), (21, 24, "all")]},
+}
+
+
+def pge_holidays(years):
+    """Return the days PG&E bills as holidays, on the dates they are legally observed."""
+    days = []
+    for year in years:
+        def nth_weekday(month, weekday, n):
+            first = date(year, month, 1)
+            return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+        last_may = date(year, 5, 31)
+        for day in (
+            date(year, 1, 1), nth_weekday(2, 0, 3), last_may - timedelta(days=last_may.weekday()),
+            date(year, 7, 4), nth_weekday(9, 0, 1), date(year, 11, 11), nth_weekday(11, 3, 4), date(year, 12, 25),
+        ):
+            if day.weekday() == 5:
+                day -= timedelta(days=1)
+            elif day.weekday() == 6:
+                day += timedelta(days=1)
+            days.append(day)
+    return days
+
+
+@lru_cache(maxsize=64)
+def _transitions(timezone, first_day, last_day):
+    """Return (epoch seconds, UTC offset) pairs for every offset change between two UTC day numbers."""
+    zone = ZoneInfo(timezone)
+
+    def offset(epoch):
+        return int(datetime.fromtimestamp(epoch, zone).utcoffset().total_seconds())
+
+    times, offsets = [first_day * 86400], [offset(first_day * 86400)]
+    for day in range(first_day + 1, last_day + 2):
+        current = offset(day * 86400)
+        if current != offsets[-1]:
+            hour = (day - 1) * 86400
+            while offset(hour + 3600) == offsets[-1]:
+                hour += 3600
+            times.append(hour + 3600)
+            offsets.append(current)
+    return np.array(times, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+
+def utc_offsets(epoch, timezone=LOCAL_TIMEZONE):
+    """Return the local UTC offset in seconds at each epoch second."""
+    epoch = np.asarray(epoch, dtype=np.int64)
+    if not len(epoch):
+        return np.zeros(0, dtype=np.int64)
+    times, offsets = _transitions(timezone, int(epoch.min()) // 86400, int(epoch.max()) // 86400)
+    return offsets[np.searchsorted(times, epoch, "right") - 1]
+
+
+def period_table(schedule):
+    """Return (period names, table[working day, local hour] -> period number) for a time-of-use schedule."""
+    if isinstance(schedule, str):
+        schedule = PGE_TOU_SCHEDULES[schedule]
+    names = [OFF_PEAK] + [name for name in schedule if name != OFF_PEAK]
+    table = np.zeros((2, 24), dtype=np.int8)
+    for number, name in enumerate(names[1:], 1):
+        for first, end, days in schedule[name]:
+            if days == "all":
+                table[:, first:end] = number
+            elif days == "weekdays":
+                table[1, first:end] = number
+            else:
+                raise ValueError(f"Unknown day type in {name}: {days}. Expected 'all' or 'weekdays'.")
+    return names, table
+
+
+class Rollup:
+    """Totals for many meters: values[meter, bucket], with NaN where a meter has no readings."""
+
+    def __init__(self, meters, labels, values, times=None):
+        self.meters = meters
+        self.labels = labels
+        self.values = values
+        self.times = times
+
+    def __repr__(self):
+        return f"Rollup({len(self.meters)} meters x {len(self.labels)} buckets)"
+
+    def for_meter(self, meter):
+        """Return {label: value} for one meter."""
+        row = self.values[self.meters.index(meter)]
+        keep = ~np.isnan(row)
+        return dict(zip(self.labels[keep].tolist(), row[keep].tolist()))
+
+    def write_csv(self, path):
+        """Write one row per bucket and one column per meter."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["bucket"] + list(self.meters))
+            for label, column in zip(self.labels.astype(str), self.values.T.tolist()):
+                writer.writerow([label] + ["" if np.isnan(value) else round(value, 6) for value in column])
+
+
+class MeterBatch:
+    """The readings of many meters flattened into one set of arrays.
+
+    Every rollup is a handful of array operations over the whole batch, so the
+    cost grows with the number of readings, not the number of meters.
+    Electric values are converted from Wh to kWh; other units are kept.
+    """
+
+    def __init__(self, series_list, timezone=LOCAL_TIMEZONE):
+        self.meters = [series.meter for series in series_list]
+        self.timezone = timezone
+        self.meter_index = np.repeat(np.arange(len(series_list)), [len(series) for series in series_list])
+        if series_list:
+            self.start = np.concatenate([series.start for series in series_list])
+            self.duration = np.concatenate([series.duration for series in series_list])
+            self.kwh = np.concatenate([
+                series.value / 1000.0 if series.uom in (None, UOM_WH) else series.value for series in series_list
+            ])
+        else:
+            self.start = np.zeros(0, dtype=np.int64)
+            self.duration = np.zeros(0, dtype=np.int32)
+            self.kwh = np.zeros(0)
+        self.local = self.start + utc_offsets(self.start, timezone)
+        self.days = self.local // 86400
+        self.first_day = int(self.days.min()) if len(self.days) else 0
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.start)
+
+    @classmethod
+    def from_store(cls, store, meters=None, start=None, end=None, timezone=LOCAL_TIMEZONE, uoms=None):
+        """Build a batch from an IntervalStore, optionally limited to some meters, an epoch range and units."""
+        series_list = [store.read(meter, start, end) for meter in (meters or store.meters())]
+        return cls([series for series in series_list if uoms is None or series.uom in uoms], timezone)
+
+    @classmethod
+    def from_files(cls, paths, timezone=LOCAL_TIMEZONE, uoms=None):
+        """Build a batch straight from downloaded Green Button files, optionally limited to some units."""
+        parts = {}
+        for path in paths:
+            for meter, series in parse_file(path, timezone=timezone).items():
+                if uoms is None or series.uom in uoms:
+                    parts.setdefault(meter, []).append(series)
+        return cls([IntervalSeries.concatenate(meter, group, group[0].uom) for meter, group in parts.items()],
+                   timezone)
+
+    def per_day(self, table):
+        """Look up a value per reading from a table with one entry per local day of the batch."""
+        return table[self.days - self.first_day]
+
+    def day_numbers(self):
+        """Return the local day numbers (days since 1970-01-01) covered by the batch."""
+        last = int(self.days.max()) + 1 if len(self.days) else 0
+        return np.arange(self.first_day, last, dtype=np.int64)
+
+    def buckets(self, freq):
+        """Return (bucket number per reading, bucket labels) for hour, day or month buckets.
+
+        Days and months follow local wall-clock dates, so DST days hold 23 or 25
+        hours. Hours are real elapsed hours labelled with their local start, so
+        the repeated hour in November appears twice. A reading counts in the
+        bucket where it starts.
+        """
+        if freq in self.cache:
+            return self.cache[freq]
+        if freq == "hour":
+            keys = self.start // 3600
+        elif freq == "day":
+            keys = self.days
+        elif freq == "month":
+            # Converting the few distinct days is much cheaper than every reading.
+            keys = self.per_day(self.day_numbers().astype("datetime64[D]").astype("datetime64[M]").astype(np.int64))
+        else:
+            raise ValueError(f"Unknown frequency: {freq}. Expected one of: {', '.join(FREQUENCIES)}.")
+        first = int(keys.min()) if len(keys) else 0
+        count = int(keys.max()) - first + 1 if len(keys) else 0
+        numbers = np.arange(first, first + count, dtype=np.int64)
+        if freq == "hour":
+            labels = (numbers * 3600 + utc_offsets(numbers * 3600, self.timezone)).astype("datetime64[s]")
+        elif freq == "day":
+            labels = numbers.astype("datetime64[D]")
+        else:
+            labels = numbers.astype("datetime64[M]")
+        self.cache[freq] = keys - first, labels
+        return self.cache[freq]
+
+    def _cells(self, buckets, count):
+        """Return one cell number per reading for a meters x count matrix."""
+        return self.meter_index * count + buckets
+
+    def _matrix(self, cells, count, weights):
+        """Sum weights per cell into a meters x count matrix, NaN where a cell has no readings."""
+        size = len(self.meters) * count
+        totals = np.bincount(cells, weights=weights, minlength=size).astype(np.float64, copy=False)
+        totals[np.bincount(cells, minlength=size) == 0] = np.nan
+        return totals.reshape(len(self.meters), count)
+
+    def totals(self, freq="day"):
+        """Return energy totals (kWh) per meter and hour, day or month."""
+        buckets, labels = self.buckets(freq)
+        return Rollup(self.meters, labels, self._matrix(self._cells(buckets, len(labels)), len(labels), self.kwh))
+
+    def peak_demand(self, freq="month"):
+        """Return the highest interval demand (kW) per meter and bucket, with its start time in .times."""
+        buckets, labels = self.buckets(freq)
+        count = len(labels)
+        cells = self._cells(buckets, count)
+        demand = self.kwh * 3600.0 / np.maximum(self.duration, 1)
+        order = None
+        if len(cells) > 1 and np.any(cells[1:] < cells[:-1]):
+            order = np.argsort(cells, kind="stable")
+            cells, demand = cells[order], demand[order]
+        peaks = np.full(len(self.meters) * count, np.nan)
+        times = np.zeros(len(self.meters) * count, dtype=np.int64)
+        if len(cells):
+            group_starts = np.concatenate(([0], np.flatnonzero(np.diff(cells)) + 1))
+            group_cells = cells[group_starts]
+            group_peaks = np.maximum.reduceat(demand, group_starts)
+            # First reading in each group that reaches the group's peak.
+            sizes = np.diff(np.append(group_starts, len(cells)))
+            hits = np.flatnonzero(demand == np.repeat(group_peaks, sizes))
+            groups = np.searchsorted(group_starts, hits, "right")
+            first = hits[np.concatenate(([True], groups[1:] != groups[:-1]))]
+            peaks[group_cells] = group_peaks
+            times[group_cells] = self.start[first if order is None else order[first]]
+        return Rollup(self.meters, labels, peaks.reshape(len(self.meters), count),
+                      times.reshape(len(self.meters), count))
+
+    def working_days(self):
+        """Return True for readings on a weekday that is not a PG&E holiday."""
+        days = self.day_numbers()
+        if not len(days):
+            return np.zeros(0, dtype=bool)
+        first, last = days[[0, -1]].astype("datetime64[D]").astype("datetime64[Y]").astype(int)
+        holidays = np.array(pge_holidays(range(first + 1970, last + 1971)), dtype="datetime64[D]").astype(np.int64)
+        return self.per_day(((days + 3) % 7 < 5) & ~np.isin(days, holidays))
+
+    def hour_slots(self):
+        """Return working day * 24 + local hour per reading, the slot a time-of-use schedule prices."""
+        if "slots" not in self.cache:
+            self.cache["slots"] = self.working_days() * 24 + (self.local - self.days * 86400) // 3600
+        return self.cache["slots"]
+
+    def tou_periods(self, schedule):
+        """Return (period names, period number per reading) for a time-of-use schedule."""
+        names, table = period_table(schedule)
+        return names, table.ravel()[self.hour_slots()]
+
+    def hourly_profile(self, freq="month"):
+        """Return (labels, usage[meter, bucket, slot]): energy per meter and bucket in each of the 48 hour slots.
+
+        Any time-of-use schedule can then be applied per bucket without another
+        pass over the readings.
+        """
+        key = ("profile", freq)
+        if key not in self.cache:
+            buckets, labels = self.buckets(freq)
+            count = len(labels)
+            cells = self._cells(buckets, count) * 48 + self.hour_slots()
+            usage = np.bincount(cells, weights=self.kwh, minlength=len(self.meters) * count * 48)
+            self.cache[key] = labels, usage.astype(np.float64, copy=False).reshape(len(self.meters), count, 48)
+        return self.cache[key]
+
+    def day_counts(self, freq="month"):
+        """Return the number of local days with readings per meter and bucket."""
+        buckets, labels = self.buckets(freq)
+        count = len(labels)
+        days = self.day_numbers()
+        present = np.bincount(self.meter_index * len(days) + self.days - self.first_day,
+                              minlength=len(self.meters) * len(days)) > 0
+        meter, day = np.divmod(np.flatnonzero(present), max(len(days), 1))
+        # Every reading of a day falls in one bucket, so any reading gives the day's bucket.
+        day_bucket = np.zeros(len(days), dtype=np.int64)
+        day_bucket[self.days - self.first_day] = buckets
+        counts = np.bincount(meter * count + day_bucket[day], minlength=len(self.meters) * count)
+        return counts.reshape(len(self.meters), count)
+
+    def tou_totals(self, schedule="E-TOU-C", freq="month"):
+        """Return {period: Rollup} of energy per time-of-use period for each meter and bucket."""
+        names, periods = self.tou_periods(schedule)
+        buckets, labels = self.buckets(freq)
+        count = len(labels)
+        cells = self._cells(buckets, count) * len(names) + periods
+        size = len(self.meters) * count * len(names)
+        totals = np.bincount(cells, weights=self.kwh, minlength=size).astype(np.float64, copy=False)
+        totals = totals.reshape(len(self.meters), count, len(names))
+        empty = np.bincount(self._cells(buckets, count), minlength=len(self.meters) * count) == 0
+        totals[empty.reshape(len(self.meters), count)] = np.nan
+        return {name: Rollup(self.meters, labels, totals[:, :, number]) for number, name in enumerate(names)}
@@ -0,0 +1,124 @@
+# scraper_core.py - Qt-free base for the scrapers: progress callbacks, cancellation and an asyncio interface
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Cancelled(BaseException):
+    """Raised inside a job at its next checkpoint after cancel().
+
+    A BaseException so the scrapers' ``except Exception`` handlers for a
+    failed step do not swallow it.
+    """
+
+
+class Signal:
+    """A minimal callback list with the connect()/emit() interface of a Qt signal.
+
+    Callbacks run synchronously in the thread that emits, which for a job is
+    the thread running it.
+    """
+
+    def __init__(self):
+        self.callbacks = []
+
+    def connect(self, callback):
+        self.callbacks.append(callback)
+
+    def disconnect(self, callback):
+        self.callbacks.remove(callback)
+
+    def emit(self, *args):
+        for callback in list(self.callbacks):
+            callback(*args)
+
+
+class CancelToken:
+    """Thread-safe flag a job checks between steps; may be shared by several jobs."""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.event.is_set():
+            raise Cancelled()
+
+
+class ScraperJob:
+    """One scraper run: login, navigate and download for a single login.
+
+    Subclasses implement run(), which blocks, emits ``progress(int)`` while it
+    works, ``log(str)`` for status messages from library code it calls, and
+    ``finished(bool, str)`` exactly once at the end. Embed a job by
+    connecting callbacks and calling run() or execute() on any thread, by
+    awaiting run_async(), or in a Qt app through qt_worker.JobThread.
+    """
+
+    def __init__(self, cancel_token=None):
+        self.progress = Signal()
+        self.log = Signal()
+        self.finished = Signal()
+        self.cancel_token = cancel_token or CancelToken()
+        self.succeeded = False
+        self.result = None
+        self.finished.connect(self.note_outcome)
+
+    def note_outcome(self, success, message):
+        """Remember how the run ended for its telemetry span and for execute()."""
+        self.succeeded = success
+        self.result = (success, message)
+
+    def cancel(self):
+        """Ask the job to stop at its next checkpoint; it finishes with (False, "Cancelled.")."""
+        self.cancel_token.cancel()
+
+    def check_cancelled(self):
+        """Checkpoint between steps: raise Cancelled once cancel() was called."""
+        self.cancel_token.raise_if_cancelled()
+
+    def run(self):
+        raise NotImplementedError
+
+    def execute(self):
+        """Run the job in this thread and return (success, message)."""
+        self.run()
+        return self.result or (False, "The scraper did not finish")
+
+    async def run_async(self, on_progress=None, executor=None):
+        """Run the job on an executor thread and return (success, message).
+
+        on_progress is called on the event loop with each percentage.
+        Cancelling the awaiting task cancels the job and waits for it to
+        release its browser before re-raising CancelledError.
+        """
+        # Imported here: asyncio costs the GUIs tens of milliseconds at start-up.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if on_progress is not None:
+            self.progress.connect(lambda value: loop.call_soon_threadsafe(on_progress, value))
+        future = loop.run_in_executor(executor, self.execute)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            self.cancel()
+            await asyncio.wait([future])
+            raise
+
+
+async def run_all(jobs, concurrency=4, on_progress=None):
+    """Run jobs concurrently on a bounded thread pool; return their (success, message) results in order.
+
+    on_progress, if given, is called on the event loop as on_progress(job, percent).
+    """
+    import asyncio
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="scraper") as executor:
+        return await asyncio.gather(*[
+            job.run_async(None if on_progress is None else lambda value, job=job: on_progress(job, value), executor)
+            for job in jobs
+        ])
@@ -0,0 +1,98 @@
+# selector_memory.py - On-disk selector hit-rate memory used to reorder fallback locators
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".youpower", "selector_memory.json")
+
+# Hits and misses lose half their weight every HALF_LIFE seconds, so a portal
+# redesign overtakes the old winner after a couple of runs.
+HALF_LIFE = 7 * 24 * 3600
+
+
+def selector_key(locator):
+    """Return the storage key for a (By, value) locator."""
+    return f"{locator[0]}={locator[1]}"
+
+
+class SelectorMemory:
+    """Records hits, misses and time-to-match per portal, step and selector."""
+
+    def __init__(self, path=DEFAULT_PATH, half_life=HALF_LIFE):
+        self.path = path
+        self.half_life = half_life
+        self.lock = threading.Lock()
+        self.data = self.load()
+
+    def load(self):
+        """Load the store from disk, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """Write the store to disk atomically."""
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=os.path.basename(self.path) + ".",
+                                            suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def _decayed(self, entry, now):
+        """Return (hits, misses) for an entry after applying age decay."""
+        factor = 0.5 ** (max(0.0, now - entry["updated"]) / self.half_life)
+        return entry["hits"] * factor, entry["misses"] * factor
+
+    def score(self, portal, step, locator, now=None):
+        """Return the smoothed recent success rate of a selector (0.5 when unknown)."""
+        now = time.time() if now is None else now
+        entry = self.data.get(portal, {}).get(step, {}).get(selector_key(locator))
+        if not entry:
+            return 0.5
+        hits, misses = self._decayed(entry, now)
+        return (hits + 1.0) / (hits + misses + 2.0)
+
+    def order(self, portal, step, candidates):
+        """Return candidates sorted by recent success, keeping the static order for ties."""
+        now = time.time()
+        with self.lock:
+            ranked = sorted(
+                enumerate(candidates),
+                key=lambda item: (-self.score(portal, step, item[1], now), item[0])
+            )
+        return [locator for _, locator in ranked]
+
+    def record(self, portal, step, tried, winner, elapsed):
+        """Record a resolution: the winner gets a hit, candidates tried before it a miss."""
+        now = time.time()
+        with self.lock:
+            entries = self.data.setdefault(portal, {}).setdefault(step, {})
+            for locator in tried:
+                key = selector_key(locator)
+                entry = entries.get(key) or {"hits": 0.0, "misses": 0.0, "avg_time": None, "updated": now}
+                hits, misses = self._decayed(entry, now)
+                if winner is not None and locator == winner:
+                    hits += 1.0
+                    avg = entry["avg_time"]
+                    entry["avg_time"] = elapsed if avg is None else 0.8 * avg + 0.2 * elapsed
+                else:
+                    misses += 1.0
+                entry["hits"], entry["misses"], entry["updated"] = hits, misses, now
+                entries[key] = entry
+                if winner is not None and locator == winner:
+                    break
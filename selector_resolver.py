@@ -0,0 +1,128 @@
+# selector_resolver.py - Resolve a list of fallback locators in one round trip per poll
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, JavascriptException
+
+# Evaluates the candidate locators inside the page in order and returns the first
+# usable match, its index and whether the document has finished loading.
+RESOLVE_SCRIPT = """
+var candidates = arguments[0], clickable = arguments[1];
+var ready = document.readyState === 'complete';
+function usable(el) {
+    if (!clickable) return true;
+    if (el.disabled) return false;
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none') return false;
+    return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+}
+function all(by, value) {
+    switch (by) {
+        case 'id':
+            var byId = document.getElementById(value);
+            return byId ? [byId] : [];
+        case 'name': return Array.prototype.slice.call(document.getElementsByName(value));
+        case 'css selector': return Array.prototype.slice.call(document.querySelectorAll(value));
+        case 'class name': return Array.prototype.slice.call(document.getElementsByClassName(value));
+        case 'tag name': return Array.prototype.slice.call(document.getElementsByTagName(value));
+        case 'link text':
+        case 'partial link text':
+            return Array.prototype.filter.call(document.getElementsByTagName('a'), function(a) {
+                var text = (a.innerText || a.textContent || '').trim();
+                return by === 'link text' ? text === value : text.indexOf(value) !== -1;
+            });
+        case 'xpath':
+            var snapshot = document.evaluate(value, document, null,
+                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+            return nodes;
+    }
+    return [];
+}
+for (var c = 0; c < candidates.length; c++) {
+    var found;
+    try { found = all(candidates[c][0], candidates[c][1]); } catch (e) { continue; }
+    for (var n = 0; n < found.length; n++) {
+        if (found[n].nodeType === 1 && usable(found[n])) return [found[n], c, ready];
+    }
+}
+return [null, -1, ready];
+"""
+
+# Seconds a lower-ranked candidate has to wait for the higher-ranked ones to
+# appear. A generic fallback such as input[type='text'] can match a page that
+# is still rendering before the specific locator does.
+FALLBACK_GRACE = 0.5
+
+
+class SelectorResolver:
+    """Polls all candidate locators at once and reports which candidate matched.
+
+    The first candidate is accepted as soon as it matches. A later one is
+    accepted only once the page has loaded and the fallback grace period has
+    passed without a better match, so fallbacks cost one short wait rather
+    than a full timeout each.
+
+    When a SelectorMemory is given, candidates for a named step are reordered by
+    their recent success on the portal and every resolution is recorded; the
+    learned winner then skips the grace period. With a telemetry Tracer, every
+    resolution is recorded as a span with the winning selector.
+    """
+
+    def __init__(self, driver, timeout=5, poll_frequency=0.1, memory=None, portal=None, tracer=None,
+                 fallback_grace=FALLBACK_GRACE):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.fallback_grace = fallback_grace
+        self.memory = memory
+        self.portal = portal
+        self.tracer = tracer
+        self.last_elapsed = 0.0
+
+    def find(self, candidates, clickable=False):
+        """Run a single resolve pass and return (element, index, page loaded); element is None without a match."""
+        element, index, ready = self.driver.execute_script(RESOLVE_SCRIPT, [list(c) for c in candidates], clickable)
+        return element, index, ready
+
+    def resolve(self, candidates, clickable=False, timeout=None, step=None):
+        """Wait until a candidate matches and return (element, locator) or (None, None).
+
+        Higher-ranked candidates win over lower-ranked ones that match at the
+        same time or within the fallback grace period.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        first = candidates[0]
+        remember = self.memory is not None and step is not None
+        if remember:
+            candidates = self.memory.order(self.portal, step, candidates)
+        grace = min(self.fallback_grace, timeout / 2)
+        started = time.monotonic()
+
+        def match(driver):
+            element, index, ready = self.find(candidates, clickable)
+            if element is None:
+                return False
+            if index == 0 and (candidates[0] == first or ready):
+                # The top candidate; one promoted by the memory still waits for the page to load.
+                return element, candidates[0]
+            if ready and time.monotonic() - started >= grace:
+                return element, candidates[index]
+            return False
+
+        try:
+            element, locator = WebDriverWait(
+                self.driver, timeout,
+                poll_frequency=self.poll_frequency,
+                ignored_exceptions=(StaleElementReferenceException, JavascriptException)
+            ).until(match)
+        except TimeoutException:
+            element, locator = None, None
+        self.last_elapsed = time.monotonic() - started
+        if remember:
+            self.memory.record(self.portal, step, candidates, locator, self.last_elapsed)
+        if self.tracer is not None:
+            self.tracer.record("selector", self.last_elapsed, locator is not None, step=step or "",
+                               selector=locator[1] if locator else None,
+                               candidate=candidates.index(locator) if locator else None)
+        return element, locator
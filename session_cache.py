@@ -0,0 +1,112 @@
+# session_cache.py - Encrypted per-account cookie cache so repeat runs can skip login
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+from cryptography.fernet import Fernet, InvalidToken
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".youpower", "sessions")
+
+# Sessions are trusted for at most this many seconds after they were last validated.
+DEFAULT_MAX_AGE = 8 * 3600
+
+# Fields accepted by the DevTools Network.setCookies command.
+COOKIE_FIELDS = ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")
+
+
+class SessionCache:
+    """Stores browser cookies per portal and account, encrypted with a key derived from the password."""
+
+    def __init__(self, directory=DEFAULT_DIR, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+
+    def path_for(self, portal, username):
+        """Return the cache file path for an account."""
+        digest = hashlib.sha256(f"{portal}\0{username}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.session")
+
+    @staticmethod
+    def _fernet(portal, username, password):
+        """Derive the encryption key for an account from its credentials."""
+        salt = hashlib.sha256(f"youpower\0{portal}\0{username}".encode("utf-8")).digest()
+        key = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 100000)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self, portal, username, password):
+        """Return the cached cookies for an account, or None if missing, expired or unreadable."""
+        path = self.path_for(portal, username)
+        try:
+            with open(path, "rb") as f:
+                token = f.read()
+            payload = json.loads(self._fernet(portal, username, password).decrypt(token))
+        except (OSError, ValueError, InvalidToken):
+            return None
+        if payload.get("expires_at", 0) <= time.time():
+            self.invalidate(portal, username)
+            return None
+        return payload.get("cookies")
+
+    def save(self, portal, username, password, cookies):
+        """Encrypt and store cookies for an account."""
+        os.makedirs(self.directory, exist_ok=True)
+        now = time.time()
+        payload = {"saved_at": now, "expires_at": now + self.max_age, "cookies": cookies}
+        token = self._fernet(portal, username, password).encrypt(json.dumps(payload).encode("utf-8"))
+        path = self.path_for(portal, username)
+        # mkstemp creates the file readable by this user only, under a name no other writer shares.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def invalidate(self, portal, username):
+        """Forget the cached session for an account."""
+        try:
+            os.remove(self.path_for(portal, username))
+        except OSError:
+            pass
+
+
+def capture_cookies(driver):
+    """Return every cookie in the browser, across all domains."""
+    cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+    return [{k: c[k] for k in COOKIE_FIELDS if k in c} for c in cookies]
+
+
+def restore_session(driver, cache, portal, username, password, check_url, is_authenticated):
+    """Load cached cookies into the driver and verify them with one authenticated page load."""
+    cookies = cache.load(portal, username, password)
+    if not cookies:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        driver.get(check_url)
+        if is_authenticated(driver):
+            print("Restored cached session, skipping login.")
+            store_session(driver, cache, portal, username, password)
+            return True
+    except Exception as e:
+        print(f"Could not restore cached session: {e}")
+    print("Cached session expired, logging in.")
+    cache.invalidate(portal, username)
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    return False
+
+
+def store_session(driver, cache, portal, username, password):
+    """Save the driver's current cookies for the account."""
+    try:
+        cache.save(portal, username, password, capture_cookies(driver))
+    except Exception as e:
+        print(f"Could not cache session: {e}")
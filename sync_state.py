@@ -0,0 +1,86 @@
+# sync_state.py - Per-utility/account/meter high-water marks for incremental Green Button syncs
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from lazy_import import lazy
+
+# Loaded on first use: numpy is slow to import and the GUIs only need DEFAULT_OVERLAP_DAYS at startup.
+parse_file = lazy("espi_parser", "parse_file")
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".youpower", "sync_state.db")
+
+# Days re-requested before the high-water mark so late revisions are picked up.
+DEFAULT_OVERLAP_DAYS = 2
+
+
+class SyncState:
+    """Stores the end of the last successfully ingested interval for each utility, account and meter."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS high_water ("
+            " utility TEXT NOT NULL, account TEXT NOT NULL, meter TEXT NOT NULL,"
+            " last_end INTEGER NOT NULL, updated_at REAL NOT NULL,"
+            " PRIMARY KEY (utility, account, meter))"
+        )
+        self.db.commit()
+
+    def marks(self, utility, account):
+        """Return {meter: last_end} for an account."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT meter, last_end FROM high_water WHERE utility = ? AND account = ?",
+                (utility, account)
+            ).fetchall()
+        return dict(rows)
+
+    def advance(self, utility, account, meter, last_end):
+        """Move a meter's mark forward to last_end (epoch seconds); never moves it back."""
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO high_water (utility, account, meter, last_end, updated_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (utility, account, meter) DO UPDATE SET"
+                " last_end = MAX(last_end, excluded.last_end), updated_at = excluded.updated_at",
+                (utility, account, meter, int(last_end), time.time())
+            )
+            self.db.commit()
+
+    def record_files(self, utility, account, paths):
+        """Advance the marks from downloaded Green Button files; return {meter: last_end}."""
+        ends = {}
+        for path in paths:
+            try:
+                for meter, series in parse_file(path).items():
+                    if len(series):
+                        ends[meter] = max(ends.get(meter, 0), int(series.end.max()))
+            except Exception as e:
+                print(f"Could not read {path} for sync state: {e}")
+        for meter, last_end in ends.items():
+            self.advance(utility, account, meter, last_end)
+        return ends
+
+    def sync_range(self, utility, account, start, end, overlap_days=DEFAULT_OVERLAP_DAYS):
+        """Return the (start, end) dates still to fetch, or None when the account is up to date.
+
+        Without a mark the requested range is returned unchanged. Otherwise the
+        range starts overlap_days before the oldest meter mark of the account.
+        """
+        marks = self.marks(utility, account)
+        if not marks:
+            return start, end
+        oldest = datetime.fromtimestamp(min(marks.values()), tz=timezone.utc).date()
+        if oldest > end:
+            return None
+        return max(start, oldest - timedelta(days=overlap_days)), end
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
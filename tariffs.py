@@ -0,0 +1,253 @@
+# tariffs.py - Vectorized bill calculation for electric rate plans over many meters at once
+import argparse
+import csv
+import json
+import os
+import sys
+import numpy as np
+from espi_parser import UOM_WH
+from rollups import MeterBatch, period_table
+from interval_store import DOWNLOAD_SUFFIXES
+from download_tracker import is_partial
+
+DEFAULT_TERRITORY = "X"
+
+# PG&E baseline allowances in kWh per day for basic electric service, by
+# baseline territory and season. Approximate; check the current tariff book.
+BASELINE_ALLOWANCES = {
+    "P": {"summer": 13.5, "winter": 11.0},
+    "Q": {"summer": 9.8, "winter": 11.0},
+    "R": {"summer": 17.7, "winter": 10.4},
+    "S": {"summer": 15.0, "winter": 10.2},
+    "T": {"summer": 6.5, "winter": 7.5},
+    "V": {"summer": 7.1, "winter": 8.1},
+    "W": {"summer": 19.2, "winter": 9.8},
+    "X": {"summer": 9.8, "winter": 9.7},
+    "Y": {"summer": 10.5, "winter": 11.1},
+    "Z": {"summer": 5.9, "winter": 7.8},
+}
+
+PGE_SEASONS = {"summer": [6, 7, 8, 9], "winter": [1, 2, 3, 4, 5, 10, 11, 12]}
+
+# Rate plans. "schedule" is a rollups.PGE_TOU_SCHEDULES name or an inline
+# schedule ({} for a flat rate); "energy" is $/kWh per season and period.
+# "tiers" are [limit as a multiple of the baseline allowance (null for no
+# limit), $/kWh added to usage in that tier]; a negative rate is a baseline
+# credit. Prices are approximate and meant for comparing plans: update them
+# from PG&E's current tariff book or load your own plan with load_plan().
+PGE_RATE_PLANS = {
+    "E-1": {
+        "seasons": PGE_SEASONS,
+        "schedule": {},
+        "energy": {"summer": {"off_peak": 0.40}, "winter": {"off_peak": 0.40}},
+        "tiers": [[1.0, 0.0], [None, 0.10]],
+        "minimum_daily": 0.35,
+    },
+    "E-TOU-C": {
+        "seasons": PGE_SEASONS,
+        "schedule": "E-TOU-C",
+        "energy": {"summer": {"peak": 0.60, "off_peak": 0.50}, "winter": {"peak": 0.49, "off_peak": 0.46}},
+        "tiers": [[1.0, -0.10]],
+        "minimum_daily": 0.35,
+    },
+    "E-TOU-D": {
+        "seasons": PGE_SEASONS,
+        "schedule": "E-TOU-D",
+        "energy": {"summer": {"peak": 0.55, "off_peak": 0.40}, "winter": {"peak": 0.46, "off_peak": 0.40}},
+        "minimum_daily": 0.35,
+    },
+    "EV2-A": {
+        "seasons": PGE_SEASONS,
+        "schedule": "EV2-A",
+        "energy": {
+            "summer": {"peak": 0.62, "part_peak": 0.51, "off_peak": 0.31},
+            "winter": {"peak": 0.49, "part_peak": 0.47, "off_peak": 0.31},
+        },
+        "minimum_daily": 0.35,
+    },
+    "E-ELEC": {
+        "seasons": PGE_SEASONS,
+        "schedule": "E-ELEC",
+        "energy": {
+            "summer": {"peak": 0.60, "part_peak": 0.44, "off_peak": 0.38},
+            "winter": {"peak": 0.38, "part_peak": 0.36, "off_peak": 0.34},
+        },
+        "fixed_monthly": 15.0,
+    },
+}
+
+
+def load_plan(path):
+    """Read a rate plan from a JSON file laid out like the PGE_RATE_PLANS entries."""
+    with open(path) as f:
+        plan = json.load(f)
+    missing = [key for key in ("seasons", "energy") if key not in plan]
+    if missing:
+        raise ValueError(f"Rate plan {path} is missing: {', '.join(missing)}.")
+    return plan
+
+
+class Bill:
+    """Monthly bills of one rate plan: items[name][meter, month] in dollars, NaN for months without readings."""
+
+    def __init__(self, plan, meters, labels, items, kwh, days):
+        self.plan = plan
+        self.meters = meters
+        self.labels = labels
+        self.items = items
+        self.kwh = kwh
+        self.days = days
+
+    def __repr__(self):
+        return f"Bill({self.plan}: {len(self.meters)} meters x {len(self.labels)} months)"
+
+    @property
+    def total(self):
+        """Return the bill total per meter and month."""
+        total = sum(self.items.values(), np.zeros_like(self.kwh))
+        return np.where(self.days > 0, total, np.nan)
+
+    def meter_totals(self):
+        """Return the sum of all monthly bills per meter."""
+        return np.nansum(self.total, axis=1)
+
+    def write_csv(self, path):
+        """Write one row per meter and month with every line item and the total."""
+        total = self.total
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["meter", "month", "days", "kwh"] + list(self.items) + ["total"])
+            for row, meter in enumerate(self.meters):
+                for column, label in enumerate(self.labels.astype(str)):
+                    if self.days[row, column]:
+                        writer.writerow([meter, label, int(self.days[row, column]), round(self.kwh[row, column], 3)]
+                                        + [round(item[row, column], 2) for item in self.items.values()]
+                                        + [round(total[row, column], 2)])
+
+
+def _season_index(plan, labels):
+    """Return (season names, season number per month label)."""
+    seasons = list(plan["seasons"])
+    by_month = np.full(13, -1)
+    for number, season in enumerate(seasons):
+        by_month[plan["seasons"][season]] = number
+    index = by_month[labels.astype(np.int64) % 12 + 1]
+    if (index < 0).any():
+        raise ValueError(f"Rate plan seasons do not cover every month: {plan['seasons']}.")
+    return seasons, index
+
+
+def calculate(plan, profile, days, labels, territory=DEFAULT_TERRITORY, meters=(), name=None):
+    """Compute the monthly bills of one plan from an hourly profile (see MeterBatch.hourly_profile).
+
+    Every step works on [meter, month] arrays, so the cost does not depend on
+    the number of readings behind the profile.
+    """
+    names, table = period_table(plan.get("schedule", {}))
+    seasons, season = _season_index(plan, labels)
+    kwh = profile.sum(axis=2)
+    # period_kwh[meter, month, period] from the 48 hour slots of the profile.
+    period_kwh = profile @ (table.ravel()[:, None] == np.arange(len(names))).astype(np.float64)
+
+    items = {}
+    for number, period in enumerate(names):
+        prices = np.array([plan["energy"][season_name].get(period, plan["energy"][season_name].get("off_peak", 0.0))
+                           for season_name in seasons])
+        items[f"energy {period}"] = period_kwh[:, :, number] * prices[season]
+
+    tiers = plan.get("tiers", [])
+    if tiers:
+        allowances = BASELINE_ALLOWANCES[territory]
+        baseline = days * np.array([allowances.get(season_name, 0.0) for season_name in seasons])[season]
+        lower = np.zeros_like(baseline)
+        for number, (limit, rate) in enumerate(tiers, 1):
+            upper = np.full_like(baseline, np.inf) if limit is None else baseline * limit
+            if rate:
+                label = "baseline credit" if rate < 0 and number == 1 else f"tier {number}"
+                items[label] = (np.clip(kwh, lower, upper) - lower) * rate
+            lower = upper
+
+    if plan.get("fixed_daily"):
+        items["fixed daily"] = days * plan["fixed_daily"]
+    if plan.get("fixed_monthly"):
+        items["fixed monthly"] = (days > 0) * plan["fixed_monthly"]
+    if plan.get("minimum_daily"):
+        subtotal = sum(items.values(), np.zeros_like(kwh))
+        items["minimum charge adjustment"] = np.maximum(days * plan["minimum_daily"] - subtotal, 0.0)
+    return Bill(name or plan.get("name", "plan"), list(meters), labels, items, kwh, days)
+
+
+def compare(batch, plans=None, territory=DEFAULT_TERRITORY):
+    """Bill every meter of a MeterBatch under every plan; return {plan name: Bill}.
+
+    The readings are reduced once to a profile of energy per meter, month and
+    hour slot, and each plan is priced from that profile.
+    """
+    plans = PGE_RATE_PLANS if plans is None else plans
+    labels, profile = batch.hourly_profile("month")
+    days = batch.day_counts("month")
+    return {
+        name: calculate(plan, profile, days, labels, territory, batch.meters, name)
+        for name, plan in plans.items()
+    }
+
+
+def cheapest(bills):
+    """Return the name of the cheapest plan per meter."""
+    names = list(bills)
+    totals = np.array([bills[name].meter_totals() for name in names])
+    return [names[index] for index in totals.argmin(axis=0)] if len(names) else []
+
+
+def write_comparison(bills, path):
+    """Write one row per meter with its total under every plan and the cheapest plan."""
+    names = list(bills)
+    first = bills[names[0]] if names else None
+    totals = [bills[name].meter_totals() for name in names]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["meter", "kwh"] + names + ["cheapest"])
+        if first is None:
+            return
+        kwh = first.kwh.sum(axis=1)
+        for row, (meter, best) in enumerate(zip(first.meters, cheapest(bills))):
+            writer.writerow([meter, round(kwh[row], 3)] + [round(total[row], 2) for total in totals] + [best])
+
+
+def download_files(directory):
+    """Return the finished Green Button downloads in a folder."""
+    return sorted(
+        entry.path for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.lower().endswith(DOWNLOAD_SUFFIXES) and not is_partial(entry.name)
+    )
+
+
+def compare_directory(directory, plans=None, territory=DEFAULT_TERRITORY, output=None):
+    """Compare rate plans for every electric meter downloaded to a folder and write rate_comparison.csv."""
+    batch = MeterBatch.from_files(download_files(directory), uoms=(None, UOM_WH))
+    bills = compare(batch, plans, territory)
+    output = output or os.path.join(directory, "rate_comparison.csv")
+    write_comparison(bills, output)
+    print(f"Compared {len(bills)} rate plans for {len(batch.meters)} meters; results saved to {output}")
+    return bills
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PG&E rate plans for downloaded Green Button data.")
+    parser.add_argument("directory", help="download folder with Green Button XML or CSV files")
+    parser.add_argument("--territory", default=DEFAULT_TERRITORY, choices=sorted(BASELINE_ALLOWANCES))
+    parser.add_argument("--plan", action="append", default=[], help="JSON rate plan file (repeatable)")
+    parser.add_argument("--output", help="comparison CSV (default: rate_comparison.csv in the folder)")
+    args = parser.parse_args()
+
+    plans = dict(PGE_RATE_PLANS)
+    for path in args.plan:
+        plans[os.path.splitext(os.path.basename(path))[0]] = load_plan(path)
+    bills = compare_directory(args.directory, plans, args.territory, args.output)
+    for meter, best in zip(next(iter(bills.values())).meters, cheapest(bills)):
+        print(f"{meter}: {best}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+# telemetry.py - Structured timing spans as JSON lines and Prometheus histograms of where run time goes
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_DIR = os.environ.get("YOUPOWER_TELEMETRY_DIR",
+                             os.path.join(os.path.expanduser("~"), ".youpower", "telemetry"))
+SPANS_FILE = "spans.jsonl"
+METRICS_FILE = "metrics.prom"
+STATE_FILE = "metrics.json"
+LOCK_FILE = "metrics.lock"
+
+METRIC = "youpower_span_seconds"
+LABELS = ("portal", "span", "step", "ok")
+# Histogram bucket upper bounds in seconds; +Inf is implied.
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+DEFAULT_PORT = 9464
+
+
+def _labels_key(portal, span, step, ok):
+    """Return the histogram key for a span."""
+    return "\t".join((portal, span, step or "", "true" if ok else "false"))
+
+
+def observe(histograms, key, seconds):
+    """Add one observation to a {key: {"buckets", "count", "sum"}} histogram set."""
+    histogram = histograms.setdefault(key, {"buckets": [0] * (len(BUCKETS) + 1), "count": 0, "sum": 0.0})
+    index = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+    histogram["buckets"][index] += 1
+    histogram["count"] += 1
+    histogram["sum"] += seconds
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(histograms):
+    """Return histograms in the Prometheus text exposition format."""
+    lines = [f"# HELP {METRIC} Time spent in each scraper phase.", f"# TYPE {METRIC} histogram"]
+    for key in sorted(histograms):
+        histogram = histograms[key]
+        labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(LABELS, key.split("\t")))
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram["buckets"]):
+            cumulative += count
+            lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{METRIC}_sum{{{labels}}} {histogram['sum']:.6f}")
+        lines.append(f"{METRIC}_count{{{labels}}} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _load_state(path):
+    """Read saved histograms, starting empty when the file is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path, text):
+    """Write a text file atomically, through a temporary file no other writer shares."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Serializes histogram updates between threads; _locked() adds a file lock for other processes.
+_merge_lock = threading.Lock()
+
+
+@contextmanager
+def _locked(directory):
+    """Hold the saved histograms of a telemetry directory exclusively, across threads and processes."""
+    with _merge_lock:
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_FILE), "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after about ten seconds; keep waiting.
+                        continue
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class Tracer:
+    """Times the phases of one scraper run.
+
+    Every finished span is appended to spans.jsonl as one JSON object. finish()
+    adds the run's spans to the cumulative histograms in metrics.json and
+    rewrites metrics.prom, which a Prometheus textfile collector or
+    ``python telemetry.py serve`` can expose.
+    """
+
+    def __init__(self, portal, directory=DEFAULT_DIR, run_id=None):
+        self.portal = portal
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.histograms = {}
+        self.file = open(os.path.join(directory, SPANS_FILE), "a", encoding="utf-8")
+
+    def _stack(self):
+        """Return the open span names of the current thread."""
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def record(self, name, seconds, ok=True, started=None, **attributes):
+        """Record a span that was timed elsewhere."""
+        stack = self._stack()
+        span = {
+            "run": self.run_id, "portal": self.portal, "span": name,
+            "start": round(time.time() - seconds if started is None else started, 3),
+            "seconds": round(seconds, 4), "ok": bool(ok),
+        }
+        if stack:
+            span["parent"] = stack[-1]
+        span.update(attributes)
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(json.dumps(span, default=str) + "\n")
+            observe(self.histograms, _labels_key(self.portal, name, attributes.get("step"), ok), seconds)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block as a span; yields its attributes so the block can add to them.
+
+        An exception marks the span failed; the block can also set "ok" itself.
+        """
+        stack = self._stack()
+        started, clock = time.time(), time.monotonic()
+        stack.append(name)
+        ok = True
+        try:
+            yield attributes
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            stack.pop()
+            ok = attributes.pop("ok", ok)
+            self.record(name, time.monotonic() - clock, ok, started, **attributes)
+
+    def finish(self):
+        """Close the span file and merge this run into the saved histograms."""
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.close()
+            histograms, self.histograms = self.histograms, {}
+        if histograms:
+            try:
+                merge_histograms(self.directory, histograms)
+            except OSError as e:
+                # Metrics are best effort; the spans are already on disk and rebuild can recover them.
+                print(f"Could not update the telemetry histograms: {e}")
+
+
+def merge_histograms(directory, histograms):
+    """Add histograms to the saved totals in a telemetry directory and rewrite metrics.prom.
+
+    The read-modify-write runs under _locked(), so concurrent finish() calls
+    from threads or processes sharing the directory all land.
+    """
+    state_path = os.path.join(directory, STATE_FILE)
+    with _locked(directory):
+        state = _load_state(state_path)
+        for key, histogram in histograms.items():
+            total = state.setdefault(key, {"buckets": [0] * (len(BUCKETS) + 1), "count": 0, "sum": 0.0})
+            if len(total["buckets"]) != len(histogram["buckets"]):
+                # Saved with different bucket bounds; start that series over.
+                total.update(buckets=[0] * (len(BUCKETS) + 1), count=0, sum=0.0)
+            total["buckets"] = [a + b for a, b in zip(total["buckets"], histogram["buckets"])]
+            total["count"] += histogram["count"]
+            total["sum"] += histogram["sum"]
+        _write_atomic(state_path, json.dumps(state))
+        _write_atomic(os.path.join(directory, METRICS_FILE), render_prometheus(state))
+
+
+def read_spans(directory=DEFAULT_DIR):
+    """Yield every recorded span, skipping lines cut short by a crash."""
+    try:
+        f = open(os.path.join(directory, SPANS_FILE), encoding="utf-8")
+    except OSError:
+        return
+    with f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def rebuild(directory=DEFAULT_DIR):
+    """Recompute the saved histograms and metrics.prom from spans.jsonl."""
+    histograms = {}
+    for span in read_spans(directory):
+        observe(histograms, _labels_key(span["portal"], span["span"], span.get("step"), span["ok"]), span["seconds"])
+    with _locked(directory):
+        _write_atomic(os.path.join(directory, STATE_FILE), json.dumps(histograms))
+        _write_atomic(os.path.join(directory, METRICS_FILE), render_prometheus(histograms))
+    return histograms
+
+
+def summarize(directory=DEFAULT_DIR, top=25):
+    """Print where the time went: total, count, median and 95th percentile per span and step."""
+    durations = {}
+    runs = set()
+    for span in read_spans(directory):
+        runs.add(span["run"])
+        key = (span["portal"], span["span"], span.get("step") or "")
+        durations.setdefault(key, []).append(span["seconds"])
+    print(f"{len(runs)} runs")
+    print(f"{'portal':<16}{'span':<16}{'step':<22}{'count':>7}{'total s':>10}{'p50 s':>9}{'p95 s':>9}")
+    rows = sorted(durations.items(), key=lambda item: -sum(item[1]))
+    for (portal, name, step), values in rows[:top]:
+        values.sort()
+        p50 = values[len(values) // 2]
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"{portal:<16}{name:<16}{step:<22}{len(values):>7}{sum(values):>10.1f}{p50:>9.2f}{p95:>9.2f}")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the current metrics.prom at /metrics."""
+    directory = DEFAULT_DIR
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            with open(os.path.join(self.directory, METRICS_FILE), "rb") as f:
+                body = f.read()
+        except OSError:
+            body = render_prometheus({}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(directory=DEFAULT_DIR, port=DEFAULT_PORT, host="127.0.0.1"):
+    """Serve metrics.prom over HTTP in a background thread and return the server."""
+    handler = type("Handler", (MetricsHandler,), {"directory": directory})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving metrics at http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and export YouPower timing spans.")
+    parser.add_argument("command", choices=("summary", "rebuild", "serve"))
+    parser.add_argument("--dir", default=DEFAULT_DIR, help="telemetry directory")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port for serve")
+    parser.add_argument("--host", default="127.0.0.1", help="address for serve")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        summarize(args.dir)
+    elif args.command == "rebuild":
+        histograms = rebuild(args.dir)
+        print(f"Rebuilt {len(histograms)} histograms into {os.path.join(args.dir, METRICS_FILE)}")
+    else:
+        server = serve_metrics(args.dir, args.port, args.host)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+from collections import Counter
+from datetime import date
+import pytest
+from batch import ManifestError, load_jobs, parse_limits, resolve_credentials, run_jobs, write_summary
+
+
+def test_manifest_formats_give_the_same_jobs(tmp_path):
+    (tmp_path / "jobs.csv").write_text("utility,username,credentials,start,end,sync\n"
+                                       "pge,alice,env:PGE_ALICE,2024-01-01,2024-01-31,yes\n"
+                                       "pge,alice,env:PGE_ALICE,2024-01-01,2024-01-31,\n")
+    (tmp_path / "jobs.json").write_text(json.dumps({
+        "defaults": {"utility": "pge", "credentials": "env:PGE_ALICE", "start": "2024-01-01", "end": "2024-01-31"},
+        "jobs": [{"username": "alice", "sync": True}, {"username": "alice"}]}))
+    (tmp_path / "jobs.toml").write_text('[defaults]\nutility = "pge"\ncredentials = "env:PGE_ALICE"\n'
+                                        'start = 2024-01-01\nend = 2024-01-31\n'
+                                        '[[jobs]]\nusername = "alice"\nsync = true\n'
+                                        '[[jobs]]\nusername = "alice"\n')
+    loaded = [load_jobs(str(tmp_path / name)) for name in ("jobs.csv", "jobs.json", "jobs.toml")]
+    assert loaded[0] == loaded[1] == loaded[2]
+    first, second = loaded[0]
+    assert (first["id"], second["id"]) == ("pge/alice", "pge/alice#2")
+    assert (first["sync"], second["sync"]) == (True, False)
+    assert (first["start"], first["end"]) == (date(2024, 1, 1), date(2024, 1, 31))
+    assert first["output"] == str(tmp_path / "downloads" / "pge" / "alice")
+
+
+@pytest.mark.parametrize("entry, message", [
+    ({"utility": "sce"}, "utility must be one of"),
+    ({"username": ""}, "username is missing"),
+    ({"password": "hunter2"}, "put passwords in the environment"),
+    ({"credentials": "hunter2"}, "credentials must be"),
+    ({"start": "2024-02-01"}, "is after end"),
+    ({"end": "01/31/2024"}, "YYYY-MM-DD"),
+    ({"backend": "netscape"}, "backend must be one of"),
+    ({"sessions": "many"}, "sessions must be a number"),
+    ({"username": ["alice"]}, "username must be text"),
+    ({"credentials": 12}, "credentials must be"),
+    ({"output": 3.5}, "output must be text"),
+    ({"utility": ["pge"]}, "utility must be one of"),
+])
+def test_invalid_jobs_name_the_problem(tmp_path, entry, message):
+    job = dict({"utility": "pge", "username": "alice", "credentials": "env:X", "start": "2024-01-01",
+                "end": "2024-01-31"}, **entry)
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps([job]))
+    with pytest.raises(ManifestError, match=message):
+        load_jobs(str(path))
+
+
+def test_numeric_usernames_are_read_as_text(tmp_path):
+    path = tmp_path / "jobs.toml"
+    path.write_text('[[jobs]]\nutility = "pge"\nusername = 12345\ncredentials = "env:X"\n')
+    job, = load_jobs(str(path))
+    assert job["username"] == "12345" and job["id"] == "pge/12345"
+
+
+def test_entries_must_be_tables(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps(["pge"]))
+    with pytest.raises(ManifestError, match="must be a table"):
+        load_jobs(str(path))
+
+
+def test_credentials_come_from_the_environment_or_a_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("PGE_ALICE", "from-env")
+    (tmp_path / "secret").write_text("from-file\nignored\n")
+    assert resolve_credentials("env:PGE_ALICE", str(tmp_path)) == "from-env"
+    assert resolve_credentials("file:secret", str(tmp_path)) == "from-file"
+    monkeypatch.delenv("PGE_ALICE")
+    with pytest.raises(ManifestError):
+        resolve_credentials("env:PGE_ALICE", str(tmp_path))
+
+
+def test_limits():
+    assert parse_limits(["pge-mobile=3"], workers=2) == {"pge": 2, "myenergycenter": 2}
+    assert parse_limits(["pge=1"], workers=2) == {"pge": 1, "myenergycenter": 2}
+    with pytest.raises(ManifestError):
+        parse_limits(["pge=0"], workers=2)
+
+
+def test_run_jobs_respects_the_per_site_limit():
+    jobs = [{"id": f"{utility}/{number}", "utility": utility}
+            for number in range(4) for utility in ("pge", "pge-mobile", "myenergycenter")]
+    lock = threading.Lock()
+    active, peak = Counter(), Counter()
+
+    def run(job):
+        site = "pge" if job["utility"].startswith("pge") else job["utility"]
+        with lock:
+            active[site] += 1
+            peak[site] = max(peak[site], active[site])
+        time.sleep(0.02)
+        with lock:
+            active[site] -= 1
+        return {"id": job["id"], "ok": True, "seconds": 0.02, "message": ""}
+
+    results = run_jobs(jobs, 3, {"pge": 1, "myenergycenter": 2}, run)
+    assert [result["id"] for result in results] == [job["id"] for job in jobs]
+    assert peak == {"pge": 1, "myenergycenter": 2}
+
+
+def test_summary_is_written_whole(tmp_path):
+    path = str(tmp_path / "jobs.results.json")
+    results = [{"id": "pge/alice", "ok": True}, {"id": "pge/bob", "ok": False}]
+    summary = write_summary(path, str(tmp_path / "jobs.csv"), results, time.time())
+    assert summary["failed"] == ["pge/bob"]
+    assert json.loads(open(path).read())["results"] == results
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["jobs.results.json"]
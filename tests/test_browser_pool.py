@@ -0,0 +1,84 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def __init__(self, download_path):
+        self.download_paths = [download_path]
+        self.alive = True
+        self.quit_called = False
+        self.window_handles = ["main"]
+        self.switch_to = SimpleNamespace(window=lambda handle: None)
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("browser gone")
+        return "about:" if "origin" in script else 1
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Browser.setDownloadBehavior":
+            self.download_paths.append(params["downloadPath"])
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def launched():
+    return []
+
+
+@pytest.fixture
+def pool(launched, tmp_path):
+    def factory(download_path):
+        launched.append(FakeDriver(download_path))
+        return launched[-1]
+
+    pool = BrowserPool(factory, size=2, max_uses=2, max_rss_mb=0, download_path=str(tmp_path))
+    yield pool
+    pool.close()
+
+
+def test_drivers_are_reused_and_pointed_at_each_job(pool, launched, tmp_path):
+    with pool.lease(str(tmp_path / "a")) as first:
+        pass
+    with pool.lease(str(tmp_path / "b")) as second:
+        pass
+    assert first is second and len(launched) == 1
+    # Reset to the pool's directory between leases; the second lease used it up, so it was quit.
+    assert first.download_paths == [str(tmp_path), str(tmp_path / "a"), str(tmp_path), str(tmp_path / "b")]
+    assert first.quit_called
+
+
+def test_worn_out_and_dead_drivers_are_replaced(pool, launched, tmp_path):
+    for _ in range(3):
+        with pool.lease(str(tmp_path)):
+            pass
+    assert len(launched) == 2 and launched[0].quit_called
+    launched[1].alive = False
+    with pool.lease(str(tmp_path)) as driver:
+        assert driver is launched[2]
+    assert launched[1].quit_called
+
+
+def test_acquire_waits_for_a_free_slot(pool, tmp_path):
+    first = pool.acquire(str(tmp_path))
+    second = pool.acquire(str(tmp_path))
+    with pytest.raises(TimeoutError):
+        pool.acquire(str(tmp_path), timeout=0.05)
+    threading.Timer(0.05, pool.release, [first]).start()
+    assert pool.acquire(str(tmp_path), timeout=5) is first
+    pool.release(first)
+    pool.release(second)
+
+
+def test_warm_and_close(pool, launched):
+    pool.warm()
+    assert len(launched) == 2 and pool.total == 2
+    pool.close()
+    assert all(driver.quit_called for driver in launched) and pool.total == 0
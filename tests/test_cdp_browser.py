@@ -0,0 +1,104 @@
+import asyncio
+import json
+import shutil
+import subprocess
+import pytest
+import cdp_browser
+from cdp_browser import CDPConnection, CDPPage, CDPTimeoutError, NODE_KEY, SCRIPT_WRAPPER, STALE_MARKER
+
+
+class SilentWebSocket:
+    """A websocket whose peer never answers; sent messages are kept in order."""
+
+    def __init__(self):
+        self.sent = []
+        self.incoming = asyncio.Queue()
+
+    async def send(self, text):
+        self.sent.append(json.loads(text))
+
+    async def recv(self):
+        return await self.incoming.get()
+
+    def push(self, message):
+        self.incoming.put_nowait(json.dumps(message))
+
+    async def close(self):
+        pass
+
+
+def test_send_times_out_without_a_reply():
+    async def main():
+        connection = CDPConnection(SilentWebSocket())
+        with pytest.raises(CDPTimeoutError):
+            await connection.send("Runtime.evaluate", {"expression": "1"}, timeout=0.05)
+        assert not connection.pending
+        await connection.close()
+
+    asyncio.run(main())
+
+
+def test_script_evaluation_uses_the_script_timeout():
+    async def main():
+        websocket = SilentWebSocket()
+        page = CDPPage(cdp_browser.SimpleNamespace(connection=CDPConnection(websocket)), "T1", "S1")
+        page.script_timeout = 0.05
+        with pytest.raises(CDPTimeoutError):
+            await page.run_script("return new Promise(function() {});")
+        await page.connection.close()
+
+    asyncio.run(main())
+
+
+def test_click_waits_for_a_navigation_that_starts_after_its_reply():
+    async def main():
+        websocket = SilentWebSocket()
+        page = CDPPage(cdp_browser.SimpleNamespace(connection=CDPConnection(websocket)), "T1", "S1")
+        page.frame_id = "F1"
+        loaded = []
+
+        async def navigate_soon():
+            await asyncio.sleep(cdp_browser.NAVIGATION_GRACE / 4)
+            websocket.push({"method": "Page.frameRequestedNavigation", "sessionId": "S1",
+                            "params": {"frameId": "F1", "disposition": "currentTab"}})
+            await asyncio.sleep(0.05)
+            loaded.append(True)
+            websocket.push({"method": "Page.frameStoppedLoading", "sessionId": "S1", "params": {"frameId": "F1"}})
+
+        async def action():
+            asyncio.get_running_loop().create_task(navigate_soon())
+
+        await page._navigation_after(action)
+        assert loaded == [True]
+        await page.connection.close()
+
+    asyncio.run(main())
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the page script")
+def test_handles_from_an_earlier_document_are_stale():
+    def call(body, args):
+        return "call(function() { return %s; })" % (SCRIPT_WRAPPER % (body, args))
+
+    # A navigation gives the page a new window: its registry starts over at index 0.
+    script = """
+class Node { constructor(n) { this.n = n; this.isConnected = true; } }
+class NodeList {} class HTMLCollection {}
+var window = globalThis, results = [], old;
+function call(f) { try { results.push(f()); } catch (e) { results.push(e.message); } }
+%s;
+old = results[0];
+%s;
+delete window.__ypNodes; delete window.__ypDocument;
+%s;
+%s;
+console.log(JSON.stringify(results));
+""" % (call("return new Node('first');", "[]"),
+       call("return arguments[0].n;", "[old]"),
+       call("return new Node('second');", "[]"),
+       call("return arguments[0].n;", "[old]"))
+    results = json.loads(subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout)
+    first, same_document, second, after_navigation = results
+    assert first[NODE_KEY][1] == second[NODE_KEY][1] == 0
+    assert same_document == "first"
+    assert after_navigation == STALE_MARKER
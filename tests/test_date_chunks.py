@@ -0,0 +1,105 @@
+import os
+import threading
+from datetime import date
+import numpy as np
+import pytest
+from date_chunks import plan_chunks, fetch_chunks, merge_chunks, export_in_chunks
+from espi_parser import parse_file
+from benchmarks.mock_portal import espi_feed
+
+
+def test_plan_chunks_month_is_calendar_aligned():
+    assert plan_chunks(date(2024, 1, 15), date(2024, 3, 2)) == [
+        (date(2024, 1, 15), date(2024, 1, 31)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+        (date(2024, 3, 1), date(2024, 3, 2)),
+    ]
+
+
+@pytest.mark.parametrize("size", ["day", "week", "month", "quarter", "year", 10])
+def test_plan_chunks_cover_the_range_without_gaps(size):
+    start, end = date(2023, 11, 20), date(2025, 2, 3)
+    chunks = plan_chunks(start, end, size)
+    assert chunks[0][0] == start and chunks[-1][1] == end
+    for (_, previous_end), (chunk_start, chunk_end) in zip(chunks, chunks[1:]):
+        assert (chunk_start - previous_end).days == 1 and chunk_start <= chunk_end
+
+
+def test_plan_chunks_rejects_bad_input():
+    with pytest.raises(ValueError):
+        plan_chunks(date(2024, 2, 1), date(2024, 1, 1))
+    with pytest.raises(ValueError):
+        plan_chunks(date(2024, 1, 1), date(2024, 2, 1), "fortnight")
+
+
+def test_fetch_chunks_retries_and_keeps_chunk_order():
+    calls = {}
+
+    def fetch(start, end, index):
+        calls[index] = calls.get(index, 0) + 1
+        if index == 1 and calls[index] == 1:
+            raise OSError("flaky")
+        return index
+
+    assert fetch_chunks(fetch, plan_chunks(date(2024, 1, 1), date(2024, 1, 3), "day"), backoff=0) == [0, 1, 2]
+    assert calls[1] == 2
+
+
+def write_chunk(directory, name, meter, start, end):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(espi_feed(meter, start, end))
+    return path
+
+
+def test_merge_chunks_keeps_shared_intervals_once(tmp_path):
+    first = write_chunk(tmp_path, "a.xml", "1001", date(2024, 1, 1), date(2024, 1, 2))
+    second = write_chunk(tmp_path, "b.xml", "1001", date(2024, 1, 2), date(2024, 1, 3))
+    [merged] = merge_chunks([first, second], str(tmp_path))
+    series = next(iter(parse_file(merged).values()))
+    expected = np.unique(np.concatenate([s.start for p in (first, second) for s in parse_file(p).values()]))
+    assert series.start.tolist() == expected.tolist()
+
+
+def test_merge_chunks_never_overwrites_and_logs_instead_of_printing(tmp_path, capsys):
+    chunk = write_chunk(tmp_path, "a.xml", "1001", date(2024, 1, 1), date(2024, 1, 2))
+    messages = []
+    [first] = merge_chunks([chunk], str(tmp_path), log=messages.append)
+    os.truncate(first, 0)
+    [second] = merge_chunks([chunk], str(tmp_path), log=messages.append)
+    assert second == first[:-len(".csv")] + "_1.csv"
+    assert os.path.getsize(first) == 0
+    [(meter, series)] = parse_file(second).items()
+    assert os.path.basename(second).startswith(f"GreenButton_{meter}_")
+    assert messages[-1] == f"Merged {len(series)} readings for meter {meter} into {second}"
+    assert capsys.readouterr().out == ""
+
+
+def test_concurrent_calls_keep_their_own_work_dirs(tmp_path):
+    started, written = threading.Barrier(2), threading.Barrier(2)
+
+    class Exporter:
+        def __init__(self, meter):
+            self.meter = meter
+
+        def export(self, start, end, directory, account):
+            started.wait(timeout=5)
+            path = write_chunk(directory, "GreenButton.xml", self.meter, start, end)
+            written.wait(timeout=5)
+            return path
+
+    results = {}
+
+    def run(meter):
+        results[meter] = export_in_chunks(Exporter(meter), date(2024, 1, 1), date(2024, 1, 1), str(tmp_path),
+                                          size="day", concurrency=1)
+
+    threads = [threading.Thread(target=run, args=(meter,)) for meter in ("1001", "1002")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for meter in ("1001", "1002"):
+        [path] = results[meter]
+        assert list(parse_file(path)) == [f"{meter}_1"]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".chunks")]
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+import pytest
+from deep_links import DeepLinkMemory, account_key, on_page
+
+BASE = "https://www.pge.com"
+MARKER = ("xpath", "//a[contains(text(), 'Green Button')]")
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return DeepLinkMemory(str(tmp_path / "deep_links.json"), max_failures=2)
+
+
+def learned(memory, username="alice", url=BASE + "/myaccount/usage/details#green"):
+    assert memory.learn("pge", username, url, BASE + "/", MARKER, click_loads=3)
+    return memory.lookup("pge", username)
+
+
+def test_learn_stores_the_path_relative_to_the_portal(memory):
+    entry = learned(memory)
+    assert entry["path"] == "/myaccount/usage/details"
+    assert DeepLinkMemory.url_for(entry, BASE) == BASE + "/myaccount/usage/details"
+    assert account_key("alice") in memory.data["pge"]
+    assert "alice" not in repr(memory.data)
+
+
+def test_pages_off_the_portal_are_not_learned(memory):
+    assert not memory.learn("pge", "alice", "https://login.example.com/usage", BASE, MARKER, 3)
+    assert memory.lookup("pge", "alice") is None
+
+
+def test_consecutive_failures_evict_the_shortcut(memory):
+    learned(memory)
+    memory.record("pge", "alice", False, -1)
+    memory.record("pge", "alice", True, 2)
+    assert memory.lookup("pge", "alice")["failures"] == 0
+    memory.record("pge", "alice", False, -1)
+    assert memory.lookup("pge", "alice") is not None
+    memory.record("pge", "alice", False, -1)
+    assert memory.lookup("pge", "alice") is None
+    memory.record("pge", "alice", True, 2)
+    assert memory.lookup("pge", "alice") is None
+
+
+def test_relearning_a_new_path_resets_the_counts(memory):
+    learned(memory)
+    memory.record("pge", "alice", True, 2)
+    memory.record("pge", "alice", False, -1)
+    entry = learned(memory, url=BASE + "/myaccount/energy-usage")
+    assert (entry["hits"], entry["failures"], entry["saved"]) == (0, 0, 1)
+
+
+def test_save_merges_with_changes_from_another_process(memory):
+    learned(memory, "alice")
+    other = DeepLinkMemory(memory.path)
+    learned(other, "bob")
+    other.save()
+    memory.save()
+    assert DeepLinkMemory(memory.path).lookup("pge", "bob") is not None
+    memory.record("pge", "alice", False, -1)
+    memory.record("pge", "alice", False, -1)
+    memory.save()
+    stored = DeepLinkMemory(memory.path)
+    assert stored.lookup("pge", "alice") is None and stored.lookup("pge", "bob") is not None
+
+
+def test_on_page_fails_at_once_when_redirected(memory):
+    entry = learned(memory)
+    driver = SimpleNamespace(current_url=BASE + "/en/login?redirect=usage")
+    assert not on_page(driver, entry, BASE, timeout=5)
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+import pytest
+from download_tracker import DownloadTracker
+
+
+def write(directory, name, data=b"<feed/>"):
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(data)
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = DownloadTracker(str(tmp_path), poll_interval=0.02, settle_time=0.05)
+    yield tracker
+    tracker.close()
+
+
+def test_jobs_claim_files_in_start_order(tracker, tmp_path):
+    write(tmp_path, "old.xml")
+    first, second = tracker.start_job("first"), tracker.start_job("second")
+    write(tmp_path, "a.xml")
+    write(tmp_path, "b.xml")
+    results = {}
+    # The later job starts waiting first, but may not claim before the earlier one.
+    waiter = threading.Thread(target=lambda: results.setdefault("second", tracker.wait(second, timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    results["first"] = tracker.wait(first, timeout=5)
+    waiter.join()
+    assert os.path.basename(results["first"][0]) == "a.xml"
+    assert os.path.basename(results["second"][0]) == "b.xml"
+
+
+def test_partial_download_resolves_to_its_final_name(tracker, tmp_path):
+    job = tracker.start_job()
+    write(tmp_path, "usage.xml.crdownload", b"")
+    assert not tracker._update(job, tracker.scan(), time.monotonic())
+    assert job.partial == "usage.xml.crdownload"
+    os.rename(tmp_path / "usage.xml.crdownload", tmp_path / "usage.xml")
+    path, size = tracker.wait(job, timeout=5)
+    assert os.path.basename(path) == "usage.xml" and size == 0
+
+
+def test_wait_times_out_without_a_file(tracker):
+    with pytest.raises(TimeoutError):
+        tracker.wait(tracker.start_job(), timeout=0.1)
+    assert tracker.jobs == []
+
+
+def watcher_threads(directory):
+    return [thread for thread in threading.enumerate() if thread.name == f"inotify:{directory}"]
+
+
+def test_last_release_stops_watching(tmp_path):
+    directory = os.path.abspath(str(tmp_path))
+    with DownloadTracker.for_directory(directory) as tracker:
+        with DownloadTracker.for_directory(directory) as again:
+            assert again is tracker
+        assert DownloadTracker._trackers[directory] is tracker
+        if tracker.uses_inotify:
+            assert watcher_threads(directory)
+    assert directory not in DownloadTracker._trackers
+    assert tracker.stop_watching is None
+    assert not watcher_threads(directory)
+    assert DownloadTracker.for_directory(directory) is not tracker
+    DownloadTracker._trackers[directory].release()
+
+
+class Browser:
+    """Stands in for a driver: "downloads" a file into whatever folder it was last pointed at."""
+
+    def __init__(self):
+        self.paths = []
+
+    def execute_cdp_cmd(self, command, params):
+        assert command == "Browser.setDownloadBehavior"
+        self.paths.append(params["downloadPath"])
+
+    def download(self, name, data, delay=0.0):
+        folder = self.paths[-1]
+
+        def save():
+            time.sleep(delay)
+            write(folder, name + ".crdownload", data[:1])
+            time.sleep(0.05)
+            os.replace(os.path.join(folder, name + ".crdownload"), os.path.join(folder, name))
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(data)
+
+        threading.Thread(target=save).start()
+
+
+def test_concurrent_sessions_get_their_own_files(tmp_path):
+    from download_tracker import private_downloads
+
+    results = {}
+
+    def session(account, delay):
+        browser = Browser()
+        with private_downloads(browser, str(tmp_path)) as downloads:
+            job = downloads.start_job(account)
+            # The later session's file lands first; a shared folder would hand it to the earlier job.
+            browser.download("GreenButton.xml", account.encode(), delay)
+            results[account] = downloads.wait(job, timeout=5)
+        assert browser.paths[-1] == str(tmp_path) and len(set(browser.paths)) == 2
+
+    threads = [threading.Thread(target=session, args=(account, delay)) for account, delay in (("A", 0.3), ("B", 0))]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    for account, (path, size) in results.items():
+        assert os.path.dirname(path) == str(tmp_path)
+        with open(path, "rb") as f:
+            assert f.read() == account.encode()
+    assert sorted(os.listdir(tmp_path)) == ["GreenButton.xml", "GreenButton_1.xml"]
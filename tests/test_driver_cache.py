@@ -0,0 +1,46 @@
+import pytest
+import driver_cache
+from driver_cache import DriverCache, DriverCacheError, major
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(driver_cache, "chrome_version", lambda: "120.0.6099.109")
+    return DriverCache(str(tmp_path / "drivers"))
+
+
+@pytest.fixture
+def driver_file(tmp_path):
+    path = tmp_path / "chromedriver"
+    path.write_bytes(b"driver 120")
+    return str(path)
+
+
+def test_added_driver_is_pinned_and_resolved_offline(cache, driver_file, monkeypatch):
+    cached = cache.add(driver_file, "120.0.6099.109")
+    assert cache.manifest()["drivers"]["120"]["version"] == "120.0.6099.109"
+    monkeypatch.setattr(DriverCache, "refresh", lambda self, chrome: pytest.fail("refresh needs the network"))
+    assert cache.resolve() == cached
+    assert DriverCache(cache.directory).resolve() == cached
+
+
+def test_modified_driver_is_refreshed(cache, driver_file, monkeypatch):
+    cached = cache.add(driver_file, "120.0.6099.109")
+    with open(cached, "ab") as f:
+        f.write(b"tampered")
+    refreshed = []
+    monkeypatch.setattr(DriverCache, "refresh", lambda self, chrome: refreshed.append(chrome) or "new")
+    assert cache.prewarm() == "new" and refreshed == ["120.0.6099.109"]
+    cache.invalidate()
+    with pytest.raises(DriverCacheError, match="Chrome 120"):
+        cache.prewarm(allow_refresh=False)
+
+
+def test_unknown_chrome_uses_the_newest_pinned_driver(cache, tmp_path, monkeypatch):
+    for version in ("119.0.6045.105", "120.0.6099.109"):
+        path = tmp_path / version
+        path.write_bytes(version.encode())
+        cache.add(str(path), version)
+    monkeypatch.setattr(driver_cache, "chrome_version", lambda: None)
+    assert "120.0.6099.109" in cache.prewarm()
+    assert major("120.0.6099.109") == "120" and major(None) is None
@@ -0,0 +1,45 @@
+import pytest
+from selenium.webdriver.chrome.options import Options
+from driver_profiles import DEFAULT_BLOCK_LIST, apply_profile, prepare_driver
+
+
+class Driver:
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+
+def test_standard_profile_changes_nothing():
+    options = apply_profile(Options())
+    assert options.arguments == [] and "prefs" not in options.experimental_options
+    driver = Driver()
+    assert prepare_driver(driver, "downloads") is driver and driver.commands == []
+
+
+def test_fast_profile_is_headless_without_images(tmp_path):
+    options = Options()
+    options.add_experimental_option("prefs", {"download.default_directory": str(tmp_path)})
+    apply_profile(options, "fast")
+    assert "--headless=new" in options.arguments
+    prefs = options.experimental_options["prefs"]
+    assert prefs["download.default_directory"] == str(tmp_path)
+    assert prefs["profile.managed_default_content_settings.images"] == 2
+    driver = Driver()
+    prepare_driver(driver, str(tmp_path), "fast")
+    commands = dict(driver.commands)
+    assert commands["Network.setBlockedURLs"]["urls"] == DEFAULT_BLOCK_LIST
+    assert commands["Browser.setDownloadBehavior"]["downloadPath"] == str(tmp_path)
+
+
+def test_block_list_spares_the_portals():
+    portal_urls = ["https://www.pge.com/en/myhome/myaccount", "https://myaccount.pge.com/myaccount/s/",
+                   "https://myenergycenter.com/portal/Usage/Export"]
+    blocked = [pattern.strip("*") for pattern in DEFAULT_BLOCK_LIST]
+    assert not [url for url in portal_urls for fragment in blocked if fragment in url]
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown driver profile"):
+        apply_profile(Options(), "turbo")
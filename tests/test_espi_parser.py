@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from espi_parser import IntervalSeries, iter_espi_batches, iter_espi_batches_slow, UOM_WH, UOM_THERM
+
+BASE = "https://example.com/espi/1_1/resource"
+
+READING = """<espi:IntervalReading><espi:timePeriod><espi:duration>3600</espi:duration>
+<espi:start>{start}</espi:start></espi:timePeriod><espi:value>{value}</espi:value></espi:IntervalReading>
+"""
+
+
+def reading_type(type_id, multiplier, uom):
+    return f"""<entry><link href="{BASE}/ReadingType/{type_id}" rel="self"/>
+<content><espi:ReadingType><espi:powerOfTenMultiplier>{multiplier}</espi:powerOfTenMultiplier><espi:uom>{uom}</espi:uom></espi:ReadingType></content></entry>
+"""
+
+
+def meter_reading(usage_point, type_id):
+    return f"""<entry><link href="{BASE}/Subscription/1/UsagePoint/{usage_point}/MeterReading/1" rel="self"/>
+<link href="{BASE}/ReadingType/{type_id}" rel="related"/>
+<content><espi:MeterReading/></content></entry>
+"""
+
+
+def interval_block(usage_point, readings):
+    body = "".join(READING.format(start=start, value=value) for start, value in readings)
+    return f"""<entry><link href="{BASE}/Subscription/1/UsagePoint/{usage_point}/MeterReading/1/IntervalBlock" rel="up"/>
+<content><espi:IntervalBlock>{body}</espi:IntervalBlock></content></entry>
+"""
+
+
+def write(path, *entries):
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:espi="http://naesb.org/espi">\n')
+        f.write("".join(entries))
+        f.write("</feed>\n")
+    return str(path)
+
+
+@pytest.fixture
+def electric_and_gas(tmp_path):
+    # The gas MeterReading and its ReadingType come after the electric blocks, as in combined exports.
+    return write(
+        tmp_path / "combined.xml",
+        reading_type(1, 0, UOM_WH),
+        meter_reading(1, 1),
+        interval_block(1, [(1000, 500), (4600, 700)]),
+        meter_reading(2, 2),
+        interval_block(2, [(1000, 1234)]),
+        reading_type(2, -3, UOM_THERM),
+    )
+
+
+@pytest.mark.parametrize("parse", [iter_espi_batches, iter_espi_batches_slow])
+def test_each_meter_gets_its_own_reading_type(electric_and_gas, parse):
+    batches = dict(parse(electric_and_gas))
+    assert batches["1_1"].uom == UOM_WH
+    assert batches["1_1"].value.tolist() == [500.0, 700.0]
+    assert batches["2_1"].uom == UOM_THERM
+    assert batches["2_1"].value == pytest.approx([1.234])
+
+
+def test_small_chunks_keep_reading_types(electric_and_gas):
+    batches = {}
+    for meter, series in iter_espi_batches(electric_and_gas, chunk_size=64):
+        batches.setdefault(meter, []).append(series)
+    assert {series.uom for series in batches["2_1"]} == {UOM_THERM}
+    assert np.concatenate([series.value for series in batches["2_1"]]) == pytest.approx([1.234])
+
+
+QUALITY = "<espi:ReadingQuality><espi:quality>8</espi:quality></espi:ReadingQuality></espi:IntervalReading>"
+
+
+@pytest.mark.parametrize("chunk_size", [300, 4096, 1 << 20])
+def test_fast_and_slow_paths_agree(tmp_path, chunk_size):
+    blocks = [interval_block(meter, [(3600 * i, i * 37 % 2000) for i in range(day * 24, day * 24 + 24)])
+              for meter in (1, 2) for day in range(5)]
+    # Quality elements in one block make the fast path fall back to the exact parser for that meter.
+    blocks[2] = blocks[2].replace("</espi:IntervalReading>", QUALITY, 3)
+    path = write(tmp_path / "feed.xml", reading_type(1, -1, UOM_WH), *blocks)
+    fast, slow = {}, {}
+    for meter, series in iter_espi_batches(path, chunk_size):
+        fast.setdefault(meter, []).append(series)
+    fast = {meter: IntervalSeries.concatenate(meter, parts, UOM_WH) for meter, parts in fast.items()}
+    for meter, series in iter_espi_batches_slow(path):
+        slow.setdefault(meter, []).append(series)
+    assert sorted(fast) == sorted(slow) == ["1_1", "2_1"]
+    for meter, parts in slow.items():
+        assert fast[meter].start.tolist() == [t for part in parts for t in part.start.tolist()]
+        assert fast[meter].value == pytest.approx([v for part in parts for v in part.value.tolist()])
+        assert fast[meter].quality.tolist() == [q for part in parts for q in part.quality.tolist()]
+        assert fast[meter].uom == UOM_WH
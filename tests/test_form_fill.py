@@ -0,0 +1,48 @@
+import pytest
+from form_fill import FILL_SCRIPT, fill_form
+
+
+class Element:
+    def __init__(self):
+        self.keys = []
+
+    def clear(self):
+        self.keys.clear()
+
+    def send_keys(self, value):
+        self.keys.append(value)
+
+
+class Driver:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append((script, args))
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_one_script_call_and_only_rejected_fields_are_typed():
+    user, password, date = Element(), Element(), Element()
+    driver = Driver([1])
+    typed = fill_form(driver, [(user, "me"), (None, "skipped"), (password, "secret"), (date, "01/02/2024")])
+    assert typed == [password]
+    assert password.keys == ["secret"] and user.keys == [] and date.keys == []
+    assert driver.calls == [(FILL_SCRIPT, ([[user, "me"], [password, "secret"], [date, "01/02/2024"]], False, False))]
+
+
+def test_script_failure_types_every_field_with_enter():
+    first, second = Element(), Element()
+    typed = fill_form(Driver(RuntimeError("no script")), [(first, "a"), (second, "b")], press_enter=True)
+    assert typed == [first, second]
+    assert first.keys[0] == "a" and len(first.keys) == 2 and second.keys[0] == "b"
+
+
+@pytest.mark.parametrize("fields", [[], [(None, "x")]])
+def test_nothing_to_fill_skips_the_driver(fields):
+    driver = Driver([])
+    assert fill_form(driver, fields) == []
+    assert driver.calls == []
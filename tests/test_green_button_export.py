@@ -0,0 +1,69 @@
+import os
+from datetime import date
+import pytest
+import requests
+from benchmarks.mock_portal import MockPortal
+from benchmarks.scraper_bench import local_endpoint
+from green_button_export import (GreenButtonExporter, ExportError, PGE_ENDPOINT, MYENERGYCENTER_ENDPOINT,
+                                 reserve_path)
+
+START, END = date(2024, 1, 1), date(2024, 1, 3)
+
+
+@pytest.fixture
+def portal():
+    with MockPortal(accounts=2) as portal:
+        yield portal
+
+
+def signed_in(portal, login_path):
+    session = requests.Session()
+    response = session.post(portal.base_url + login_path, data={"username": "demo", "password": "demo"})
+    assert response.status_code == 200
+    return session
+
+
+def test_build_request_formats_dates_and_drops_empty_params():
+    exporter = GreenButtonExporter(MYENERGYCENTER_ENDPOINT, session=object())
+    method, url, params = exporter.build_request(START, "2024-01-03")
+    assert (method, url) == ("POST", MYENERGYCENTER_ENDPOINT["url"])
+    assert params == {"fromDate": "January 01, 2024", "toDate": "January 03, 2024"}
+
+
+def test_pge_export_against_the_stand_in_portal(portal, tmp_path):
+    exporter = GreenButtonExporter(local_endpoint(PGE_ENDPOINT, portal.base_url),
+                                   session=signed_in(portal, "/en/login"))
+    path = exporter.export(START, END, str(tmp_path))
+    assert os.path.basename(path) == "GreenButton_1001_20240101_20240103.xml"
+    with open(path, "rb") as f:
+        assert b"IntervalReading" in f.read()
+    assert portal.hits["/myaccount/usage/greenbutton/export"] == 1
+
+
+def test_repeated_exports_never_overwrite_each_other(portal, tmp_path):
+    exporter = GreenButtonExporter(local_endpoint(MYENERGYCENTER_ENDPOINT, portal.base_url),
+                                   session=signed_in(portal, "/portal/PreLogin/Validate"))
+    first = exporter.export(START, END, str(tmp_path), account="1002")
+    second = exporter.export(START, END, str(tmp_path), account="1002")
+    assert first != second
+    assert sorted(os.listdir(tmp_path)) == ["GreenButton_1002_20240101_20240103.xml",
+                                            "GreenButton_1002_20240101_20240103_1.xml"]
+
+
+def test_server_file_name_gets_the_account_prefix():
+    class Response:
+        headers = {"Content-Disposition": 'attachment; filename="usage.xml"'}
+    assert GreenButtonExporter.filename_for(Response, START, END, "1002") == "1002_usage.xml"
+    assert GreenButtonExporter.filename_for(Response, START, END) == "usage.xml"
+
+
+def test_signed_out_export_raises(portal, tmp_path):
+    exporter = GreenButtonExporter(local_endpoint(PGE_ENDPOINT, portal.base_url))
+    with pytest.raises(ExportError):
+        exporter.export(START, END, str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_reserve_path_numbers_taken_names(tmp_path):
+    path = str(tmp_path / "usage.xml")
+    assert [os.path.basename(reserve_path(path)) for _ in range(3)] == ["usage.xml", "usage_1.xml", "usage_2.xml"]
@@ -0,0 +1,55 @@
+import os
+from datetime import date
+import numpy as np
+import pytest
+from espi_parser import IntervalSeries
+from interval_store import IntervalStore
+from benchmarks.mock_portal import espi_feed
+
+
+def series(starts, values, meter="1001_1"):
+    count = len(starts)
+    return IntervalSeries(meter, np.array(starts, dtype=np.int64), np.full(count, 900, dtype=np.int32),
+                          np.array(values, dtype=np.float64), np.zeros(count, dtype=np.int16), 72)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return IntervalStore(str(tmp_path / "store"))
+
+
+def test_appends_keep_the_generation(store):
+    assert store.append(series([0, 900], [1, 2])) == 2
+    assert store.append(series([900, 1800], [2, 3])) == 1
+    assert store.meta("1001_1")["generation"] == 0
+    stored = store.read("1001_1")
+    assert stored.start.tolist() == [0, 900, 1800] and stored.value.tolist() == [1, 2, 3]
+    assert store.read("1001_1", 900, 1800).start.tolist() == [900]
+
+
+def test_revision_writes_the_next_generation_and_drops_the_old_one(store):
+    store.append(series([0, 900, 1800], [1, 2, 3]))
+    before = store.read("1001_1")
+    assert store.append(series([900], [20])) == 1
+    meta = store.meta("1001_1")
+    assert meta["generation"] == 1 and meta["count"] == 3
+    assert store.read("1001_1").value.tolist() == [1, 20, 3]
+    assert before.value.tolist() == [1, 2, 3]
+    assert sorted(os.listdir(store.meter_dir("1001_1"))) == \
+        sorted(["meta.json"] + [f"{name}.1" for name in ("start", "duration", "value", "quality")])
+
+
+def test_unchanged_backfill_is_not_rewritten(store):
+    store.append(series([0, 900], [1, 2]))
+    assert store.append(series([0], [1])) == 0
+    assert store.meta("1001_1")["generation"] == 0
+
+
+def test_manifest_skips_files_already_ingested(store, tmp_path):
+    path = tmp_path / "GreenButton.xml"
+    path.write_bytes(espi_feed("1001", date(2024, 1, 1), date(2024, 1, 1)))
+    assert store.ingest_files([str(path)]) == {"1001_1": 96}
+    assert store.ingest_files([str(path)]) == {}
+    assert IntervalStore(store.root).manifest == {str(path): [os.path.getsize(path), os.path.getmtime(path)]}
+    os.utime(path, (1, 1))
+    assert store.ingest_files([str(path)]) == {"1001_1": 0}
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import lazy_import
+from lazy_import import LazyImport, lazy, preload
+
+REPO = os.path.dirname(os.path.abspath(lazy_import.__file__))
+
+
+def test_modules_load_on_first_use():
+    code = ("import sys, lazy_import; json = lazy_import.lazy('json'); dumps = lazy_import.lazy('json', 'dumps');"
+            "assert 'json' not in sys.modules; assert dumps([1]) == '[1]' and json.loads('2') == 2;"
+            "assert 'loaded' in repr(dumps)")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=REPO)
+
+
+def test_registration_and_preload(monkeypatch):
+    monkeypatch.setattr(lazy_import, "REGISTERED", [])
+    lazy("colorsys")
+    lazy("colorsys", "rgb_to_hsv")
+    assert lazy_import.REGISTERED == ["colorsys"]
+    seconds = []
+    preload(["colorsys", "no_such_module_here"], on_done=seconds.append).join()
+    assert len(seconds) == 1 and seconds[0] >= 0
+    assert isinstance(lazy("colorsys"), LazyImport)
+
+
+def test_gui_modules_do_not_import_selenium_at_start():
+    code = ("import sys, importlib; importlib.import_module('youpower_pge');"
+            "print(sorted(m for m in ('selenium', 'numpy', 'requests', 'webdriver_manager') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=REPO)
+    assert result.stdout.strip() == "[]", result.stderr
@@ -0,0 +1,45 @@
+from datetime import date
+import pytest
+import requests
+from benchmarks.mock_portal import MockPortal, parse_date
+from espi_parser import iter_espi_batches
+
+
+@pytest.fixture
+def portal():
+    with MockPortal(accounts=2) as portal:
+        yield portal
+
+
+def test_pages_need_a_session(portal):
+    response = requests.get(portal.base_url + "/portal/Usage/Index", allow_redirects=False)
+    assert response.status_code == 302 and response.headers["Location"] == "/portal/PreLogin/Validate"
+    bad = requests.post(portal.base_url + "/portal/PreLogin/Validate", data={"username": "demo", "password": "no"})
+    assert "Invalid username or password" in bad.text
+
+
+def test_account_switch_and_export(portal, tmp_path):
+    session = requests.Session()
+    session.post(portal.base_url + "/portal/PreLogin/Validate", data={"username": "demo", "password": "demo"})
+    assert 'value="1001" selected' in session.get(portal.base_url + "/portal/Dashboard/index").text
+    session.get(portal.base_url + "/portal/Dashboard/index", params={"account": "1002"})
+    response = session.get(portal.base_url + "/portal/Usage/GreenButtonDownload",
+                           params={"fromDate": "January 01, 2024", "toDate": "January 02, 2024"})
+    assert 'filename="GreenButton_1002_20240101_20240102.xml"' in response.headers["Content-Disposition"]
+    path = tmp_path / "feed.xml"
+    path.write_bytes(response.content)
+    readings = sum(len(batch[1]) for batch in iter_espi_batches(str(path)))
+    assert readings == 2 * 96
+    assert portal.hits["/portal/Usage/GreenButtonDownload"] == 1
+
+
+def test_parse_date_formats():
+    default = date(2000, 1, 1)
+    assert parse_date("2024-03-05", default) == parse_date("March 05, 2024", default) == date(2024, 3, 5)
+    assert parse_date("05 March, 2024", default) == date(2024, 3, 5)
+    assert parse_date("03/05/2024", default) == parse_date(None, default) == default
+
+
+def test_unknown_variant():
+    with pytest.raises(ValueError, match="Unknown variant"):
+        MockPortal(variant="retro")
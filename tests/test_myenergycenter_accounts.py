@@ -0,0 +1,132 @@
+import threading
+from contextlib import contextmanager
+from myenergycenter_scraper import ACCOUNT_LIST_SCRIPT, POST_ACCOUNT_SCRIPT, SELECT_ACCOUNT_SCRIPT, MyEnergyCenterJob
+
+ACCOUNTS = [{"index": i, "id": f"10{i}", "label": f"Account {i}"} for i in range(7)]
+
+
+class Tracer:
+    @contextmanager
+    def span(self, name, **fields):
+        yield dict(fields)
+
+
+class Readiness:
+    def wait_for_page(self, step):
+        return True
+
+    def report(self):
+        pass
+
+
+class Driver:
+    def __init__(self, name, switch_ok=True):
+        self.name = name
+        self.switch_ok = switch_ok
+        self.visited = []
+        self.scripts = []
+        self.posted = []
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def find_elements(self, by, value):
+        return []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        if script == SELECT_ACCOUNT_SCRIPT:
+            return "current"
+        return [dict(account) for account in ACCOUNTS]
+
+    def execute_async_script(self, script, *args):
+        assert script == POST_ACCOUNT_SCRIPT
+        self.posted.append(args)
+        return self.switch_ok
+
+
+class StubJob(MyEnergyCenterJob):
+    """A job whose browser work is replaced by recording which driver handled each account."""
+
+    def __init__(self, concurrency=1, fail_sessions=0, **kwargs):
+        super().__init__("https://mec/login", "user", "pw", "2024-01-01", "2024-01-31", "/tmp",
+                         concurrency=concurrency, tracer=Tracer(), **kwargs)
+        self.readiness = Readiness()
+        self.handled = {}
+        self.fail_sessions = fail_sessions
+        self.sessions = 0
+        self.lock = threading.Lock()
+
+    def wait_for_element(self, driver, locator, step, clickable=False, timeout=10):
+        return object()
+
+    def download_file(self, driver, start_date, end_date, total_steps, account_id=""):
+        with self.lock:
+            self.handled[account_id] = driver.name
+        self.advance(total_steps, 2)
+        return f"{account_id}.xml"
+
+    def open_session(self):
+        with self.lock:
+            self.sessions += 1
+            number = self.sessions
+        if number <= self.fail_sessions:
+            raise Exception("Login failed for additional browser session")
+        session = StubJob(account_switch_url="https://mec/switch/{account}")
+        session.handled, session.lock = self.handled, self.lock
+        session.advance, session.account_results = self.advance, self.account_results
+        session.driver = Driver(f"session {number}")
+        session.close_driver = lambda: None
+        return session
+
+
+def test_accounts_are_read_once_and_switched_by_id():
+    job = StubJob(account_switch_url="https://mec/switch/{account}")
+    driver = Driver("main")
+    progress = []
+    job.progress.connect(progress.append)
+    job.interact_with_dropdown(driver, "2024-01-01", "2024-01-31")
+    assert driver.scripts == [ACCOUNT_LIST_SCRIPT]
+    assert driver.visited == [f"https://mec/switch/10{i}" for i in range(7)]
+    assert job.summarize_accounts()[0] and progress[-1] == 100
+
+
+def test_accounts_are_switched_by_posting_from_the_current_page():
+    job = StubJob()
+    driver = Driver("main")
+    job.interact_with_dropdown(driver, "2024-01-01", "2024-01-31")
+    assert driver.posted == [("https://myenergycenter.com/portal/Dashboard/index", f"10{i}") for i in range(7)]
+    assert driver.visited == []
+
+
+def test_refused_switch_falls_back_to_the_dashboard():
+    job = StubJob()
+    driver = Driver("main", switch_ok=False)
+    job.switch_account(driver, ACCOUNTS[2])
+    assert driver.posted == [("https://myenergycenter.com/portal/Dashboard/index", "102")]
+    assert driver.visited == ["https://myenergycenter.com/portal/Dashboard/index"]
+    assert driver.scripts == [SELECT_ACCOUNT_SCRIPT]
+
+
+def test_fan_out_splits_accounts_and_takes_over_a_failed_session():
+    job = StubJob(concurrency=3, fail_sessions=1, account_switch_url="https://mec/switch/{account}")
+    job.interact_with_dropdown(Driver("main"), "2024-01-01", "2024-01-31")
+    assert sorted(job.handled) == [account["id"] for account in ACCOUNTS]
+    # The first group stays on the main driver, one group gets its own session
+    # and the group whose session failed to start falls back to the main driver.
+    main = sorted(account for account, driver in job.handled.items() if driver == "main")
+    other = [account for account, driver in job.handled.items() if driver != "main"]
+    assert len(main) == 5 and len(other) == 2 and {"100", "103", "106"} <= set(main)
+    success, message = job.summarize_accounts()
+    assert success and "7 accounts" in message
+
+
+def test_telemetry_failure_still_finishes(monkeypatch):
+    import myenergycenter_scraper
+
+    def unwritable(portal):
+        raise PermissionError("~/.youpower is read-only")
+
+    monkeypatch.setattr(myenergycenter_scraper, "Tracer", unwritable)
+    job = MyEnergyCenterJob("https://mec/login", "user", "pw", "2024-01-01", "2024-01-31", "/tmp")
+    assert job.execute() == (False, "An error occurred: ~/.youpower is read-only")
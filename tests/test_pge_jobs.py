@@ -0,0 +1,101 @@
+import json
+from datetime import date
+from deep_links import DeepLinkMemory
+from pge_mobile_scraper import PGEMobileJob
+from pge_scraper import PGEBaseJob, PGEJob
+from selector_memory import SelectorMemory
+from session_cache import SessionCache
+from telemetry import Tracer
+
+
+class Driver:
+    def __init__(self):
+        self.quit_called = False
+
+    def execute_cdp_cmd(self, command, params):
+        return {"cookies": []}
+
+    def quit(self):
+        self.quit_called = True
+
+
+def stub(job_class):
+    """Return a job class whose browser steps are replaced, keeping the shared run()."""
+
+    class Stub(job_class):
+        def configure_driver(self):
+            return Driver()
+
+        def login_to_pge(self, driver):
+            self.update_progress()
+            return True
+
+        def download_green_button_data(self, driver):
+            self.downloaded_files.append("GreenButton.xml")
+            return True
+
+    return Stub
+
+
+def run(job_class, tmp_path, **kwargs):
+    job = stub(job_class)("alice", "pw", date(2024, 1, 1), date(2024, 1, 31), str(tmp_path),
+                          session_cache=SessionCache(str(tmp_path / "sessions")),
+                          deep_links=DeepLinkMemory(str(tmp_path / "deep_links.json")),
+                          tracer=Tracer(job_class.portal, str(tmp_path / "telemetry")), **kwargs)
+    result = job.execute()
+    return job, result
+
+
+def test_both_sites_share_one_run():
+    for name in ("run", "export_green_button_data", "apply_sync_window", "record_sync", "ingest_downloads",
+                 "configure_driver", "build_driver", "open_shortcut"):
+        assert name not in PGEJob.__dict__ and name not in PGEMobileJob.__dict__
+
+
+def test_desktop_run(tmp_path):
+    job, result = run(PGEJob, tmp_path)
+    assert result == (True, "Successfully downloaded PG&E Green Button data!")
+    assert job.driver.quit_called and job.downloaded_files == ["GreenButton.xml"]
+    assert SessionCache(str(tmp_path / "sessions")).load("pge", "alice", "pw") == []
+
+
+def test_mobile_run_uses_its_own_portal_key(tmp_path):
+    memory = SelectorMemory(str(tmp_path / "selectors.json"))
+    job, result = run(PGEMobileJob, tmp_path, selector_memory=memory)
+    assert result[0] and job.resolver.portal == "pge-mobile"
+    assert (tmp_path / "selectors.json").exists()
+    spans = [json.loads(line) for line in open(tmp_path / "telemetry" / "spans.jsonl")]
+    assert {span["portal"] for span in spans} == {"pge-mobile"}
+    # Sessions are shared with the desktop job.
+    assert SessionCache(str(tmp_path / "sessions")).load("pge", "alice", "pw") == []
+
+
+def test_mobile_chrome_arguments():
+    assert "--no-sandbox" in PGEMobileJob.chrome_arguments("fast")
+    assert "--enable-logging" in PGEMobileJob.chrome_arguments("standard")
+    assert PGEJob.chrome_arguments("standard") == [] and issubclass(PGEMobileJob, PGEBaseJob)
+
+
+def test_telemetry_failure_still_finishes(tmp_path, monkeypatch):
+    import pge_scraper
+
+    def unwritable(portal):
+        raise PermissionError("~/.youpower is read-only")
+
+    monkeypatch.setattr(pge_scraper, "Tracer", unwritable)
+    job = stub(PGEJob)("alice", "pw", date(2024, 1, 1), date(2024, 1, 31), str(tmp_path))
+    assert job.execute() == (False, "An error occurred: ~/.youpower is read-only")
+
+
+def test_standard_driver_downloads_to_the_absolute_path(tmp_path, monkeypatch):
+    import myenergycenter_scraper
+    import pge_scraper
+
+    launched = []
+    for module in (pge_scraper, myenergycenter_scraper):
+        monkeypatch.setattr(module, "launch_chrome", lambda options, backend: launched.append(options) or Driver())
+    monkeypatch.chdir(tmp_path)
+    for job_class in (PGEJob, PGEMobileJob, myenergycenter_scraper.MyEnergyCenterJob):
+        job_class.build_driver("downloads/pge")
+    assert [options.experimental_options["prefs"]["download.default_directory"] for options in launched] \
+        == [str(tmp_path / "downloads" / "pge")] * 3
@@ -0,0 +1,62 @@
+from readiness import NETWORK_PROBE_SCRIPT, PageReadiness
+
+
+class Driver:
+    """Replays one network probe result per poll, repeating the last one."""
+
+    def __init__(self, probes=(), ready="complete"):
+        self.probes = list(probes)
+        self.ready = ready
+        self.current_url = "https://portal/login"
+
+    def execute_script(self, script):
+        if script == NETWORK_PROBE_SCRIPT:
+            return self.probes.pop(0) if len(self.probes) > 1 else self.probes[0]
+        return self.ready
+
+
+def readiness(driver, **timeouts):
+    return PageReadiness(driver, timeouts=timeouts, poll_frequency=0.01)
+
+
+def test_network_idle_waits_for_requests_and_new_resources_to_stop():
+    driver = Driver([[0, 1, "loading"], [2, 3, "complete"], [0, 5, "complete"], [0, 5, "complete"]])
+    waits = readiness(driver)
+    assert waits.wait_for_network_idle(idle_time=0.05)
+    assert driver.probes == [[0, 5, "complete"]]
+    (step, elapsed, ok), = waits.timings
+    assert step == "network_idle" and ok and elapsed >= 0.05
+
+
+def test_timeouts_fall_back_to_the_wait_kind():
+    waits = readiness(Driver(ready="loading"), page_load=0.05, login_page=0.02)
+    assert waits.timeout_for("login_page", "page_load") == 0.02
+    assert waits.timeout_for("account_page", "page_load") == 0.05
+    assert waits.wait_for_page("login_page") is False
+    assert waits.timings[0][0] == "login_page" and not waits.timings[0][2]
+
+
+def test_url_change_and_summary():
+    driver = Driver()
+    waits = readiness(driver, url_change=0.05)
+    assert not waits.wait_for_url_change("https://portal/login")
+    driver.current_url = "https://portal/home"
+    assert waits.wait_for_url_change("https://portal/login")
+    waits.record("url_change", 1.0)
+    assert waits.summary()["url_change"] >= 1.05
+
+
+def test_element_must_stop_moving():
+    class Element:
+        rects = [{"x": 0}, {"x": 5}, {"x": 9}, {"x": 9}, {"x": 9}]
+
+        def is_displayed(self):
+            return True
+
+        @property
+        def rect(self):
+            return self.rects.pop(0) if len(self.rects) > 1 else self.rects[0]
+
+    element = Element()
+    assert readiness(Driver()).wait_for_element_stable(element) is element
+    assert Element.rects == [{"x": 9}]
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+import pytest
+from espi_parser import IntervalSeries, LOCAL_TIMEZONE, UOM_WH
+from rollups import MeterBatch, PGE_TOU_SCHEDULES, pge_holidays
+
+ZONE = ZoneInfo(LOCAL_TIMEZONE)
+# 2024-03-08 08:00 UTC (local midnight) to 2024-03-12: the spring DST change is on 2024-03-10.
+FIRST = 1709884800
+
+
+def hourly(meter, hours, seed):
+    starts = FIRST + 3600 * np.arange(hours, dtype=np.int64)
+    values = np.random.default_rng(seed).integers(100, 5000, hours).astype(np.float64)
+    return IntervalSeries(meter, starts, np.full(hours, 3600, dtype=np.int32), values,
+                          np.zeros(hours, dtype=np.int16), UOM_WH)
+
+
+@pytest.fixture
+def batch():
+    return MeterBatch([hourly("a", 96, 1), hourly("b", 60, 2)])
+
+
+def local(start):
+    return datetime.fromtimestamp(int(start), ZONE)
+
+
+def test_daily_totals_follow_local_dates_across_dst(batch):
+    rollup = batch.totals("day")
+    for row, series in enumerate([hourly("a", 96, 1), hourly("b", 60, 2)]):
+        expected = {}
+        for start, value in zip(series.start, series.value):
+            day = np.datetime64(local(start).date())
+            expected[day] = expected.get(day, 0.0) + value / 1000
+        totals = {label: value for label, value in zip(rollup.labels, rollup.values[row]) if not np.isnan(value)}
+        assert totals == pytest.approx(expected)
+    # The DST day has 23 hours.
+    assert batch.day_counts("day")[0].tolist() == [1, 1, 1, 1, 1]
+    assert np.bincount(batch.buckets("day")[0][batch.meter_index == 0]).tolist() == [24, 24, 23, 24, 1]
+
+
+def test_missing_cells_are_nan(batch):
+    values = batch.totals("day").values
+    assert np.isnan(values[1, -1]) and not np.isnan(values[0, -1])
+
+
+def test_peak_demand_and_its_time(batch):
+    peaks = batch.peak_demand("month")
+    series = hourly("b", 60, 2)
+    assert peaks.values[1, 0] == pytest.approx(series.value.max() / 1000)
+    assert peaks.times[1, 0] == series.start[np.argmax(series.value)]
+
+
+def test_tou_totals_match_a_loop(batch):
+    periods = batch.tou_totals("E-TOU-C", "month")
+    series = hourly("a", 96, 1)
+    peak = sum(value / 1000 for start, value in zip(series.start, series.value) if 16 <= local(start).hour < 21)
+    assert periods["peak"].values[0, 0] == pytest.approx(peak)
+    assert periods["peak"].values[0, 0] + periods["off_peak"].values[0, 0] == pytest.approx(series.value.sum() / 1000)
+    assert set(periods) == {"off_peak", *PGE_TOU_SCHEDULES["E-TOU-C"]}
+
+
+def test_holidays_move_off_weekends():
+    holidays = pge_holidays([2022])
+    assert date(2021, 12, 31) in holidays  # New Year's Day 2022 was a Saturday
+    assert date(2022, 12, 26) in holidays  # Christmas 2022 was a Sunday
+    assert date(2022, 11, 24) in holidays  # Thanksgiving
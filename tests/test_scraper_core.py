@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import pytest
+from scraper_core import Cancelled, ScraperJob, run_all
+
+
+class StepJob(ScraperJob):
+    """Runs steps until cancelled, handling step failures like the scrapers do."""
+
+    def __init__(self, steps=3, started=None, release=None):
+        super().__init__()
+        self.steps = steps
+        self.started = started
+        self.release = release
+        self.done = []
+
+    def run(self):
+        try:
+            for step in range(self.steps):
+                self.check_cancelled()
+                if self.started is not None and step == 1:
+                    self.started.set()
+                    self.release.wait(5)
+                try:
+                    if step == 0:
+                        raise ValueError("a failed step")
+                except Exception:
+                    pass
+                self.done.append(step)
+                self.progress.emit(100 * (step + 1) // self.steps)
+            self.finished.emit(True, "Done.")
+        except Cancelled:
+            self.finished.emit(False, "Cancelled.")
+
+
+def test_cancelled_is_not_swallowed_by_step_handlers():
+    assert not issubclass(Cancelled, Exception)
+    job = StepJob()
+    job.cancel()
+    assert job.execute() == (False, "Cancelled.")
+    assert job.done == []
+
+
+def test_execute_reports_a_job_that_never_finished():
+    class Silent(ScraperJob):
+        def run(self):
+            pass
+
+    assert Silent().execute() == (False, "The scraper did not finish")
+
+
+def test_run_all_returns_results_in_order_with_progress():
+    seen = []
+    jobs = [StepJob(steps) for steps in (1, 2, 4)]
+    results = asyncio.run(run_all(jobs, concurrency=2, on_progress=lambda job, value: seen.append((job.steps, value))))
+    assert results == [(True, "Done.")] * 3
+    assert sorted(value for steps, value in seen if steps == 4) == [25, 50, 75, 100]
+
+
+def test_cancelling_the_task_cancels_the_job():
+    started, release = threading.Event(), threading.Event()
+    job = StepJob(started=started, release=release)
+
+    async def main():
+        task = asyncio.ensure_future(job.run_async())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert job.result == (False, "Cancelled.")
+    # The step in progress completes; the job stops at the next checkpoint.
+    assert job.done == [0, 1]
@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+import pytest
+import selector_memory
+from selector_memory import SelectorMemory
+
+OLD = ("id", "download")
+NEW = ("css selector", "button.download")
+OTHER = ("xpath", "//button")
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return SelectorMemory(str(tmp_path / "selector_memory.json"), half_life=100)
+
+
+def at(monkeypatch, now):
+    monkeypatch.setattr(selector_memory, "time", SimpleNamespace(time=lambda: now))
+
+
+def test_unknown_selectors_keep_the_static_order(memory):
+    assert memory.score("pge", "download", OLD) == 0.5
+    assert memory.order("pge", "download", [OLD, NEW, OTHER]) == [OLD, NEW, OTHER]
+
+
+def test_winner_moves_ahead_and_earlier_candidates_get_a_miss(memory, monkeypatch):
+    at(monkeypatch, 1000)
+    memory.record("pge", "download", [OLD, NEW, OTHER], NEW, 0.2)
+    entries = memory.data["pge"]["download"]
+    assert (entries["id=download"]["misses"], entries["css selector=button.download"]["hits"]) == (1.0, 1.0)
+    assert "xpath=//button" not in entries
+    assert memory.order("pge", "download", [OLD, NEW, OTHER]) == [NEW, OTHER, OLD]
+
+
+def test_counts_halve_every_half_life(memory, monkeypatch):
+    at(monkeypatch, 1000)
+    for _ in range(4):
+        memory.record("pge", "download", [OLD], OLD, 0.1)
+    assert memory.score("pge", "download", OLD, now=1000) == pytest.approx(5 / 6)
+    assert memory.score("pge", "download", OLD, now=1100) == pytest.approx(3 / 4)
+    at(monkeypatch, 1200)
+    memory.record("pge", "download", [OLD], OLD, 0.1)
+    assert memory.data["pge"]["download"]["id=download"]["hits"] == pytest.approx(2.0)
+
+
+def test_redesign_overtakes_an_old_winner_after_a_few_runs(memory, monkeypatch):
+    at(monkeypatch, 0)
+    for _ in range(20):
+        memory.record("pge", "download", [OLD], OLD, 0.1)
+    # Weeks later the old selector stops matching.
+    runs = 0
+    for now in range(1000, 1010):
+        at(monkeypatch, now)
+        memory.record("pge", "download", [OLD, NEW], NEW, 0.1)
+        runs += 1
+        if memory.order("pge", "download", [OLD, NEW])[0] == NEW:
+            break
+    assert runs <= 2
+
+
+def test_save_and_load_round_trip(memory, monkeypatch):
+    at(monkeypatch, 1000)
+    memory.record("mec", "account_list", [OLD], OLD, 0.3)
+    memory.save()
+    assert SelectorMemory(memory.path).data == memory.data
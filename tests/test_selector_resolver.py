@@ -0,0 +1,74 @@
+import time
+from selenium.common.exceptions import JavascriptException
+from selector_memory import SelectorMemory
+from selector_resolver import RESOLVE_SCRIPT, SelectorResolver
+
+USERNAME = [("id", "username"), ("name", "user"), ("css selector", "input[type=email]")]
+
+
+class Driver:
+    """Answers each resolve pass with the next scripted (element, index, ready) result."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def execute_script(self, script, candidates, clickable):
+        assert script == RESOLVE_SCRIPT
+        self.calls.append(candidates)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+NOTHING = [None, -1, False]
+
+
+def test_one_call_per_poll_returns_the_first_candidate_at_once():
+    driver = Driver(NOTHING, JavascriptException("navigating"), ["element", 0, False])
+    element, locator = SelectorResolver(driver, poll_frequency=0.01).resolve(USERNAME, clickable=True)
+    assert (element, locator) == ("element", ("id", "username"))
+    assert driver.calls == [[list(c) for c in USERNAME]] * 3
+
+
+def test_fallback_waits_for_the_grace_period_and_a_loaded_page():
+    driver = Driver(["generic", 2, False], ["generic", 2, True])
+    resolver = SelectorResolver(driver, poll_frequency=0.01, fallback_grace=0.1)
+    assert resolver.resolve(USERNAME) == ("generic", USERNAME[2])
+    assert resolver.last_elapsed >= 0.1
+
+
+def test_specific_candidate_appearing_within_the_grace_period_wins():
+    driver = Driver(["generic", 2, True], ["generic", 2, True], ["specific", 0, True])
+    resolver = SelectorResolver(driver, poll_frequency=0.01, fallback_grace=1)
+    assert resolver.resolve(USERNAME) == ("specific", USERNAME[0])
+
+
+def test_timeout_returns_nothing():
+    resolver = SelectorResolver(Driver(NOTHING), timeout=0.05, poll_frequency=0.01)
+    assert resolver.resolve(USERNAME) == (None, None)
+    assert resolver.last_elapsed >= 0.05
+
+
+def test_memory_puts_the_last_winner_first(tmp_path):
+    memory = SelectorMemory(str(tmp_path / "memory.json"))
+    driver = Driver(["element", 2, True])
+    resolver = SelectorResolver(driver, memory=memory, portal="pge", poll_frequency=0.01, fallback_grace=0.05)
+    assert resolver.resolve(USERNAME, step="username")[1] == USERNAME[2]
+    driver.results = [["element", 0, True]]
+    assert resolver.resolve(USERNAME, step="username")[1] == USERNAME[2]
+    assert driver.calls[-1][0] == list(USERNAME[2])
+
+
+def test_learned_winner_skips_the_grace_period_once_the_page_loaded(tmp_path):
+    memory = SelectorMemory(str(tmp_path / "memory.json"))
+    for _ in range(3):
+        memory.record("pge", "username", USERNAME, USERNAME[2], 0.1)
+    assert memory.order("pge", "username", USERNAME)[0] == USERNAME[2]
+    resolver = SelectorResolver(Driver(["element", 0, False], ["element", 0, True]), memory=memory, portal="pge",
+                                poll_frequency=0.01, fallback_grace=5)
+    started = time.monotonic()
+    assert resolver.resolve(USERNAME, step="username") == ("element", USERNAME[2])
+    assert time.monotonic() - started < 1
+    assert len(resolver.driver.calls) == 2
@@ -0,0 +1,54 @@
+import os
+from types import SimpleNamespace
+import pytest
+import session_cache
+from session_cache import SessionCache, restore_session
+
+COOKIES = [{"name": "sid", "value": "abc", "domain": ".pge.com", "path": "/"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SessionCache(str(tmp_path), max_age=60)
+
+
+def test_round_trip_needs_the_right_password(cache):
+    cache.save("pge", "alice", "secret", COOKIES)
+    assert cache.load("pge", "alice", "secret") == COOKIES
+    assert cache.load("pge", "alice", "wrong") is None
+    assert cache.load("pge", "bob", "secret") is None
+    with open(cache.path_for("pge", "alice"), "rb") as f:
+        assert b"sid" not in f.read()
+    if os.name == "posix":
+        assert os.stat(cache.path_for("pge", "alice")).st_mode & 0o077 == 0
+
+
+def test_expired_sessions_are_removed(cache, monkeypatch):
+    cache.save("pge", "alice", "secret", COOKIES)
+    monkeypatch.setattr(session_cache, "time", SimpleNamespace(time=lambda: 1e12))
+    assert cache.load("pge", "alice", "secret") is None
+    assert not os.path.exists(cache.path_for("pge", "alice"))
+
+
+class Driver:
+    def __init__(self):
+        self.commands = []
+        self.visited = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append(command)
+        return {"cookies": COOKIES}
+
+    def get(self, url):
+        self.visited.append(url)
+
+
+def test_restore_checks_the_session_and_forgets_a_dead_one(cache):
+    driver = Driver()
+    assert not restore_session(driver, cache, "pge", "alice", "secret", "https://pge/check", lambda d: True)
+    assert driver.commands == [] and driver.visited == []
+    cache.save("pge", "alice", "secret", COOKIES)
+    assert restore_session(driver, cache, "pge", "alice", "secret", "https://pge/check", lambda d: True)
+    assert driver.visited == ["https://pge/check"]
+    assert not restore_session(Driver(), cache, "pge", "alice", "secret", "https://pge/check", lambda d: False)
+    assert cache.load("pge", "alice", "secret") is None
@@ -0,0 +1,47 @@
+from datetime import date, datetime, timezone
+import pytest
+from sync_state import SyncState
+from benchmarks.mock_portal import espi_feed
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = SyncState(str(tmp_path / "sync_state.db"))
+    yield state
+    state.close()
+
+
+def midnight(day):
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def test_without_a_mark_the_whole_range_is_fetched(state):
+    assert state.sync_range("pge", "1001", date(2024, 1, 1), date(2024, 3, 31)) == (date(2024, 1, 1), date(2024, 3, 31))
+
+
+def test_range_restarts_before_the_oldest_meter_mark(state):
+    state.advance("pge", "1001", "1001_1", midnight(date(2024, 3, 10)))
+    state.advance("pge", "1001", "1001_2", midnight(date(2024, 3, 20)))
+    assert state.sync_range("pge", "1001", date(2024, 1, 1), date(2024, 3, 31)) == (date(2024, 3, 8), date(2024, 3, 31))
+    assert state.sync_range("pge", "1001", date(2024, 3, 9), date(2024, 3, 31), overlap_days=5) == \
+        (date(2024, 3, 9), date(2024, 3, 31))
+
+
+def test_up_to_date_account_needs_nothing(state):
+    state.advance("pge", "1001", "1001_1", midnight(date(2024, 4, 2)))
+    assert state.sync_range("pge", "1001", date(2024, 1, 1), date(2024, 3, 31)) is None
+    assert state.sync_range("mec", "1001", date(2024, 1, 1), date(2024, 3, 31)) == (date(2024, 1, 1), date(2024, 3, 31))
+
+
+def test_marks_never_move_back(state):
+    state.advance("pge", "1001", "1001_1", 2000)
+    state.advance("pge", "1001", "1001_1", 1000)
+    assert state.marks("pge", "1001") == {"1001_1": 2000}
+
+
+def test_record_files_advances_to_the_last_interval_end(state, tmp_path):
+    path = tmp_path / "feed.xml"
+    path.write_bytes(espi_feed("1001", date(2024, 1, 1), date(2024, 1, 2)))
+    ends = state.record_files("pge", "1001", [str(path), str(tmp_path / "missing.xml")])
+    assert ends == {"1001_1": midnight(date(2024, 1, 3))}
+    assert state.marks("pge", "1001") == ends
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from tariffs import PGE_RATE_PLANS, calculate, cheapest, load_plan
+
+LABELS = np.array(["2024-01", "2024-07"], dtype="datetime64[M]")
+DAYS = np.array([[31, 31]])
+WEEKDAY = 24  # profile slots: 24 hours of non-working days, then 24 of working days
+
+
+def profile(january=(), july=()):
+    """Return a one-meter profile with {slot: kWh} for January and July."""
+    result = np.zeros((1, 2, 48))
+    for month, usage in enumerate((january, july)):
+        for slot, kwh in dict(usage).items():
+            result[0, month, slot] = kwh
+    return result
+
+
+def test_flat_plan_with_tiers_and_minimum_charge():
+    bill = calculate(PGE_RATE_PLANS["E-1"], profile({3: 10}, {3: 400}), DAYS, LABELS, territory="X")
+    # January: 10 kWh at $0.40 is below the $0.35/day minimum.
+    # July: 400 kWh at $0.40 plus $0.10 on the 400 - 31 x 9.8 kWh above baseline.
+    assert bill.items["minimum charge adjustment"][0].tolist() == pytest.approx([31 * 0.35 - 4.0, 0.0])
+    assert bill.total[0].tolist() == pytest.approx([31 * 0.35, 160 + (400 - 31 * 9.8) * 0.10])
+
+
+def test_time_of_use_plan_prices_peak_hours_and_credits_baseline():
+    july = {WEEKDAY + 17: 100, 3: 200}
+    bill = calculate(PGE_RATE_PLANS["E-TOU-C"], profile({3: 100}, july), DAYS, LABELS, territory="X")
+    assert bill.items["energy peak"][0].tolist() == pytest.approx([0.0, 60.0])
+    assert bill.items["energy off_peak"][0].tolist() == pytest.approx([46.0, 100.0])
+    assert bill.items["baseline credit"][0].tolist() == pytest.approx([-10.0, -30.0])
+    assert bill.total[0].tolist() == pytest.approx([36.0, 130.0])
+
+
+def test_weekday_only_peak_leaves_weekends_off_peak():
+    bill = calculate(PGE_RATE_PLANS["E-TOU-D"], profile({}, {17: 10, WEEKDAY + 17: 10}), DAYS, LABELS)
+    assert bill.items["energy peak"][0, 1] == pytest.approx(10 * 0.55)
+    assert bill.items["energy off_peak"][0, 1] == pytest.approx(10 * 0.40)
+
+
+def test_months_without_readings_are_left_out_of_totals():
+    bill = calculate(PGE_RATE_PLANS["E-1"], profile({}, {3: 400}), np.array([[0, 31]]), LABELS)
+    assert np.isnan(bill.total[0, 0])
+    assert bill.meter_totals().tolist() == pytest.approx([bill.total[0, 1]])
+
+
+def test_cheapest_picks_the_lowest_total_per_meter():
+    usage = profile({3: 300}, {3: 300, WEEKDAY + 17: 5})
+    bills = {name: calculate(PGE_RATE_PLANS[name], usage, DAYS, LABELS, meters=["m"]) for name in ("E-1", "E-TOU-C")}
+    totals = {name: bill.meter_totals()[0] for name, bill in bills.items()}
+    assert cheapest(bills) == [min(totals, key=totals.get)]
+
+
+def test_load_plan_requires_seasons_and_energy(tmp_path):
+    path = tmp_path / "plan.json"
+    path.write_text('{"energy": {}}')
+    with pytest.raises(ValueError, match="seasons"):
+        load_plan(str(path))
@@ -0,0 +1,57 @@
+import json
+import os
+import threading
+
+import pytest
+
+import telemetry
+from telemetry import Tracer, STATE_FILE
+
+
+def test_concurrent_finish_keeps_every_run(tmp_path):
+    errors = []
+
+    def worker():
+        for _ in range(30):
+            tracer = Tracer("pge", str(tmp_path))
+            tracer.record("run", 0.2)
+            try:
+                tracer.finish()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with open(tmp_path / STATE_FILE) as f:
+        state = json.load(f)
+    assert sum(histogram["count"] for histogram in state.values()) == 240
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_finish_does_not_raise_when_metrics_cannot_be_written(tmp_path, monkeypatch):
+    def fail(directory, histograms):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr(telemetry, "merge_histograms", fail)
+    tracer = Tracer("pge", str(tmp_path))
+    tracer.record("run", 0.1)
+    tracer.finish()
+    assert tracer.file.closed
+
+
+def test_rebuild_recomputes_histograms_from_spans(tmp_path):
+    tracer = Tracer("pge", str(tmp_path))
+    tracer.record("navigate", 0.07, step="login_page")
+    tracer.record("navigate", 3.0, step="login_page")
+    tracer.finish()
+    os.remove(tmp_path / STATE_FILE)
+
+    histograms = telemetry.rebuild(str(tmp_path))
+    (histogram,) = histograms.values()
+    assert histogram["count"] == 2
+    assert histogram["sum"] == pytest.approx(3.07)
@@ -2,207 +2,28 @@
 
 import sys
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget, QDateEdit, QMessageBox, QDesktopWidget, QProgressBar, QFileDialog, QHBoxLayout
+    QApplication, QMainWindow, QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget, QDateEdit, QMessageBox, QDesktopWidget, QProgressBar, QFileDialog, QHBoxLayout, QSpinBox, QCheckBox
 )
-from PyQt5.QtCore import QDate, QThread, pyqtSignal, Qt
+from PyQt5.QtCore import QDate, Qt
 from PyQt5.QtGui import QPixmap, QIcon
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import json
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-from datetime import datetime
-from selenium.webdriver.common.keys import Keys
-
-class AutomationWorker(QThread):
-    """Worker thread to run Selenium automation."""
-    progress = pyqtSignal(int)
-    step_counter = 0
-    finished = pyqtSignal(bool, str)
-    driver = None
-
-    def __init__(self, url, username, password, start_date, end_date, download_path):
-        super().__init__()
-        self.url = url
-        self.username = username
-        self.password = password
-        self.start_date = start_date
-        self.end_date = end_date
-        self.download_path = download_path
-
-    def login_to_portal(self, driver, url, username, password):
-        """Perform login actions."""
-        for attempt in range(3):
-            driver.get(url)
-            time.sleep(2)
-            driver.refresh()
-
-            try:
-                print(f"Attempt {attempt + 1}: Logging in...")
-                login_form_present = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.ID, "usernamex"))
-                )
-
-                if login_form_present:
-                    username_field = driver.find_element(By.ID, "usernamex")
-                    username_field.clear()
-                    username_field.send_keys(username)
-                    time.sleep(1)
-
-                    password_field = driver.find_element(By.ID, "passwordx")
-                    password_field.clear()
-                    password_field.send_keys(password)
-                    time.sleep(2)
-
-                    driver.find_element(By.ID, "btnlogin").click()
-                    time.sleep(3)
-                else:
-                    print("Login form not found. Assuming login was successful.")
-                    return
-
-                form_still_present = driver.find_elements(By.ID, "usernamex")
-                if not form_still_present:
-                    print("Login successful!")
-                    return
-
-            except Exception as e:
-                print(f"Login attempt {attempt + 1} failed: {e}")
-
-    @staticmethod
-    def validate_and_format_date(date_string):
-        """Validate and format the date to MMM DD, YYYY."""
-        accepted_formats = ["%B %d, %Y", "%Y-%m-%d", "%d %B, %Y"]
-        for date_format in accepted_formats:
-            try:
-                date_obj = datetime.strptime(date_string, date_format)
-                return date_obj.strftime("%B %d, %Y")
-            except ValueError:
-                continue
-        raise ValueError(f"Invalid date format: {date_string}. Expected formats: {', '.join(accepted_formats)}.")
-
-    def download_file(self, driver, start_date, end_date, total_steps):
-        """Download file with custom date range."""
-        time.sleep(2)
-        driver.get("https://myenergycenter.com/portal/Usage/Index")
-        time.sleep(2)
-        self.step_counter += 1
-        self.progress.emit(int((self.step_counter / total_steps) * 100))
-
-        start_date = self.validate_and_format_date(start_date)
-        end_date = self.validate_and_format_date(end_date)
-
-        green_button_download = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.ID, "gbloadpopup"))
-        )
-        green_button_download.click()
-        print("Modal opened.")
-        time.sleep(4)
-
-        from_date_picker = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.ID, "gbfromdatepicker"))
-        )
-        driver.execute_script("arguments[0].removeAttribute('readonly')", from_date_picker)
-        from_date_picker.clear()
-        from_date_picker.send_keys(start_date)
-        print(f"Start date entered: {start_date}")
-        time.sleep(2)
-        from_date_picker.send_keys(Keys.RETURN)
-
-        to_date_picker = WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.ID, "gbtodatepicker"))
-        )
-        driver.execute_script("arguments[0].removeAttribute('readonly')", to_date_picker)
-        to_date_picker.clear()
-        to_date_picker.send_keys(end_date)
-        print(f"End date entered: {end_date}")
-        time.sleep(2)
-        to_date_picker.send_keys(Keys.RETURN)
-
-        download_button = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.ID, "btngbDataDownload"))
-        )
-        time.sleep(2)
-        download_button.click()
-        print("Download initiated.")
-        time.sleep(5)
-        self.step_counter += 1
-        self.progress.emit(int((self.step_counter / total_steps) * 100))
-        driver.get("https://myenergycenter.com/portal/Dashboard/index")
-        time.sleep(2)
-
-    def interact_with_dropdown(self, driver, start_date, end_date):
-        """Interact with dropdown and handle progress."""
-        dropdown_button = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "button[data-id='accountList']"))
-        )
-        dropdown_button.click()
-        time.sleep(2)
-
-        dropdown_items = WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.dropdown-menu > li"))
-        )
-        total_items = len(dropdown_items)
-        steps_per_cycle = 3
-        total_steps = total_items * steps_per_cycle
-        print(f"Found {total_items} items in the dropdown. Total steps: {total_steps}.")
-
-        dropdown_button.click()
-        time.sleep(2)
-
-        for index in range(total_items):
-            dropdown_button = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "button[data-id='accountList']"))
-            )
-            dropdown_button.click()
-            time.sleep(2)
-
-            clickable_item = WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.dropdown-menu > li"))
-            )[index]
-
-            print(f"Selecting item {index + 1}: {clickable_item.text}")
-            driver.execute_script("arguments[0].scrollIntoView(true);", clickable_item)
-            clickable_item.click()
-            self.step_counter += 1
-            self.progress.emit(int((self.step_counter / total_steps) * 100))
-
-            print("Waiting for page to reload...")
-            try:
-                WebDriverWait(driver, 20).until(EC.staleness_of(dropdown_button))
-                print("Page reloaded successfully.")
-
-                self.download_file(driver, start_date, end_date, total_steps)
-            except Exception as e:
-                print(f"Error waiting for page reload: {e}")
-                raise
-    def configure_driver(self):
-        """Configure Chrome WebDriver with custom download folder."""
-        
-        normalized_path = self.download_path.replace("/", "\\")
-        options = webdriver.ChromeOptions()
-        prefs = {
-            "download.default_directory": normalized_path,  # Set custom download folder
-            "download.prompt_for_download": False,  # Disable prompt
-            "directory_upgrade": True,
-        }
-        options.add_experimental_option("prefs", prefs)
-        return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-    def run(self):
-        """Run the Selenium script."""
-        try:
-            self.driver = self.configure_driver()  # Use configured driver
-            self.login_to_portal(self.driver, self.url, self.username, self.password)
-            self.interact_with_dropdown(self.driver, self.start_date, self.end_date)
-            self.finished.emit(True, "Automation completed successfully!")
-        except Exception as e:
-            self.finished.emit(False, f"An error occurred: {e}")
-        finally:
-            if self.driver:
-                self.driver.quit()
+from lazy_import import lazy, preload
+from browser_pool import BrowserPool
+from driver_cache import prewarm
+from myenergycenter_scraper import MyEnergyCenterJob
+from qt_worker import JobThread
+
+IntervalStore = lazy("interval_store", "IntervalStore")
+
+# How long Stop waits for a run to reach its next step and release its browser.
+STOP_TIMEOUT_MS = 15000
+
+
+class AutomationWorker(JobThread):
+    """Worker thread running a MyEnergyCenterJob; takes the same arguments."""
+    build_driver = staticmethod(MyEnergyCenterJob.build_driver)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(MyEnergyCenterJob(*args, **kwargs))
 
 class AutomationApp(QMainWindow):
     def __init__(self):
@@ -213,6 +34,11 @@ class AutomationApp(QMainWindow):
         self.setWindowIcon(QIcon("icon.png"))
 
         self.worker = None
+        # Keep the browser warm between runs; it is launched on the first run.
+        self.browser_pool = BrowserPool(AutomationWorker.build_driver, size=1)
+        # Created on the first run; importing the store loads numpy.
+        self.interval_store = None
+        QApplication.instance().aboutToQuit.connect(self.browser_pool.close)
 
         self.center_window()
 
@@ -254,6 +80,13 @@ class AutomationApp(QMainWindow):
         self.download_layout.addWidget(self.download_input)
         self.download_layout.addWidget(self.browse_button)
 
+        self.concurrency_label = QLabel("Parallel Browsers:")
+        self.concurrency_input = QSpinBox()
+        self.concurrency_input.setRange(1, 8)
+        self.concurrency_input.setValue(1)
+
+        self.sync_checkbox = QCheckBox("Only download data newer than the last sync")
+
         self.progress_bar = QProgressBar()
         self.progress_bar.setValue(0)
         self.progress_bar.setAlignment(Qt.AlignCenter)
@@ -278,6 +111,9 @@ class AutomationApp(QMainWindow):
         layout.addWidget(self.end_date_input)
         layout.addWidget(self.download_label)
         layout.addLayout(self.download_layout)
+        layout.addWidget(self.concurrency_label)
+        layout.addWidget(self.concurrency_input)
+        layout.addWidget(self.sync_checkbox)
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.start_button)
         layout.addWidget(self.stop_button)
@@ -316,7 +152,11 @@ class AutomationApp(QMainWindow):
             return
 
         self.set_form_enabled(False)
-        self.worker = AutomationWorker(url, username, password, start_date, end_date, download_path)
+        if self.interval_store is None:
+            self.interval_store = IntervalStore()
+        self.worker = AutomationWorker(url, username, password, start_date, end_date, download_path, pool=self.browser_pool,
+                                       concurrency=self.concurrency_input.value(),
+                                       sync=self.sync_checkbox.isChecked(), store=self.interval_store)
         self.worker.progress.connect(self.update_progress)
         self.worker.finished.connect(self.on_automation_finished)
         self.worker.start()
@@ -339,7 +179,9 @@ class AutomationApp(QMainWindow):
         """Stop the Selenium automation process and close the application."""
         if self.worker and self.worker.isRunning():
             QMessageBox.information(self, "Stopping", "Stopping the automation process...")
-            self.worker.terminate()
+            self.worker.cancel()
+            if not self.worker.wait(STOP_TIMEOUT_MS):
+                self.worker.terminate()
             self.worker.exit()
             self.worker.quit()
             self.worker = None
@@ -355,6 +197,8 @@ class AutomationApp(QMainWindow):
         self.end_date_input.setEnabled(enabled)
         self.download_input.setEnabled(enabled)
         self.browse_button.setEnabled(enabled)
+        self.concurrency_input.setEnabled(enabled)
+        self.sync_checkbox.setEnabled(enabled)
         self.start_button.setEnabled(enabled)
         self.stop_button.setEnabled(not enabled)
 
@@ -363,4 +207,8 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = AutomationApp()
     window.show()
+    # Import the automation stack while the user fills in the form.
+    preload()
+    # Verify the cached chromedriver now so the first run does not wait for it.
+    prewarm(background=True)
     sys.exit(app.exec())
\ No newline at end of file
@@ -1,190 +1,27 @@
 # youpower_pge.py - Simple PG&E Green Button Data Scraper
 import sys
 import os
-from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QLabel, QLineEdit, QPushButton, QVBoxLayout, QWidget, 
-    QDateEdit, QMessageBox, QDesktopWidget, QProgressBar, QFileDialog, QHBoxLayout
+    QDateEdit, QMessageBox, QDesktopWidget, QProgressBar, QFileDialog, QHBoxLayout, QCheckBox
 )
-from PyQt5.QtCore import QDate, QThread, pyqtSignal, Qt
+from PyQt5.QtCore import QDate, Qt
 from PyQt5.QtGui import QPixmap, QIcon
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import time
-from selenium.webdriver.common.keys import Keys
+from lazy_import import lazy, preload
+from browser_pool import BrowserPool
+from driver_cache import prewarm
+from pge_scraper import PGEJob
+from qt_worker import JobThread
 
-class PGEScraper(QThread):
-    """Worker thread to run Selenium automation for PG&E."""
-    progress = pyqtSignal(int)
-    finished = pyqtSignal(bool, str)
-    driver = None
+IntervalStore = lazy("interval_store", "IntervalStore")
 
-    def __init__(self, username, password, start_date, end_date, download_path):
-        super().__init__()
-        self.username = username
-        self.password = password
-        self.start_date = start_date
-        self.end_date = end_date
-        self.download_path = download_path
-        self.step = 0
-        self.total_steps = 5
 
-    def update_progress(self, step_completed=True):
-        """Update progress bar."""
-        if step_completed:
-            self.step += 1
-        self.progress.emit(int((self.step / self.total_steps) * 100))
+class PGEScraper(JobThread):
+    """Worker thread running a PGEJob; takes the same arguments."""
+    build_driver = staticmethod(PGEJob.build_driver)
 
-    def login_to_pge(self, driver):
-        """Perform login to PG&E portal."""
-        try:
-            print("Logging in to PG&E...")
-            driver.get("https://www.pge.com/en/login")
-            time.sleep(3)
-            
-            # Find and fill username field
-            username_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "username"))
-            )
-            username_field.clear()
-            username_field.send_keys(self.username)
-            time.sleep(1)
-            
-            # Find and fill password field
-            password_field = driver.find_element(By.ID, "password")
-            password_field.clear()
-            password_field.send_keys(self.password)
-            time.sleep(1)
-            
-            # Click login button
-            login_button = driver.find_element(By.ID, "login")
-            login_button.click()
-            time.sleep(5)
-            
-            # Verify login was successful
-            try:
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//a[contains(text(), 'Energy Usage')]"))
-                )
-                print("Login successful!")
-                self.update_progress()
-                return True
-            except:
-                print("Login failed: couldn't find Energy Usage link")
-                return False
-                
-        except Exception as e:
-            print(f"Login error: {e}")
-            return False
-    
-    def download_green_button_data(self, driver):
-        """Navigate to Green Button and download data."""
-        try:
-            # Click on Energy Usage
-            energy_link = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Energy Usage')]"))
-            )
-            energy_link.click()
-            time.sleep(5)
-            self.update_progress()
-            
-            # Click on Energy Usage Details 
-            details_link = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//a[contains(text(), 'Energy Usage Details')]"))
-            )
-            details_link.click()
-            time.sleep(5)
-            self.update_progress()
-            
-            # Scroll down to find Green Button
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(2)
-            
-            # Find and click Green Button
-            green_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Green Button') or contains(@class, 'green-button')]"))
-            )
-            green_button.click()
-            time.sleep(3)
-            self.update_progress()
-            
-            # Select date range option
-            range_option = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//input[@type='radio' and @value='range']"))
-            )
-            range_option.click()
-            time.sleep(2)
-            
-            # Format dates
-            from_date = self.start_date.toString("MMMM d, yyyy")
-            to_date = self.end_date.toString("MMMM d, yyyy")
-            
-            # Fill in date fields
-            from_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "from-date"))
-            )
-            from_field.clear()
-            from_field.send_keys(from_date)
-            time.sleep(1)
-            
-            to_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "to-date"))
-            )
-            to_field.clear()
-            to_field.send_keys(to_date)
-            time.sleep(1)
-            
-            # Click download button
-            download_button = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'Download')]"))
-            )
-            download_button.click()
-            print("Download initiated")
-            time.sleep(10)  # Wait for download to complete
-            self.update_progress()
-            
-            return True
-            
-        except Exception as e:
-            print(f"Error downloading data: {e}")
-            return False
-    
-    def configure_driver(self):
-        """Configure Chrome WebDriver with custom download folder."""
-        normalized_path = self.download_path.replace("/", "\\")
-        options = webdriver.ChromeOptions()
-        prefs = {
-            "download.default_directory": normalized_path,
-            "download.prompt_for_download": False,
-            "directory_upgrade": True,
-        }
-        options.add_experimental_option("prefs", prefs)
-        return webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-
-    def run(self):
-        """Run the Selenium script."""
-        try:
-            self.driver = self.configure_driver()
-            
-            if not self.login_to_pge(self.driver):
-                self.finished.emit(False, "Login failed. Please check your credentials.")
-                return
-                
-            if not self.download_green_button_data(self.driver):
-                self.finished.emit(False, "Failed to download Green Button data.")
-                return
-                
-            self.finished.emit(True, "Successfully downloaded PG&E Green Button data!")
-            
-        except Exception as e:
-            self.finished.emit(False, f"An error occurred: {e}")
-        finally:
-            if self.driver:
-                self.driver.quit()
+    def __init__(self, *args, **kwargs):
+        super().__init__(PGEJob(*args, **kwargs))
 
 
 class PGEScraperApp(QMainWindow):
@@ -193,9 +30,15 @@ class PGEScraperApp(QMainWindow):
 
         self.setWindowTitle("YouPower PG&E Data Scraper")
         self.setGeometry(100, 100, 450, 400)
-        self.setWindowIcon(QIcon("icon.ico") if os.path.exists("icon.ico") else None)
+        if os.path.exists("icon.ico"):
+            self.setWindowIcon(QIcon("icon.ico"))
 
         self.worker = None
+        # Keep the browser warm between runs; it is launched on the first run.
+        self.browser_pool = BrowserPool(PGEScraper.build_driver, size=1)
+        # Created on the first run; importing the store loads numpy.
+        self.interval_store = None
+        QApplication.instance().aboutToQuit.connect(self.browser_pool.close)
         self.center_window()
         self.init_ui()
         
@@ -259,6 +102,9 @@ class PGEScraperApp(QMainWindow):
         download_layout.addWidget(self.browse_button)
         layout.addLayout(download_layout)
         
+        self.sync_checkbox = QCheckBox("Only download data newer than the last sync")
+        layout.addWidget(self.sync_checkbox)
+        
         # Progress bar
         self.progress_bar = QProgressBar()
         layout.addWidget(self.progress_bar)
@@ -298,7 +144,10 @@ class PGEScraperApp(QMainWindow):
         self.set_enabled(False)
         
         # Create and start worker thread
-        self.worker = PGEScraper(username, password, start_date, end_date, download_path)
+        if self.interval_store is None:
+            self.interval_store = IntervalStore()
+        self.worker = PGEScraper(username, password, start_date, end_date, download_path, pool=self.browser_pool,
+                                 sync=self.sync_checkbox.isChecked(), store=self.interval_store)
         self.worker.progress.connect(self.update_progress)
         self.worker.finished.connect(self.on_finished)
         self.worker.start()
@@ -324,6 +173,7 @@ class PGEScraperApp(QMainWindow):
         self.end_date_input.setEnabled(enabled)
         self.download_input.setEnabled(enabled)
         self.browse_button.setEnabled(enabled)
+        self.sync_checkbox.setEnabled(enabled)
         self.start_button.setEnabled(enabled)
         
 
@@ -331,4 +181,8 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = PGEScraperApp()
     window.show()
+    # Import the automation stack while the user fills in the form.
+    preload()
+    # Verify the cached chromedriver now so the first run does not wait for it.
+    prewarm(background=True)
     sys.exit(app.exec_())